@@ -3,19 +3,38 @@ Flask API for User Authentication
 Provides REST endpoints for signup, login, and user management
 """
 
-from flask import Flask, request, jsonify, redirect, url_for
+from flask import Flask, Response, request, jsonify, redirect, url_for
 from flask_cors import CORS
 from user_manager import UserManager
+from passwords import PasswordHasher
 from transaction_manager import TransactionManager
+import metrics
+import profiling
+from profiling import stage
 import os
+import signal
+import sys
 import jwt
 from functools import wraps
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend communication
+metrics.instrument(app)
+
+# User storage: 'json' (users.json plus write-ahead log) or 'sqlite' (users.db);
+# move existing users over with migrate_users.py
+USER_STORE = os.getenv('USER_STORE', 'json')
+USERS_FILE = os.getenv('USERS_FILE', 'users.db' if USER_STORE == 'sqlite' else 'users.json')
+
+# Password hashing: 'scrypt' or 'pbkdf2', and its cost (scrypt N or PBKDF2
+# iterations; see benchmark_passwords.py). Existing hashes are upgraded on login.
+PASSWORD_KDF = os.getenv('PASSWORD_KDF', 'scrypt')
+PASSWORD_COST = int(os.getenv('PASSWORD_COST', '0')) or None
 
 # Initialize managers
-user_manager = UserManager()
+# last_login updates are flushed in batches every second instead of on each login
+user_manager = UserManager(USERS_FILE, write_behind_interval=1.0, backend=USER_STORE,
+                           hasher=PasswordHasher(PASSWORD_KDF, PASSWORD_COST))
 transaction_manager = TransactionManager()
 
 # JWT Secret key (in production, use environment variable)
@@ -36,7 +55,8 @@ def token_required(f):
                 token = token[7:]
             
             # Decode the token
-            data = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+            with stage('auth'):
+                data = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
             current_user_email = data['user_email']
             
         except jwt.ExpiredSignatureError:
@@ -48,6 +68,20 @@ def token_required(f):
     
     return decorated
 
+def _is_admin(req):
+    """True if the request carries a valid JWT of an active admin user"""
+    token = req.headers.get('Authorization', '')
+    if token.startswith('Bearer '):
+        token = token[7:]
+    try:
+        data = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return False
+    user = user_manager.get_user_by_email(data.get('user_email', ''))
+    return bool(user) and user.get('role') == 'admin' and user.get('is_active', True)
+
+profiling.instrument(app, _is_admin)
+
 @app.route('/')
 def home():
     """Home page - redirect to login"""
@@ -112,7 +146,8 @@ def signup():
 def login():
     """Authenticate user login"""
     try:
-        data = request.get_json()
+        with stage('parse'):
+            data = request.get_json()
         
         if not data:
             return jsonify({
@@ -127,19 +162,21 @@ def login():
         
         if success:
             # Generate JWT token
-            token = jwt.encode({
-                'user_email': user_data['email'],
-                'user_id': user_data['id'],
-                'username': user_data['username']
-            }, JWT_SECRET, algorithm='HS256')
+            with stage('auth'):
+                token = jwt.encode({
+                    'user_email': user_data['email'],
+                    'user_id': user_data['id'],
+                    'username': user_data['username']
+                }, JWT_SECRET, algorithm='HS256')
             
-            return jsonify({
-                'success': True,
-                'message': message,
-                'user': user_data,
-                'token': token,
-                'redirect': '/dashboard'  # Redirect to dashboard after login
-            }), 200
+            with stage('serialize'):
+                return jsonify({
+                    'success': True,
+                    'message': message,
+                    'user': user_data,
+                    'token': token,
+                    'redirect': '/dashboard'  # Redirect to dashboard after login
+                }), 200
         else:
             return jsonify({
                 'success': False,
@@ -282,7 +319,8 @@ def delete_user(user_id):
 def create_transaction(current_user_email):
     """Store a new transaction for the authenticated user"""
     try:
-        data = request.get_json()
+        with stage('parse'):
+            data = request.get_json()
         
         if not data:
             return jsonify({
@@ -293,10 +331,11 @@ def create_transaction(current_user_email):
         # Store transaction with user association
         result = transaction_manager.create_transaction(current_user_email, data)
         
-        if result['success']:
-            return jsonify(result), 201
-        else:
-            return jsonify(result), 400
+        with stage('serialize'):
+            if result['success']:
+                return jsonify(result), 201
+            else:
+                return jsonify(result), 400
             
     except Exception as e:
         return jsonify({
@@ -441,6 +480,11 @@ def create_demo_users():
             'message': f'Server error: {str(e)}'
         }), 500
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics: per-route request counts and latencies, MongoDB and user file timings"""
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
 if __name__ == '__main__':
     # Create demo users on startup
     print("🚀 Starting User Authentication API...")
@@ -487,4 +531,6 @@ if __name__ == '__main__':
     print("   Analyst: analyst@fraudguard.com / analyst123")
     print("   Demo: demo@fraudguard.com / demo123")
     
+    # Exit normally on SIGTERM so pending write-behind updates are flushed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     app.run(debug=True, host='0.0.0.0', port=5000)
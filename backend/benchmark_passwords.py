@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark login throughput at each password hashing setting
+For every algorithm:cost pair, signs up users in a temporary store, then
+logs them in from several threads for a few seconds and reports the time
+of one hash, logins/sec and p50/p95 login latency. The verification cache
+is off unless --cache is given, so every login pays for a derivation.
+
+Usage: python benchmark_passwords.py [--settings scrypt:16384,pbkdf2:600000] [--threads 8] [--seconds 3] [-o results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from passwords import PasswordHasher
+from user_manager import UserManager
+
+DEFAULT_SETTINGS = [('scrypt', 2 ** 12), ('scrypt', 2 ** 14), ('scrypt', 2 ** 15), ('scrypt', 2 ** 16),
+                    ('pbkdf2', 100_000), ('pbkdf2', 600_000)]
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure_logins(algorithm, cost, threads=8, seconds=3.0, users=20, workers=None, cache=False):
+    """
+    Log random users in from `threads` threads for `seconds`
+
+    Returns:
+        Dict with algorithm, cost, hashMs, logins, loginsPerSecond, p50Ms and p95Ms
+    """
+    hasher = PasswordHasher(algorithm, cost, workers=workers, cache_seconds=60.0 if cache else 0)
+    with tempfile.TemporaryDirectory() as directory:
+        # Write-behind keeps last_login fsyncs out of the measurement
+        manager = UserManager(os.path.join(directory, "users.json"), write_behind_interval=60, hasher=hasher)
+        try:
+            started = time.perf_counter()
+            for i in range(users):
+                manager.signup(f"user{i}@example.com", "benchmark", f"user{i}")
+            hash_ms = (time.perf_counter() - started) * 1000 / users
+
+            latencies = []
+            deadline = time.perf_counter() + seconds
+
+            def login_loop(seed):
+                rng = random.Random(seed)
+                mine = []
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    assert manager.login(f"user{rng.randrange(users)}@example.com", "benchmark")[0]
+                    mine.append(time.perf_counter() - started)
+                latencies.extend(mine)
+
+            workers_started = time.perf_counter()
+            login_threads = [threading.Thread(target=login_loop, args=(seed,)) for seed in range(threads)]
+            for thread in login_threads:
+                thread.start()
+            for thread in login_threads:
+                thread.join()
+            elapsed = time.perf_counter() - workers_started
+        finally:
+            manager.close()
+            hasher.close()
+
+    return {
+        'algorithm': algorithm,
+        'cost': cost,
+        'hashMs': round(hash_ms, 2),
+        'logins': len(latencies),
+        'loginsPerSecond': round(len(latencies) / elapsed, 1),
+        'p50Ms': round(_percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'p95Ms': round(_percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+    }
+
+
+def run(settings=DEFAULT_SETTINGS, threads=8, seconds=3.0, users=20, workers=None, cache=False):
+    """Benchmark every (algorithm, cost) setting, printing a table row as each finishes"""
+    print(f"{'setting':<16} {'hash ms':>9} {'logins/s':>10} {'p50 ms':>9} {'p95 ms':>9}")
+    results = []
+    for algorithm, cost in settings:
+        result = measure_logins(algorithm, cost, threads, seconds, users, workers, cache)
+        results.append(result)
+        print(f"{algorithm + ':' + str(cost):<16} {result['hashMs']:>9} {result['loginsPerSecond']:>10} "
+              f"{result['p50Ms']:>9} {result['p95Ms']:>9}")
+    return results
+
+
+def _parse_settings(text):
+    settings = []
+    for item in text.split(','):
+        algorithm, cost = item.split(':')
+        settings.append((algorithm, int(cost)))
+    return settings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark login throughput per password hashing setting")
+    parser.add_argument('--settings', type=_parse_settings,
+                        default=DEFAULT_SETTINGS, help="comma-separated algorithm:cost pairs")
+    parser.add_argument('--threads', type=int, default=8, help="concurrent login threads (default 8)")
+    parser.add_argument('--seconds', type=float, default=3.0, help="seconds of logins per setting (default 3)")
+    parser.add_argument('--users', type=int, default=20, help="users signed up per setting (default 20)")
+    parser.add_argument('--workers', type=int, help="hashing pool size (default: CPU count)")
+    parser.add_argument('--cache', action='store_true', help="enable the verification cache")
+    parser.add_argument('-o', '--output', help="write the results as JSON")
+    args = parser.parse_args()
+
+    print(f"🔐 Login throughput with {args.threads} threads, {os.cpu_count()} CPUs")
+    results = run(args.settings, args.threads, args.seconds, args.users, args.workers, args.cache)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
@@ -0,0 +1,33 @@
+"""
+Shared helpers for the user store tests
+Imported by name so the test files also run as plain scripts
+"""
+
+from passwords import PasswordHasher
+
+# Cheap enough that signups and logins do not dominate the tests
+FAST_HASHER = PasswordHasher(cost=2 ** 4)
+
+
+def assert_indexes_consistent(manager):
+    """Check a JSON store's lookup indexes against its users
+
+    Every user is indexed by id. Each lowercased email and username points at
+    one user with that key - the first in signup order unless a later change
+    moved a user onto a taken key - and the other users sharing it (legacy
+    duplicates) wait in _shadowed in signup order.
+    """
+    store = manager.store
+    users = store.users_data["users"]
+    assert store._users_by_id == {user["id"]: user for user in users}
+    for index, field in [(store._users_by_email, "email"), (store._users_by_username, "username")]:
+        owners = {}
+        for user in users:
+            owners.setdefault(user[field].lower(), []).append(user)
+        assert set(index) == set(owners)
+        for key, sharing in owners.items():
+            waiting = store._shadowed.get((field, key), [])
+            assert index[key] in sharing
+            assert waiting == [user for user in sharing if user is not index[key]]
+        assert {key for shadowed_field, key in store._shadowed if shadowed_field == field} <= set(owners)
+    assert all(store._shadowed.values())
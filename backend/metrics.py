@@ -0,0 +1,249 @@
+# Vendored copy of server/metrics.py: edit that file and copy it here (test_vendored.py checks they match)
+"""
+Prometheus-style metrics with low-overhead, lock-free recording
+Counters and histograms are kept in per-thread shards: a thread only ever
+writes to its own shard, so recording takes no lock, and a scrape sums all
+shards. Rendered in the Prometheus text exposition format at /metrics.
+The backend uses the same module: backend/metrics.py is a vendored copy.
+"""
+
+import bisect
+import collections
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# New shards registered before a thread sweeps out those of exited threads
+MIN_SWEEP = 64
+
+
+class MetricsRegistry:
+    """
+    A set of metrics and the per-thread shards holding their values
+
+    Shards of threads that have exited are folded into a retired total,
+    both at scrape time and whenever the shards registered since the last
+    sweep outnumber the live ones, so a thread-per-request server keeps a
+    bounded registry even when nothing scrapes it.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # (weakref to thread, shard) of every thread that recorded something:
+        # those seen by the last sweep, and those registered since
+        self._shards = []
+        self._new_shards = collections.deque()
+        self._sweep_at = MIN_SWEEP
+        self._retired = {}
+
+    def reset(self):
+        """
+        Drop every recorded value, keeping the registered metrics
+
+        Call in a forked worker, before it starts threads: it inherits the
+        parent's shards, which every worker would otherwise report again.
+        """
+        # A parent thread may have held the lock at fork time
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []
+        self._new_shards = collections.deque()
+        self._sweep_at = MIN_SWEEP
+        self._retired = {}
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(self, name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labels, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def shard(self):
+        """This thread's shard: {(metric name, label values): value}"""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            # deque.append is atomic, so registering does not wait for the lock
+            self._new_shards.append((weakref.ref(threading.current_thread()), shard))
+            # ...and a sweep already running elsewhere is not waited for either
+            if len(self._new_shards) >= self._sweep_at and self._lock.acquire(blocking=False):
+                try:
+                    self._sweep()
+                finally:
+                    self._lock.release()
+            return shard
+
+    def _sweep(self):
+        """Fold the shards of exited threads into the retired total; call holding _lock"""
+        while self._new_shards:
+            self._shards.append(self._new_shards.popleft())
+        live = []
+        for thread, shard in self._shards:
+            owner = thread()
+            if owner is None or not owner.is_alive():
+                # The thread will not write again; keep its values in the retired total
+                _add_into(self._retired, shard.copy())
+            else:
+                live.append((thread, shard))
+        self._shards = live
+        # Sweeping once per len(live) registrations keeps registration amortized O(1)
+        self._sweep_at = max(MIN_SWEEP, len(live))
+
+    def collect(self):
+        """Current totals: {(metric name, label values): value}"""
+        with self._lock:
+            self._sweep()
+            totals = {}
+            _add_into(totals, self._retired)
+            for _, shard in self._shards:
+                # dict.copy() runs under the GIL, so a concurrent writer cannot break it
+                _add_into(totals, shard.copy())
+        return totals
+
+    def snapshot(self):
+        """JSON-serializable totals, for merging metrics across worker processes"""
+        return [[name, list(labels), value] for (name, labels), value in self.collect().items()]
+
+    def render(self, snapshots=()):
+        """
+        Text exposition of all metrics
+
+        Args:
+            snapshots: Other registries' snapshot() output to add in (e.g. from
+                the other pre-forked workers)
+        """
+        totals = self.collect()
+        for snapshot in snapshots:
+            _add_into(totals, {(name, tuple(labels)): value for name, labels, value in snapshot})
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.extend(metric.render({labels: value for (metric_name, labels), value in totals.items() if metric_name == name}))
+        return '\n'.join(lines) + '\n'
+
+
+def _add_into(totals, values):
+    for key, value in values.items():
+        if isinstance(value, list):
+            current = totals.get(key)
+            totals[key] = list(value) if current is None else [a + b for a, b in zip(current, value)]
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    def __init__(self, registry, name, documentation, labels):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def inc(self, *label_values, amount=1):
+        shard = self.registry.shard()
+        key = (self.name, label_values)
+        shard[key] = shard.get(key, 0) + amount
+
+    def render(self, values):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets, per label combination"""
+
+    def __init__(self, registry, name, documentation, labels, buckets):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *label_values):
+        shard = self.registry.shard()
+        key = (self.name, label_values)
+        # [count per bucket..., count above the last bucket, sum]
+        counts = shard.get(key)
+        if counts is None:
+            counts = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        """Observe the duration of a with-block in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def render(self, values):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, counts in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labels, label_values, [('le', bound if bound == '+Inf' else repr(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter('http_requests_total', 'HTTP requests handled', ('method', 'route', 'status'))
+http_request_seconds = registry.histogram('http_request_duration_seconds', 'HTTP request latency', ('method', 'route'))
+stage_seconds = registry.histogram('stage_duration_seconds', 'Time spent in hot-path stages', ('stage',))
+
+
+def instrument(app):
+    """Count and time every request of a Flask app, labelled by route pattern"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # The URL rule, not the path, so /api/user/<user_id> stays one series
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            http_request_seconds.observe(time.perf_counter() - started, request.method, route)
+            http_requests.inc(request.method, route, str(response.status_code))
+        return response
+
+    return app
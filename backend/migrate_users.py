@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+One-shot migration of users from the JSON store to SQLite
+
+Reads users.json with its write-ahead log replayed and copies every user
+into an SQLite database in a single transaction. Users whose id, email or
+username is already taken (legacy duplicates, or a previous run) are
+skipped and listed. Stop the API before migrating, then start it with
+USER_STORE=sqlite.
+
+Usage: python migrate_users.py [users.json] [users.db]
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict, List, Tuple
+
+from user_manager import SqliteUserStore, UserLog
+
+
+def migrate(users_file: str = "users.json", db_file: str = "users.db") -> Tuple[int, List[Dict]]:
+    """
+    Copy all users of a JSON store into an SQLite store
+
+    Returns:
+        (number imported, users skipped as duplicates)
+    """
+    log = UserLog(users_file)
+    try:
+        users = log.load()["users"]
+    finally:
+        log.close()
+    store = SqliteUserStore(db_file)
+    try:
+        return store.import_users(users)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate users from users.json to SQLite")
+    parser.add_argument('users_file', nargs='?', default='users.json', help="JSON snapshot (default users.json)")
+    parser.add_argument('db_file', nargs='?', default='users.db', help="SQLite database (default users.db)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.users_file) and not os.path.exists(args.users_file + ".wal"):
+        print(f"❌ {args.users_file} not found")
+        sys.exit(1)
+
+    imported, skipped = migrate(args.users_file, args.db_file)
+    print(f"✅ Migrated {imported} users from {args.users_file} to {args.db_file}")
+    for user in skipped:
+        print(f"⚠️  Skipped {user['username']} ({user['email']}, id {user['id']}): already taken")
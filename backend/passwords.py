@@ -0,0 +1,168 @@
+"""
+Password hashing with a tunable key derivation function
+- scrypt (default) or PBKDF2-HMAC-SHA256. The parameters are stored in
+  each hash, so the cost can be raised later without breaking old hashes.
+- Legacy salt:sha256 hashes still verify, and needs_rehash() tells the
+  caller to upgrade them, and hashes made with other settings, at the
+  next login.
+- Derivations run on a bounded thread pool. hashlib releases the GIL
+  while deriving, so request threads keep serving meanwhile, and the pool
+  size caps how much CPU and memory logins can take at once.
+- Recent successful verifications are remembered for a short while and
+  concurrent verifications of the same password share one derivation, so
+  retries and login bursts do not multiply the KDF work. The cache holds
+  HMACs under a random per-process key, never passwords.
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from metrics import stage_seconds
+
+ALGORITHMS = ('scrypt', 'pbkdf2')
+
+# scrypt N (memory use is 128 * r * N bytes, 16 MiB here) and PBKDF2 iterations (OWASP, 2023)
+DEFAULT_COST = {'scrypt': 2 ** 14, 'pbkdf2': 600_000}
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+def _derive(algorithm: str, params: Tuple[int, ...], password: str, salt: bytes) -> bytes:
+    """Run the KDF; executed on the hasher's pool"""
+    with stage_seconds.time(f'password_{algorithm}'):
+        if algorithm == 'scrypt':
+            n, r, p = params
+            return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                                  maxmem=256 * r * n, dklen=KEY_BYTES)
+        iterations, = params
+        return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations, KEY_BYTES)
+
+
+def _format(algorithm: str, params: Tuple[int, ...], salt: bytes, key: bytes) -> str:
+    """'scrypt$N$r$p$salt$key' or 'pbkdf2_sha256$iterations$salt$key', hex encoded"""
+    name = 'scrypt' if algorithm == 'scrypt' else 'pbkdf2_sha256'
+    return '$'.join([name, *map(str, params), salt.hex(), key.hex()])
+
+
+def _parse(stored_hash: str):
+    """(algorithm, params, salt, key) of a KDF hash, or None for legacy or malformed ones"""
+    parts = stored_hash.split('$')
+    try:
+        if parts[0] == 'scrypt' and len(parts) == 6:
+            return 'scrypt', tuple(map(int, parts[1:4])), bytes.fromhex(parts[4]), bytes.fromhex(parts[5])
+        if parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+            return 'pbkdf2', (int(parts[1]),), bytes.fromhex(parts[2]), bytes.fromhex(parts[3])
+    except ValueError:
+        pass
+    return None
+
+
+def _verify_legacy(password: str, stored_hash: str) -> bool:
+    """Check a 'salt:sha256(password + salt)' hash from before the KDF"""
+    try:
+        salt, password_hash = stored_hash.split(':')
+    except ValueError:
+        return False
+    test_hash = hashlib.sha256((password + salt).encode()).hexdigest()
+    return hmac.compare_digest(test_hash, password_hash)
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords on a dedicated thread pool"""
+
+    def __init__(self, algorithm: str = 'scrypt', cost: Optional[int] = None, workers: Optional[int] = None,
+                 cache_seconds: float = 60.0, cache_size: int = 1024):
+        """
+        Args:
+            algorithm: 'scrypt' or 'pbkdf2'
+            cost: scrypt N (a power of two) or PBKDF2 iterations; the
+                DEFAULT_COST for the algorithm if None
+            workers: Derivations running at once (default: CPU count)
+            cache_seconds: How long a successful verification is
+                remembered; 0 disables the cache
+            cache_size: Most verifications remembered
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown password hashing algorithm: {algorithm!r} (expected one of {ALGORITHMS})")
+        cost = cost or DEFAULT_COST[algorithm]
+        if algorithm == 'scrypt' and (cost < 2 or cost & (cost - 1)):
+            raise ValueError(f"scrypt cost must be a power of two, got {cost}")
+        self.algorithm = algorithm
+        self.cost = cost
+        self.params = (cost, SCRYPT_R, SCRYPT_P) if algorithm == 'scrypt' else (cost,)
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_seconds = cache_seconds
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        # HMAC of (stored hash, password) -> expiry, oldest first
+        self._cache = OrderedDict()
+        # Same key -> future of the derivation running for it
+        self._inflight = {}
+        self._cache_key = os.urandom(32)
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            # Pool threads do not survive a fork; a forked worker starts its own
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='password-kdf')
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the configured algorithm and cost"""
+        salt = os.urandom(SALT_BYTES)
+        key = self._executor().submit(_derive, self.algorithm, self.params, password, salt).result()
+        return _format(self.algorithm, self.params, salt, key)
+
+    def verify(self, password: str, stored_hash: str) -> bool:
+        """Check a password against a KDF hash or a legacy salt:sha256 one"""
+        parsed = _parse(stored_hash)
+        if parsed is None:
+            return _verify_legacy(password, stored_hash)
+        algorithm, params, salt, expected = parsed
+
+        cache_key = hmac.new(self._cache_key, f"{stored_hash}\0{password}".encode('utf-8'), 'sha256').digest()
+        with self._lock:
+            expires = self._cache.get(cache_key)
+            if expires is not None and expires > time.monotonic():
+                return True
+            future = self._inflight.get(cache_key)
+            owner = future is None
+            if owner:
+                future = self._inflight[cache_key] = self._executor().submit(_derive, algorithm, params, password, salt)
+        try:
+            verified = hmac.compare_digest(future.result(), expected)
+        finally:
+            if owner:
+                with self._lock:
+                    self._inflight.pop(cache_key, None)
+
+        if verified and owner and self.cache_seconds > 0:
+            with self._lock:
+                self._cache[cache_key] = time.monotonic() + self.cache_seconds
+                self._cache.move_to_end(cache_key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return verified
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        """True for legacy hashes and hashes made with other settings than this hasher's"""
+        parsed = _parse(stored_hash)
+        return parsed is None or parsed[:2] != (self.algorithm, self.params)
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown()
+            self._pool = None
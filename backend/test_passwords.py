@@ -0,0 +1,138 @@
+"""
+Tests for password hashing, rehash-on-login and the login benchmark
+Runs against temporary files; no server needed
+"""
+
+import hashlib
+import json
+import tempfile
+import threading
+
+import passwords
+from benchmark_passwords import run
+from passwords import PasswordHasher
+from user_manager import UserManager
+
+
+def test_hash_and_verify():
+    for hasher in [PasswordHasher(cost=2 ** 8), PasswordHasher("pbkdf2", cost=1000)]:
+        stored = hasher.hash("correct horse")
+        assert stored.startswith(("scrypt$256$8$1$", "pbkdf2_sha256$1000$"))
+        assert stored != hasher.hash("correct horse")
+        assert hasher.verify("correct horse", stored)
+        assert not hasher.verify("wrong horse", stored)
+        assert not hasher.needs_rehash(stored)
+        hasher.close()
+
+    # Hashes keep their own parameters: a new cost only marks them for rehashing
+    stronger = PasswordHasher(cost=2 ** 9)
+    assert stronger.verify("correct horse", PasswordHasher(cost=2 ** 8).hash("correct horse"))
+    assert stronger.needs_rehash(PasswordHasher(cost=2 ** 8).hash("correct horse"))
+    assert not stronger.verify("x", "scrypt$broken")
+
+
+def test_legacy_hashes_are_upgraded_on_login(tmp_path):
+    path = str(tmp_path / "users.json")
+    salt = "abc123"
+    legacy = f"{salt}:{hashlib.sha256(('secret1' + salt).encode()).hexdigest()}"
+    user = {"id": "1", "email": "old@example.com", "username": "old", "password_hash": legacy,
+            "is_active": True, "last_login": None}
+    with open(path, "w") as f:
+        json.dump({"users": [user]}, f)
+
+    manager = UserManager(path, hasher=PasswordHasher(cost=2 ** 8))
+    assert not manager.login("old@example.com", "wrong1")[0]
+    assert manager.store.get_by_id("1")["password_hash"] == legacy
+    assert manager.login("old@example.com", "secret1")[0]
+    upgraded = manager.store.get_by_id("1")["password_hash"]
+    assert upgraded.startswith("scrypt$256$")
+    manager.close()
+
+    # Persisted, and raising the cost upgrades it again
+    reloaded = UserManager(path, hasher=PasswordHasher(cost=2 ** 9))
+    assert reloaded.store.get_by_id("1")["password_hash"] == upgraded
+    assert reloaded.login("old@example.com", "secret1")[0]
+    assert reloaded.store.get_by_id("1")["password_hash"].startswith("scrypt$512$")
+
+
+def test_unknown_emails_cost_a_derivation(tmp_path):
+    manager = UserManager(str(tmp_path / "users.json"), hasher=PasswordHasher(cost=2 ** 8))
+    manager.signup("known@example.com", "secret1", "known")
+    calls = []
+    original = passwords._derive
+
+    def counting_derive(*args):
+        calls.append(args[0])
+        return original(*args)
+
+    passwords._derive = counting_derive
+    try:
+        unknown = manager.login("nobody@example.com", "secret1")
+        wrong = manager.login("known@example.com", "wrong1")
+    finally:
+        passwords._derive = original
+        manager.close()
+    # Indistinguishable answers, each after one scrypt derivation
+    assert unknown == wrong == (False, "Invalid email or password", None)
+    assert calls == ["scrypt", "scrypt"]
+
+
+def test_concurrent_verifications_share_one_derivation():
+    hasher = PasswordHasher(cost=2 ** 8)
+    stored = hasher.hash("secret1")
+    calls = []
+    started, release = threading.Event(), threading.Event()
+    original = passwords._derive
+
+    def slow_derive(*args):
+        calls.append(args)
+        started.set()
+        release.wait()
+        return original(*args)
+
+    passwords._derive = slow_derive
+    try:
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(hasher.verify("secret1", stored))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert results == [True] * 8
+        assert len(calls) == 1
+
+        # Remembered afterwards; failures never are
+        assert hasher.verify("secret1", stored)
+        assert not hasher.verify("wrong1", stored)
+        assert not hasher.verify("wrong1", stored)
+        assert len(calls) == 3
+    finally:
+        passwords._derive = original
+        hasher.close()
+
+
+def test_benchmark_reports_each_setting():
+    results = run([("scrypt", 2 ** 6), ("pbkdf2", 100)], threads=2, seconds=0.2, users=2)
+    assert [(result["algorithm"], result["cost"]) for result in results] == [("scrypt", 64), ("pbkdf2", 100)]
+    assert all(result["logins"] > 0 and result["loginsPerSecond"] > 0 for result in results)
+
+
+if __name__ == "__main__":
+    import pathlib
+
+    print("🧪 Testing password hashing")
+    print("=" * 50)
+    test_hash_and_verify()
+    print("✅ test_hash_and_verify")
+    with tempfile.TemporaryDirectory() as directory:
+        test_legacy_hashes_are_upgraded_on_login(pathlib.Path(directory))
+    print("✅ test_legacy_hashes_are_upgraded_on_login")
+    with tempfile.TemporaryDirectory() as directory:
+        test_unknown_emails_cost_a_derivation(pathlib.Path(directory))
+    print("✅ test_unknown_emails_cost_a_derivation")
+    test_concurrent_verifications_share_one_derivation()
+    print("✅ test_concurrent_verifications_share_one_derivation")
+    test_benchmark_reports_each_setting()
+    print("✅ test_benchmark_reports_each_setting")
@@ -0,0 +1,137 @@
+"""
+Tests for the SQLite user store and the migration from users.json
+Runs against temporary files; no server needed
+"""
+
+import json
+import sqlite3
+import tempfile
+import threading
+
+from conftest import FAST_HASHER
+from migrate_users import migrate
+from user_manager import UserManager, UserStore
+
+
+def test_signup_login_update_delete(tmp_path):
+    path = str(tmp_path / "users.db")
+    manager = UserManager(path, backend="sqlite", hasher=FAST_HASHER)
+    success, _, user = manager.signup("Ana@Example.com", "secret1", "AnaB", full_name="Ana")
+    assert success
+    assert manager.signup("ana@example.com", "secret1", "other")[1] == "Email already exists"
+    assert manager.signup("new@example.com", "secret1", "anab")[1] == "Username already exists"
+
+    success, _, logged_in = manager.login("ANA@EXAMPLE.COM", "secret1")
+    assert success and logged_in["last_login"] and "password_hash" not in logged_in
+    assert manager.update_user(user["id"], phone="555", is_active=False, email="x@example.com")[0]
+    assert manager.login("ana@example.com", "secret1")[1] == "Account is deactivated"
+    assert manager.update_user("missing", phone="1") == (False, "User not found")
+
+    stored = manager.get_user_by_email("ana@example.com")
+    assert stored["phone"] == "555" and stored["is_active"] is False
+    manager.close()
+
+    # Persisted, and the same shape as the JSON store returns
+    reopened = UserManager(path, backend="sqlite", hasher=FAST_HASHER)
+    assert reopened.get_all_users() == [stored]
+    assert reopened.delete_user(user["id"])[0]
+    assert reopened.delete_user(user["id"]) == (False, "User not found")
+    assert reopened.get_user_by_id(user["id"]) is None
+
+
+def test_lookups_use_indexes(tmp_path):
+    path = str(tmp_path / "users.db")
+    UserManager(path, backend="sqlite", hasher=FAST_HASHER).close()
+    connection = sqlite3.connect(path)
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    for column in ("id", "email_key", "username_key"):
+        plan = connection.execute(f"EXPLAIN QUERY PLAN SELECT * FROM users WHERE {column} = ?", ("x",)).fetchall()
+        assert "USING INDEX" in plan[0][-1], plan
+
+
+def test_threads_share_a_small_pool(tmp_path):
+    manager = UserManager(str(tmp_path / "users.db"), backend="sqlite", write_behind_interval=60, hasher=FAST_HASHER)
+    manager.store.close()
+    manager.store.pool_size = 2
+    opened = []
+    original_open = manager.store._open
+
+    def counting_open():
+        opened.append(threading.current_thread().name)
+        return original_open()
+
+    manager.store._open = counting_open
+    errors = []
+
+    def worker(number):
+        try:
+            for i in range(20):
+                name = f"t{number}u{i}"
+                assert manager.signup(f"{name}@example.com", "secret1", name)[0]
+                assert manager.login(f"{name}@example.com", "secret1")[0]
+        except Exception as e:  # surfaced by the main thread
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+    users = manager.get_all_users()
+    assert len(users) == 160 and all(user["last_login"] for user in users)
+    # Eight threads and 400 calls, never more than pool_size connections
+    assert 1 <= len(opened) <= 2 and manager.store._idle.qsize() == len(opened)
+    manager.close()
+    assert manager.store._idle.qsize() == 0
+
+
+def test_stores_implement_the_whole_interface():
+    class PartialStore(UserStore):
+        def get_by_id(self, user_id):
+            return None
+
+    try:
+        PartialStore()
+        assert False, "a store missing methods was instantiated"
+    except TypeError as e:
+        assert "get_by_email" in str(e)
+
+
+def test_migrate_from_json(tmp_path):
+    json_path = str(tmp_path / "users.json")
+    db_path = str(tmp_path / "users.db")
+    source = UserManager(json_path, hasher=FAST_HASHER)
+    for i in range(5):
+        source.signup(f"user{i}@example.com", "secret1", f"user{i}")
+    _, _, user = source.login("user1@example.com", "secret1")
+    source.delete_user(source.get_user_by_email("user4@example.com")["id"])
+    source.close()
+    # A legacy duplicate email, only in the log
+    with open(json_path + ".wal", "a") as f:
+        duplicate = dict(source.store.users_data["users"][0], id="legacy", username="legacy")
+        f.write(json.dumps({"op": "put", "user": duplicate}) + "\n")
+
+    imported, skipped = migrate(json_path, db_path)
+    assert imported == 4 and [user["id"] for user in skipped] == ["legacy"]
+    # Running it again changes nothing
+    assert migrate(json_path, db_path)[0] == 0
+
+    migrated = UserManager(db_path, backend="sqlite", hasher=FAST_HASHER)
+    assert migrated.get_all_users() == UserManager(json_path, hasher=FAST_HASHER).get_all_users()[:4]
+    assert migrated.get_user_by_id(user["id"])["last_login"] == user["last_login"]
+    assert migrated.login("user3@example.com", "secret1")[0]
+
+
+if __name__ == "__main__":
+    import pathlib
+
+    print("🧪 Testing SQLite user store")
+    print("=" * 50)
+    for test in [test_signup_login_update_delete, test_lookups_use_indexes,
+                 test_threads_share_a_small_pool, test_migrate_from_json]:
+        with tempfile.TemporaryDirectory() as directory:
+            test(pathlib.Path(directory))
+        print(f"✅ {test.__name__}")
+    test_stores_implement_the_whole_interface()
+    print("✅ test_stores_implement_the_whole_interface")
@@ -0,0 +1,143 @@
+"""
+Stress tests for UserManager under concurrent threads and processes
+Runs against temporary files; no server needed
+"""
+
+import json
+import multiprocessing
+import random
+import tempfile
+import threading
+
+from conftest import FAST_HASHER, assert_indexes_consistent
+from user_manager import ReadWriteLock, UserManager
+
+THREADS = 16
+OPERATIONS = 60
+
+
+def _hammer(manager, worker, signed_up, phones, errors):
+    rng = random.Random(worker)
+    mine = []
+    try:
+        for step in range(OPERATIONS):
+            action = rng.random()
+            if action < 0.4 or not mine:
+                # Every fourth signup races the other threads for the same email
+                name = f"shared{step}" if step % 4 == 0 else f"w{worker}u{step}"
+                success, message, user = manager.signup(f"{name}@example.com", "secret1", name)
+                if success:
+                    mine.append(user)
+                    signed_up.append(user["id"])
+                else:
+                    assert message in ("Email already exists", "Username already exists"), message
+            elif action < 0.7:
+                user = rng.choice(mine)
+                assert manager.login(user["email"], "secret1")[0]
+            else:
+                user = rng.choice(mine)
+                phone = f"{worker}-{step}"
+                assert manager.update_user(user["id"], phone=phone)[0]
+                phones[user["id"]] = phone
+    except Exception as e:  # surfaced by the main thread
+        errors.append(e)
+
+
+def test_threads_lose_no_writes(tmp_path):
+    path = str(tmp_path / "users.json")
+    manager = UserManager(path, compact_every=50, hasher=FAST_HASHER)
+    signed_up, phones, errors = [], {}, []
+    threads = [threading.Thread(target=_hammer, args=(manager, worker, signed_up, phones, errors))
+               for worker in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+
+    # Each contested email was won by exactly one thread
+    assert len(signed_up) == len(set(signed_up)) == len(manager.store.users_data["users"])
+    assert_indexes_consistent(manager)
+    for user_id, phone in phones.items():
+        assert manager.get_user_by_id(user_id)["phone"] == phone
+
+    # The files hold exactly what the threads were told was saved
+    manager.close()
+    with open(path) as f:
+        json.load(f)
+    reloaded = UserManager(path, hasher=FAST_HASHER)
+    assert reloaded.store.users_data == manager.store.users_data
+    assert_indexes_consistent(reloaded)
+
+
+def _signup_many(path, worker, count):
+    manager = UserManager(path, compact_every=7, hasher=FAST_HASHER)
+    for i in range(count):
+        assert manager.signup(f"p{worker}u{i}@example.com", "secret1", f"p{worker}u{i}")[0]
+        # A contested signup only one process may win
+        manager.signup(f"shared{i}@example.com", "secret1", f"shared{i}")
+    manager.close()
+
+
+def test_processes_share_one_file(tmp_path):
+    path = str(tmp_path / "users.json")
+    observer = UserManager(path, hasher=FAST_HASHER)
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_signup_many, args=(path, worker, 20)) for worker in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    users = UserManager(path, hasher=FAST_HASHER).get_all_users()
+    assert len(users) == 3 * 20 + 20
+    assert len({user["email"] for user in users}) == len(users)
+    # A manager opened before the other processes wrote picks their users up
+    assert observer.get_user_by_email("p2u19@example.com")["username"] == "p2u19"
+    assert len(observer.get_all_users()) == len(users)
+    assert_indexes_consistent(observer)
+
+
+def test_read_write_lock_excludes_writers():
+    lock = ReadWriteLock()
+    state = {"readers": 0, "writers": 0, "violations": 0}
+    guard = threading.Lock()
+
+    def reader():
+        for _ in range(200):
+            with lock.read():
+                with guard:
+                    state["readers"] += 1
+                    state["violations"] += state["writers"] != 0
+                with guard:
+                    state["readers"] -= 1
+
+    def writer():
+        for _ in range(200):
+            with lock.write():
+                with guard:
+                    state["writers"] += 1
+                    state["violations"] += state["writers"] != 1 or state["readers"] != 0
+                with guard:
+                    state["writers"] -= 1
+
+    threads = [threading.Thread(target=reader) for _ in range(4)] + [threading.Thread(target=writer) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert state["violations"] == 0
+
+
+if __name__ == "__main__":
+    import pathlib
+
+    print("🧪 Testing concurrent user access")
+    print("=" * 50)
+    for test in [test_threads_lose_no_writes, test_processes_share_one_file]:
+        with tempfile.TemporaryDirectory() as directory:
+            test(pathlib.Path(directory))
+        print(f"✅ {test.__name__}")
+    test_read_write_lock_excludes_writers()
+    print("✅ test_read_write_lock_excludes_writers")
@@ -0,0 +1,94 @@
+"""
+Tests for the UserManager id/email/username indexes
+Runs against a temporary users file; no server needed
+"""
+
+import json
+import random
+import tempfile
+
+from conftest import FAST_HASHER, assert_indexes_consistent
+from user_manager import UserManager
+
+
+def test_lookups_and_uniqueness(tmp_path):
+    manager = UserManager(str(tmp_path / "users.json"), hasher=FAST_HASHER)
+    success, _, user = manager.signup("Ana@Example.com", "secret1", "AnaB")
+    assert success
+
+    assert manager.get_user_by_email("ANA@example.COM")["id"] == user["id"]
+    assert manager.get_user_by_id(user["id"])["username"] == "AnaB"
+    assert "password_hash" not in manager.get_user_by_id(user["id"])
+    assert manager.signup("ana@example.com", "secret1", "other")[1] == "Email already exists"
+    assert manager.signup("new@example.com", "secret1", "anab")[1] == "Username already exists"
+    assert manager.login("ANA@EXAMPLE.COM", "secret1")[0]
+
+    assert manager.delete_user(user["id"])[0]
+    assert manager.get_user_by_email("ana@example.com") is None
+    assert manager.get_user_by_id(user["id"]) is None
+    assert manager.signup("ana@example.com", "secret1", "anab")[0]
+    assert_indexes_consistent(manager)
+
+
+def test_indexes_stay_consistent_through_random_mutations(tmp_path):
+    path = str(tmp_path / "users.json")
+    manager = UserManager(path, hasher=FAST_HASHER)
+    rng = random.Random(0)
+    for step in range(300):
+        action = rng.random()
+        users = manager.store.users_data["users"]
+        if action < 0.6 or not users:
+            number = rng.randrange(100)
+            manager.signup(f"user{number}@example.com", "secret1", f"User{number}")
+        elif action < 0.8:
+            manager.update_user(rng.choice(users)["id"], full_name=f"Name {step}", is_active=rng.random() < 0.9)
+        else:
+            manager.delete_user(rng.choice(users)["id"])
+        assert_indexes_consistent(manager)
+
+    # Indexes rebuilt from the saved file match the live ones
+    reloaded = UserManager(path, hasher=FAST_HASHER)
+    assert_indexes_consistent(reloaded)
+    assert set(reloaded.store._users_by_id) == set(manager.store._users_by_id)
+
+
+def test_legacy_duplicates_keep_first_match(tmp_path):
+    path = str(tmp_path / "users.json")
+    users = [
+        {"id": "1", "email": "Dup@Example.com", "username": "first", "password_hash": "x:y", "is_active": True},
+        {"id": "2", "email": "dup@example.com", "username": "second", "password_hash": "x:y", "is_active": True},
+        {"id": "3", "email": "DUP@example.com", "username": "third", "password_hash": "x:y", "is_active": True},
+        {"id": "4", "email": "dup@example.com", "username": "fourth", "password_hash": "x:y", "is_active": True},
+    ]
+    with open(path, "w") as f:
+        json.dump({"users": users}, f)
+
+    manager = UserManager(path, hasher=FAST_HASHER)
+    assert manager.get_user_by_email("dup@example.com")["id"] == "1"
+    assert_indexes_consistent(manager)
+    # Updates that keep the email keep the slot
+    assert manager.update_user("1", full_name="First")[0]
+    assert manager.get_user_by_email("dup@example.com")["id"] == "1"
+    # Removing a waiting duplicate does not disturb the slot
+    assert manager.delete_user("2")[0]
+    assert manager.get_user_by_email("dup@example.com")["id"] == "1"
+    # Deleting the indexed user, or moving it to another email, exposes the next duplicate
+    assert manager.delete_user("1")[0]
+    assert manager.get_user_by_email("dup@example.com")["id"] == "3"
+    assert manager.store.update("3", {"email": "three@example.com"})
+    assert manager.get_user_by_email("dup@example.com")["id"] == "4"
+    assert manager.get_user_by_email("three@example.com")["id"] == "3"
+    assert_indexes_consistent(manager)
+    assert [user["id"] for user in manager.get_all_users()] == ["3", "4"]
+
+
+if __name__ == "__main__":
+    import pathlib
+
+    print("🧪 Testing user indexes")
+    print("=" * 50)
+    for test in [test_lookups_and_uniqueness, test_indexes_stay_consistent_through_random_mutations,
+                 test_legacy_duplicates_keep_first_match]:
+        with tempfile.TemporaryDirectory() as directory:
+            test(pathlib.Path(directory))
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,116 @@
+"""
+Tests for UserManager's write-ahead log and snapshot persistence
+Runs against temporary files; no server needed
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from conftest import FAST_HASHER
+from user_manager import UserLog, UserManager
+
+
+def _log_lines(path):
+    with open(path + ".wal") as f:
+        return f.readlines()
+
+
+def test_mutations_append_to_log_and_replay(tmp_path):
+    path = str(tmp_path / "users.json")
+    manager = UserManager(path, hasher=FAST_HASHER)
+    _, _, ana = manager.signup("ana@example.com", "secret1", "ana")
+    _, _, bob = manager.signup("bob@example.com", "secret1", "bob")
+    assert not os.path.exists(path)
+
+    assert manager.login("ana@example.com", "secret1")[0]
+    manager.update_user(bob["id"], full_name="Bob B")
+    manager.delete_user(ana["id"])
+    # One small record per mutation, no snapshot rewrite
+    assert len(_log_lines(path)) == 5
+    assert not os.path.exists(path)
+
+    reloaded = UserManager(path, hasher=FAST_HASHER)
+    assert reloaded.store.users_data == manager.store.users_data
+    assert reloaded.get_user_by_email("ana@example.com") is None
+    assert reloaded.get_user_by_id(bob["id"])["full_name"] == "Bob B"
+
+
+def test_compaction_writes_snapshot_and_empties_log(tmp_path):
+    path = str(tmp_path / "users.json")
+    manager = UserManager(path, compact_every=3, hasher=FAST_HASHER)
+    for i in range(4):
+        manager.signup(f"user{i}@example.com", "secret1", f"user{i}")
+
+    with open(path) as f:
+        snapshot = json.load(f)
+    assert [user["username"] for user in snapshot["users"]] == ["user0", "user1", "user2"]
+    assert len(_log_lines(path)) == 1
+    assert not os.path.exists(path + ".tmp")
+    assert UserManager(path, hasher=FAST_HASHER).store.users_data == manager.store.users_data
+
+
+def test_recovers_from_crashes(tmp_path):
+    path = str(tmp_path / "users.json")
+    manager = UserManager(path, hasher=FAST_HASHER)
+    _, _, ana = manager.signup("ana@example.com", "secret1", "ana")
+    manager.signup("bob@example.com", "secret1", "bob")
+    manager.update_user(ana["id"], phone="555")
+    expected = manager.store.users_data
+    manager.store.close()
+
+    # Crash after the snapshot was renamed into place but before the log was truncated
+    UserLog(path).compact(expected)
+    with open(path + ".wal", "w") as f:
+        for user in expected["users"]:
+            f.write(json.dumps({"op": "put", "user": user}) + "\n")
+        # ...with a torn final append
+        f.write('{"op": "put", "user": {"id"')
+    recovered = UserManager(path, hasher=FAST_HASHER)
+    assert recovered.store.users_data == expected
+
+    # The next append cuts the torn record instead of gluing onto it
+    assert recovered.signup("cy@example.com", "secret1", "cy")[0]
+    recovered.close()
+    assert UserManager(path, hasher=FAST_HASHER).store.users_data == recovered.store.users_data
+
+
+def test_write_behind_batches_last_login(tmp_path):
+    path = str(tmp_path / "users.json")
+    manager = UserManager(path, write_behind_interval=60, write_behind_max_dirty=3, hasher=FAST_HASHER)
+    users = [manager.signup(f"user{i}@example.com", "secret1", f"user{i}")[2] for i in range(3)]
+    # Signups are durable before they return
+    assert len(_log_lines(path)) == 3
+
+    for _ in range(5):
+        assert manager.login("user0@example.com", "secret1")[0]
+    assert manager.login("user1@example.com", "secret1")[0]
+    assert len(_log_lines(path)) == 3
+
+    # A third dirty user reaches the threshold and wakes the flusher
+    manager.login("user2@example.com", "secret1")
+    deadline = time.monotonic() + 5
+    while len(_log_lines(path)) == 3:
+        assert time.monotonic() < deadline, "write-behind flush did not run"
+        time.sleep(0.01)
+    patches = [json.loads(line) for line in _log_lines(path)[3:]]
+    assert sorted(patch["id"] for patch in patches) == sorted(user["id"] for user in users)
+
+    # Shutdown flushes what is still pending
+    manager.login("user0@example.com", "secret1")
+    last_login = manager.get_user_by_id(users[0]["id"])["last_login"]
+    manager.close()
+    assert UserManager(path, hasher=FAST_HASHER).get_user_by_id(users[0]["id"])["last_login"] == last_login
+
+
+if __name__ == "__main__":
+    import pathlib
+
+    print("🧪 Testing user persistence")
+    print("=" * 50)
+    for test in [test_mutations_append_to_log_and_replay, test_compaction_writes_snapshot_and_empties_log,
+                 test_recovers_from_crashes, test_write_behind_batches_last_login]:
+        with tempfile.TemporaryDirectory() as directory:
+            test(pathlib.Path(directory))
+        print(f"✅ {test.__name__}")
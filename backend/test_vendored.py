@@ -0,0 +1,27 @@
+"""
+Checks that modules vendored from server/ still match their source
+The backend and the model service deploy separately, so each carries its
+own copy; the copies here start with one comment line naming the source
+"""
+
+import os
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server')
+VENDORED = ['metrics.py', 'profiling.py']
+
+
+def test_vendored_modules_match_server():
+    for name in VENDORED:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name)) as f:
+            note, vendored = f.read().split('\n', 1)
+        with open(os.path.join(SERVER_DIR, name)) as f:
+            source = f.read()
+        assert note.startswith(f'# Vendored copy of server/{name}'), name
+        assert vendored == source, f"backend/{name} differs from server/{name}; copy it over again"
+
+
+if __name__ == "__main__":
+    print("🧪 Testing vendored modules")
+    print("=" * 50)
+    test_vendored_modules_match_server()
+    print("✅ test_vendored_modules_match_server")
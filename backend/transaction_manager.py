@@ -9,6 +9,8 @@ from datetime import datetime
 from typing import Dict, List, Optional
 import uuid
 from bson import ObjectId
+from metrics import stage_seconds
+from profiling import stage
 
 class TransactionManager:
     def __init__(self):
@@ -102,7 +104,8 @@ class TransactionManager:
             }
             
             # Insert transaction into MongoDB
-            result = self.transactions_collection.insert_one(transaction)
+            with stage_seconds.time('mongo_insert_one'), stage('db_write'):
+                result = self.transactions_collection.insert_one(transaction)
             
             # Return the created transaction with MongoDB ID
             transaction['_id'] = str(result.inserted_id)
@@ -134,18 +137,21 @@ class TransactionManager:
         """
         try:
             # Query transactions for the user, sorted by newest first
-            cursor = self.transactions_collection.find(
-                {'user_email': user_email}
-            ).sort('created_at', -1).skip(skip).limit(limit)
-            
-            transactions = []
-            for doc in cursor:
-                # Convert ObjectId to string for JSON serialization
-                doc['_id'] = str(doc['_id'])
-                transactions.append(doc)
+            # The cursor is lazy, so the timer covers iterating it
+            with stage_seconds.time('mongo_find'):
+                cursor = self.transactions_collection.find(
+                    {'user_email': user_email}
+                ).sort('created_at', -1).skip(skip).limit(limit)
+                
+                transactions = []
+                for doc in cursor:
+                    # Convert ObjectId to string for JSON serialization
+                    doc['_id'] = str(doc['_id'])
+                    transactions.append(doc)
             
             # Get total count for pagination
-            total_count = self.transactions_collection.count_documents({'user_email': user_email})
+            with stage_seconds.time('mongo_count_documents'):
+                total_count = self.transactions_collection.count_documents({'user_email': user_email})
             
             return {
                 'success': True,
@@ -221,7 +227,8 @@ class TransactionManager:
                 }}
             ]
             
-            result = list(self.transactions_collection.aggregate(pipeline))
+            with stage_seconds.time('mongo_aggregate'):
+                result = list(self.transactions_collection.aggregate(pipeline))
             
             if result:
                 stats = result[0]
@@ -287,13 +294,14 @@ class TransactionManager:
         """
         try:
             # Find transaction by ID and user email
-            transaction = self.transactions_collection.find_one({
-                '$or': [
-                    {'_id': ObjectId(transaction_id)},
-                    {'transaction_id': transaction_id}
-                ],
-                'user_email': user_email
-            })
+            with stage_seconds.time('mongo_find_one'):
+                transaction = self.transactions_collection.find_one({
+                    '$or': [
+                        {'_id': ObjectId(transaction_id)},
+                        {'transaction_id': transaction_id}
+                    ],
+                    'user_email': user_email
+                })
             
             if transaction:
                 transaction['_id'] = str(transaction['_id'])
@@ -326,13 +334,14 @@ class TransactionManager:
             Dictionary with success status
         """
         try:
-            result = self.transactions_collection.delete_one({
-                '$or': [
-                    {'_id': ObjectId(transaction_id)},
-                    {'transaction_id': transaction_id}
-                ],
-                'user_email': user_email
-            })
+            with stage_seconds.time('mongo_delete_one'):
+                result = self.transactions_collection.delete_one({
+                    '$or': [
+                        {'_id': ObjectId(transaction_id)},
+                        {'transaction_id': transaction_id}
+                    ],
+                    'user_email': user_email
+                })
             
             if result.deleted_count > 0:
                 return {
@@ -1,61 +1,1006 @@
 """
 User Management System
-Handles user registration, login, and data storage in JSON file
+Handles user registration, login, and data storage in a JSON snapshot plus
+an append-only write-ahead log, or in SQLite
 """
 
+import atexit
 import json
-import hashlib
 import os
+import queue
+import secrets
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 import uuid
 
+from metrics import stage_seconds
+from passwords import PasswordHasher
+from profiling import stage
 
-class UserManager:
-    def __init__(self, users_file: str = "users.json"):
+try:
+    import fcntl
+except ImportError:
+    # Windows: no cross-process locking, run a single worker process
+    fcntl = None
+
+
+class ReadWriteLock:
+    """
+    Many readers or one writer; not reentrant
+    
+    Writers are preferred: once a writer waits, new readers queue behind
+    it, so a steady stream of lookups cannot starve signups.
+    """
+    
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+    
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+    
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class LogCommit:
+    """Records queued for the log writer; wait() returns whether they reached the disk"""
+    
+    def __init__(self, records: List[Dict]):
+        self.records = records
+        self.data = ''.join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode('utf-8')
+        self.ok = False
+        self.done = threading.Event()
+    
+    def wait(self) -> bool:
+        self.done.wait()
+        return self.ok
+
+
+class UserLog:
+    """
+    Log-structured persistence for users
+    
+    Every mutation is appended to a write-ahead log (users.json.wal, one
+    JSON record per line), so a write costs one small append regardless of
+    the number of users. Appends are made by a single writer thread, which
+    commits everything queued since its last fsync with one fsync. Once the
+    log holds compact_every records it is folded into the snapshot
+    (users.json, same format as before): the snapshot is written to a
+    temporary file, fsynced and renamed over the old one, then the log is
+    truncated. Startup loads the snapshot and replays the log on top;
+    replaying is idempotent, so a crash between the rename and the truncate
+    loses nothing.
+    
+    Worker processes sharing the files coordinate with flock on
+    users.json.lock: appends and compactions hold it exclusively, reads
+    shared. Each process tracks how far into the log it has applied, so it
+    can pick up the records of the others.
+    """
+    
+    def __init__(self, snapshot_file: str, compact_every: int = 1000, fsync: bool = True):
         """
-        Initialize the user management system
+        Args:
+            snapshot_file: Path of the JSON snapshot; the log and lock file sit next to it
+            compact_every: Log records that trigger a compaction
+            fsync: Flush every commit to disk before acknowledging it
+        """
+        self.snapshot_file = snapshot_file
+        self.log_file = snapshot_file + ".wal"
+        self.lock_file = snapshot_file + ".lock"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.log_records = 0
+        # Log bytes reflected in memory, and the snapshot they apply to
+        self.offset = 0
+        self.snapshot_id = None
+        # Called by the writer thread once the log is long; set by the owner
+        self.compactor = None
+        self._pid = None
+        self._reset()
+    
+    def _reset(self):
+        """Per-process state; a forked child starts over with its own"""
+        self._pid = os.getpid()
+        self._file_lock = threading.Lock()
+        self._lock_fd = None
+        self._log = None
+        self._queue = queue.Queue()
+        self._writer = None
+        self._closed = False
+        # Commits queued but not yet written
+        self._inflight = []
+        # Byte ranges we appended past self.offset, already applied in memory
+        self._own = []
+    
+    @contextmanager
+    def locked(self, exclusive: bool):
+        """Hold the files against this process's other threads and, with flock, other processes"""
+        if self._pid != os.getpid():
+            self._reset()
+        with self._file_lock:
+            if fcntl is None:
+                yield
+                return
+            if self._lock_fd is None:
+                self._lock_fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+    
+    def _snapshot_identity(self):
+        try:
+            st = os.stat(self.snapshot_file)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+    
+    def changed(self) -> Optional[str]:
+        """
+        How the files moved on since this process last read them
+        
+        Returns:
+            'reload' if the snapshot was replaced or the log truncated
+            (another process compacted), 'append' if the log grew, else None
+        """
+        if self._snapshot_identity() != self.snapshot_id:
+            return 'reload'
+        try:
+            size = os.path.getsize(self.log_file)
+        except FileNotFoundError:
+            size = 0
+        if size < self.offset:
+            return 'reload'
+        return 'append' if size > self.offset else None
+    
+    def load(self) -> Dict:
+        """Snapshot with the log replayed on top of it"""
+        with self.locked(exclusive=False):
+            return self.load_locked()
+    
+    def load_locked(self) -> Dict:
+        """load() for callers holding locked()"""
+        users_data = {"users": []}
+        self.snapshot_id = self._snapshot_identity()
+        if self.snapshot_id is not None:
+            try:
+                with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                    users_data = json.load(f)
+            except json.JSONDecodeError as e:
+                print(f"Error reading {self.snapshot_file}: {e}")
         
+        users = users_data.setdefault("users", [])
+        positions = {user["id"]: i for i, user in enumerate(users)}
+        self.offset = 0
+        self.log_records = 0
+        self._own = []
+        for record in self.read_new():
+            if record["op"] == "put":
+                user = record["user"]
+                if user["id"] in positions:
+                    users[positions[user["id"]]] = user
+                else:
+                    positions[user["id"]] = len(users)
+                    users.append(user)
+            elif record["op"] == "patch" and record["id"] in positions:
+                users[positions[record["id"]]].update(record["fields"])
+            elif record["op"] == "delete" and record["id"] in positions:
+                users[positions.pop(record["id"])] = None
+        users_data["users"] = [user for user in users if user is not None]
+        return users_data
+    
+    def read_new(self) -> Iterator[Dict]:
+        """Log records past self.offset not written by us, advancing it; call holding locked()"""
+        try:
+            f = open(self.log_file, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A torn final append from a crash; nothing after it was acknowledged
+                    print(f"Ignoring incomplete record at the end of {self.log_file}")
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Ignoring unreadable record at the end of {self.log_file}")
+                    break
+                position = self.offset
+                self.offset += len(line)
+                self.log_records += 1
+                if not any(start <= position < end for start, end in self._own):
+                    yield record
+        self._own = [(start, end) for start, end in self._own if end > self.offset]
+    
+    def pending(self) -> List[Dict]:
+        """Records submitted but not yet in the log, oldest first; call holding locked()"""
+        return [record for commit in list(self._inflight) for record in commit.records]
+    
+    def submit(self, records: List[Dict]) -> LogCommit:
+        """Queue mutations for the writer thread; the returned commit tells when they are durable"""
+        commit = LogCommit(records)
+        if self._pid != os.getpid():
+            self._reset()
+        with self._file_lock:
+            if self._closed:
+                # Shutting down: write in the caller's thread instead
+                self._inflight.append(commit)
+                closed = True
+            else:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="user-log-writer", daemon=True)
+                    self._writer.start()
+                self._inflight.append(commit)
+                self._queue.put(commit)
+                closed = False
+        if closed:
+            self._commit([commit])
+        return commit
+    
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            commits = [commit for commit in batch if commit is not None]
+            if commits:
+                self._commit(commits)
+                if self.log_records >= self.compact_every and self.compactor is not None:
+                    # The records are already durable; a failed compaction is retried next time
+                    self.compactor()
+            if len(commits) < len(batch):
+                return
+    
+    def _commit(self, commits: List[LogCommit]):
+        """Append queued commits with a single fsync and wake their waiters"""
+        ok = False
+        try:
+            with self.locked(exclusive=True):
+                # Written or failed, they are no longer pending once the lock is released
+                self._inflight = [commit for commit in self._inflight if commit not in commits]
+                self.append_locked(b''.join(commit.data for commit in commits),
+                                   sum(len(commit.records) for commit in commits))
+            ok = True
+        except OSError as e:
+            print(f"Error appending to {self.log_file}: {e}")
+            with self._file_lock:
+                self._inflight = [commit for commit in self._inflight if commit not in commits]
+        for commit in commits:
+            commit.ok = ok
+            commit.done.set()
+    
+    def append_locked(self, data: bytes, count: int):
+        """Durably append serialized records; call holding locked(exclusive=True)"""
+        with stage_seconds.time('user_log_append'):
+            if self._log is None:
+                self._log = open(self.log_file, 'ab')
+            start = self._repair_tail(self._log.seek(0, os.SEEK_END))
+            self._log.write(data)
+            self._log.flush()
+            if self.fsync:
+                os.fsync(self._log.fileno())
+        if self.offset == start:
+            self.offset = start + len(data)
+        else:
+            # Other processes wrote since we last read; skip our own records when catching up
+            self._own.append((start, start + len(data)))
+        self.log_records += count
+    
+    def _repair_tail(self, size: int) -> int:
+        """Cut a torn final record left by a crash, so the next record starts on its own line"""
+        if size == 0:
+            return 0
+        with open(self.log_file, 'rb') as f:
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return size
+            f.seek(0)
+            size = f.read().rfind(b"\n") + 1
+        print(f"Truncating incomplete record at the end of {self.log_file}")
+        self._log.truncate(size)
+        self._log.seek(size)
+        return size
+    
+    def compact(self, users_data: Dict) -> bool:
+        """Write users_data as the new snapshot atomically and empty the log"""
+        with self.locked(exclusive=True):
+            return self.compact_locked(users_data)
+    
+    def compact_locked(self, users_data: Dict) -> bool:
+        """compact() for callers holding locked(exclusive=True)"""
+        try:
+            with stage_seconds.time('user_snapshot'):
+                _write_atomic(self.snapshot_file, users_data, self.fsync)
+                with open(self.log_file, 'wb') as f:
+                    if self.fsync:
+                        os.fsync(f.fileno())
+            self.snapshot_id = self._snapshot_identity()
+            self.offset = 0
+            self.log_records = 0
+            self._own = []
+            return True
+        except OSError as e:
+            print(f"Error compacting {self.snapshot_file}: {e}")
+            return False
+    
+    def close(self):
+        """Write what is queued, stop the writer thread and close the files"""
+        with self._file_lock:
+            self._closed = True
+            writer, self._writer = self._writer, None
+        if writer is not None and self._pid == os.getpid():
+            self._queue.put(None)
+            writer.join()
+        with self._file_lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+
+def _write_atomic(path: str, data: Dict, fsync: bool = True):
+    """Replace path with data as JSON, so readers see the old or new file, never a partial one"""
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(temporary, path)
+    if fsync and hasattr(os, 'O_DIRECTORY'):
+        # Persist the rename itself
+        directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+
+class UserStore(ABC):
+    """
+    Where UserManager keeps its users
+    
+    Implementations are safe to share between threads. Users are plain
+    dicts including password_hash; lookups return copies and match email
+    and username case-insensitively.
+    """
+    
+    @abstractmethod
+    def get_by_id(self, user_id: str) -> Optional[Dict]:
+        """The user with this id, or None"""
+    
+    @abstractmethod
+    def get_by_email(self, email: str) -> Optional[Dict]:
+        """The user with this email, or None"""
+    
+    @abstractmethod
+    def get_by_username(self, username: str) -> Optional[Dict]:
+        """The user with this username, or None"""
+    
+    @abstractmethod
+    def all(self) -> List[Dict]:
+        """Every user, in signup order"""
+    
+    @abstractmethod
+    def insert(self, user: Dict) -> Optional[str]:
+        """
+        Durably add a user unless its email or username is taken
+        
+        Returns:
+            None once stored, else why not: "Email already exists",
+            "Username already exists" or "Failed to save user data"
+        """
+    
+    @abstractmethod
+    def update(self, user_id: str, fields: Dict) -> Optional[bool]:
+        """Durably set fields of a user; None if there is no such user, else whether it was saved"""
+    
+    @abstractmethod
+    def patch_many(self, updates: Dict[str, Dict]) -> bool:
+        """Set fields of several users ({user id: fields}) in one write, skipping users that are gone"""
+    
+    @abstractmethod
+    def delete(self, user_id: str) -> Optional[bool]:
+        """Durably remove a user; None if there is no such user, else whether it was saved"""
+    
+    def close(self):
+        """Release files, connections and threads; the default has none"""
+
+
+class JsonUserStore(UserStore):
+    """
+    Users held in memory with hash indexes and persisted through a UserLog
+    
+    Lookups take a read lock, mutations the write lock, and neither holds
+    it while waiting for the disk. Several processes may share one users
+    file; each applies the others' changes before serving a call, and
+    inserts check uniqueness under the exclusive file lock.
+    """
+    
+    def __init__(self, users_file: str = "users.json", compact_every: int = 1000):
+        """
         Args:
-            users_file: Path to the JSON file storing user data
+            users_file: Path to the JSON snapshot storing user data
+            compact_every: Logged mutations between snapshot rewrites
         """
         self.users_file = users_file
-        self.users_data = self._load_users()
+        # Guards the users and their indexes; always taken before the log's lock
+        self._lock = ReadWriteLock()
+        self.log = UserLog(users_file, compact_every)
+        self.log.compactor = self.compact
+        self._build_indexes(self.log.load())
+    
+    @property
+    def users_data(self) -> Dict:
+        """All users as stored in the snapshot: {"users": [...]} in signup order"""
+        return {"users": list(self._users_by_id.values())}
+    
+    def _build_indexes(self, users_data: Dict):
+        """Index users by id, lowercased email and lowercased username
+        
+        _users_by_id holds every user in signup order and is the one copy of
+        them; the other indexes point at the same dicts, so in-place field
+        updates are visible through them. Where legacy data has duplicates,
+        the first user wins, as with the old linear scans, and the others
+        wait in _shadowed to take over the slot if it frees up.
+        """
+        self._users_by_id = {}
+        self._users_by_email = {}
+        self._users_by_username = {}
+        # (field, key) -> later users with the same key, in signup order
+        self._shadowed = {}
+        for user in users_data["users"]:
+            if user["id"] not in self._users_by_id:
+                self._users_by_id[user["id"]] = user
+                self._index_user(user)
+    
+    def _keys(self, user: Dict):
+        """(index, field, key) of each unique field of a user"""
+        return ((self._users_by_email, "email", user["email"].lower()),
+                (self._users_by_username, "username", user["username"].lower()))
+    
+    def _index_user(self, user: Dict):
+        for index, field, key in self._keys(user):
+            if index.setdefault(key, user) is not user:
+                self._shadowed.setdefault((field, key), []).append(user)
+    
+    def _unindex_user(self, user: Dict):
+        for index, field, key in self._keys(user):
+            waiting = self._shadowed.get((field, key))
+            if index.get(key) is user:
+                if waiting:
+                    # A legacy duplicate of the email or username takes over
+                    index[key] = waiting.pop(0)
+                else:
+                    del index[key]
+            elif waiting:
+                waiting[:] = [other for other in waiting if other is not user]
+            if waiting is not None and not waiting:
+                del self._shadowed[(field, key)]
+    
+    def _replace_fields(self, user: Dict, fields: Dict, clear: bool = False):
+        """Change a user in place, re-indexing only if its email or username changes"""
+        keys = [key for _, _, key in self._keys(user)]
+        updated = dict(fields) if clear else dict(user, **fields)
+        rekey = keys != [updated["email"].lower(), updated["username"].lower()]
+        if rekey:
+            self._unindex_user(user)
+        if clear:
+            user.clear()
+        user.update(fields)
+        if rekey:
+            self._index_user(user)
+    
+    def _remove_user(self, user: Dict):
+        del self._users_by_id[user["id"]]
+        self._unindex_user(user)
+    
+    def _apply_record(self, record: Dict):
+        """Apply a log record to the in-memory users and indexes"""
+        if record["op"] == "put":
+            user = self._users_by_id.get(record["user"]["id"])
+            if user is None:
+                user = dict(record["user"])
+                self._users_by_id[user["id"]] = user
+                self._index_user(user)
+            else:
+                # In place, so references held by other threads stay current
+                self._replace_fields(user, record["user"], clear=True)
+        elif record["op"] == "patch" and record["id"] in self._users_by_id:
+            self._replace_fields(self._users_by_id[record["id"]], record["fields"])
+        elif record["op"] == "delete" and record["id"] in self._users_by_id:
+            self._remove_user(self._users_by_id[record["id"]])
+    
+    def _catch_up_locked(self):
+        """Apply other processes' changes; call holding the write lock and the log's lock"""
+        state = self.log.changed()
+        if state is None:
+            return
+        if state == 'reload':
+            self._build_indexes(self.log.load_locked())
+        else:
+            for record in self.log.read_new():
+                self._apply_record(record)
+        # Our queued mutations land in the log after what we just read
+        for record in self.log.pending():
+            self._apply_record(record)
+    
+    def _refresh(self):
+        """Pick up changes other processes made to the users file"""
+        if self.log.changed() is None:
+            return
+        with self._lock.write():
+            with self.log.locked(exclusive=False):
+                self._catch_up_locked()
+    
+    def compact(self) -> bool:
+        """Write all users to the snapshot now, emptying the log"""
+        with self._lock.write():
+            with self.log.locked(exclusive=True):
+                # Other processes' records are in the log about to be emptied
+                self._catch_up_locked()
+                return self.log.compact_locked(self.users_data)
     
-    def _load_users(self) -> Dict:
-        """Load users from JSON file"""
-        if os.path.exists(self.users_file):
+    def _wait(self, commit: Optional[LogCommit]) -> bool:
+        """Wait for a queued mutation to be durable; call without holding the lock"""
+        if commit is None:
+            return True
+        with stage('db_write'):
+            return commit.wait()
+    
+    def get_by_id(self, user_id: str) -> Optional[Dict]:
+        self._refresh()
+        with self._lock.read():
+            user = self._users_by_id.get(user_id)
+            return None if user is None else user.copy()
+    
+    def get_by_email(self, email: str) -> Optional[Dict]:
+        self._refresh()
+        with self._lock.read():
+            user = self._users_by_email.get(email.lower())
+            return None if user is None else user.copy()
+    
+    def get_by_username(self, username: str) -> Optional[Dict]:
+        self._refresh()
+        with self._lock.read():
+            user = self._users_by_username.get(username.lower())
+            return None if user is None else user.copy()
+    
+    def all(self) -> List[Dict]:
+        self._refresh()
+        with self._lock.read():
+            return [user.copy() for user in self._users_by_id.values()]
+    
+    def insert(self, user: Dict) -> Optional[str]:
+        user = dict(user)
+        data = (json.dumps({"op": "put", "user": user}, ensure_ascii=False) + "\n").encode('utf-8')
+        
+        # The duplicate check and the append happen under the exclusive file
+        # lock, so two worker processes cannot register the same email
+        with self._lock.write(), stage('db_write'), self.log.locked(exclusive=True):
+            self._catch_up_locked()
+            if user["email"].lower() in self._users_by_email:
+                return "Email already exists"
+            if user["username"].lower() in self._users_by_username:
+                return "Username already exists"
+            
+            try:
+                self.log.append_locked(data, 1)
+            except OSError as e:
+                print(f"Error appending to {self.log.log_file}: {e}")
+                return "Failed to save user data"
+            self._users_by_id[user["id"]] = user
+            self._index_user(user)
+        
+        if self.log.log_records >= self.log.compact_every:
+            # The user is already durable; a failed compaction is retried next time
+            self.compact()
+        return None
+    
+    def update(self, user_id: str, fields: Dict) -> Optional[bool]:
+        self._refresh()
+        with self._lock.write():
+            user = self._users_by_id.get(user_id)
+            if user is None:
+                return None
+            self._replace_fields(user, fields)
+            commit = self.log.submit([{"op": "put", "user": dict(user)}])
+        return self._wait(commit)
+    
+    def patch_many(self, updates: Dict[str, Dict]) -> bool:
+        self._refresh()
+        with self._lock.write():
+            records = []
+            for user_id, fields in updates.items():
+                # Users deleted since are already gone from the log
+                if user_id in self._users_by_id:
+                    self._replace_fields(self._users_by_id[user_id], fields)
+                    records.append({"op": "patch", "id": user_id, "fields": dict(fields)})
+            commit = self.log.submit(records) if records else None
+        return self._wait(commit)
+    
+    def delete(self, user_id: str) -> Optional[bool]:
+        self._refresh()
+        with self._lock.write():
+            user = self._users_by_id.get(user_id)
+            if user is None:
+                return None
+            self._remove_user(user)
+            commit = self.log.submit([{"op": "delete", "id": user_id}])
+        return self._wait(commit)
+    
+    def close(self):
+        self.log.close()
+
+
+class SqliteUserStore(UserStore):
+    """
+    Users in an SQLite database
+    
+    Lookups and writes go through the B-tree indexes on id, email and
+    username, so they stay O(log n) and touch one row however many users
+    there are. The database runs in WAL mode, so readers never block the
+    writer and worker processes can share it. Threads borrow connections
+    from a small pool for the length of one call, so a thread-per-request
+    server does not open a connection per request.
+    """
+    
+    COLUMNS = ("id", "email", "username", "full_name", "phone", "password_hash",
+               "role", "created_at", "last_login", "is_active")
+    
+    # The UNIQUE and PRIMARY KEY constraints are backed by indexes
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            id TEXT PRIMARY KEY,
+            email TEXT NOT NULL,
+            username TEXT NOT NULL,
+            full_name TEXT,
+            phone TEXT,
+            password_hash TEXT NOT NULL,
+            role TEXT,
+            created_at TEXT,
+            last_login TEXT,
+            is_active INTEGER NOT NULL DEFAULT 1,
+            email_key TEXT NOT NULL UNIQUE,
+            username_key TEXT NOT NULL UNIQUE
+        )
+    """
+    
+    def __init__(self, db_file: str = "users.db", timeout: float = 30.0, pool_size: int = 4):
+        """
+        Args:
+            db_file: Path to the SQLite database, created if missing
+            timeout: Seconds to wait for another process's write to finish,
+                and for a pooled connection to come free
+            pool_size: Most connections open at once in this process
+        """
+        self.db_file = db_file
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._pool_lock = threading.Lock()
+        self._reset_pool()
+        with self._write() as connection:
+            connection.execute(self.SCHEMA)
+    
+    def _reset_pool(self):
+        # Connections returned to a replaced queue are closed instead of reused
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._pid = os.getpid()
+    
+    def _open(self) -> sqlite3.Connection:
+        # Used by one thread at a time, but not always the one that opened it
+        connection = sqlite3.connect(self.db_file, timeout=self.timeout, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+    
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection for the block, opening one if the pool is not full yet"""
+        with self._pool_lock:
+            if self._pid != os.getpid():
+                # SQLite connections must not cross fork; the child starts its own pool
+                self._reset_pool()
+            idle = self._idle
+            opening = idle.empty() and self._opened < self.pool_size
+            if opening:
+                self._opened += 1
+        if opening:
             try:
-                with open(self.users_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                return {"users": []}
-        return {"users": []}
-    
-    def _save_users(self) -> bool:
-        """Save users to JSON file"""
+                connection = self._open()
+            except BaseException:
+                with self._pool_lock:
+                    if idle is self._idle:
+                        self._opened -= 1
+                raise
+        else:
+            try:
+                connection = idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise sqlite3.OperationalError(f"No free connection to {self.db_file} after {self.timeout}s")
+        try:
+            yield connection
+        finally:
+            if idle is self._idle:
+                idle.put(connection)
+            else:
+                connection.close()
+    
+    def _user(self, row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        user = {column: row[column] for column in self.COLUMNS}
+        user["is_active"] = bool(user["is_active"])
+        return user
+    
+    def _row(self, user: Dict) -> Dict:
+        row = {column: user.get(column) for column in self.COLUMNS}
+        row["is_active"] = int(user.get("is_active", True))
+        row["email_key"] = user["email"].lower()
+        row["username_key"] = user["username"].lower()
+        return row
+    
+    def _select(self, where: str, value) -> Optional[Dict]:
+        with self._connection() as connection:
+            cursor = connection.execute(f"SELECT {', '.join(self.COLUMNS)} FROM users WHERE {where} = ?", (value,))
+            return self._user(cursor.fetchone())
+    
+    def get_by_id(self, user_id: str) -> Optional[Dict]:
+        return self._select("id", user_id)
+    
+    def get_by_email(self, email: str) -> Optional[Dict]:
+        return self._select("email_key", email.lower())
+    
+    def get_by_username(self, username: str) -> Optional[Dict]:
+        return self._select("username_key", username.lower())
+    
+    def all(self) -> List[Dict]:
+        with self._connection() as connection:
+            cursor = connection.execute(f"SELECT {', '.join(self.COLUMNS)} FROM users ORDER BY rowid")
+            return [self._user(row) for row in cursor]
+    
+    @contextmanager
+    def _write(self):
+        """A transaction on a pooled connection, committed when the block ends"""
+        with self._connection() as connection, stage('db_write'), stage_seconds.time('user_sqlite_write'), connection:
+            yield connection
+    
+    def _insert_sql(self, verb: str = "INSERT") -> str:
+        columns = self.COLUMNS + ("email_key", "username_key")
+        return f"{verb} INTO users ({', '.join(columns)}) VALUES ({', '.join(':' + column for column in columns)})"
+    
+    def insert(self, user: Dict) -> Optional[str]:
+        try:
+            with self._write() as connection:
+                connection.execute(self._insert_sql(), self._row(user))
+        except sqlite3.IntegrityError:
+            if self.get_by_email(user["email"]) is not None:
+                return "Email already exists"
+            return "Username already exists"
+        except sqlite3.Error as e:
+            print(f"Error writing {self.db_file}: {e}")
+            return "Failed to save user data"
+        return None
+    
+    def _set(self, connection: sqlite3.Connection, user_id: str, fields: Dict) -> int:
+        """UPDATE one user's columns; returns the number of rows changed"""
+        values = dict(fields)
+        if "is_active" in values:
+            values["is_active"] = int(values["is_active"])
+        if "email" in values:
+            values["email_key"] = values["email"].lower()
+        if "username" in values:
+            values["username_key"] = values["username"].lower()
+        unknown = set(values) - set(self.COLUMNS) - {"email_key", "username_key"}
+        if unknown or "id" in values:
+            raise ValueError(f"Cannot update user fields: {sorted(unknown | ({'id'} & set(values)))}")
+        if not values:
+            return len(connection.execute("SELECT 1 FROM users WHERE id = ?", (user_id,)).fetchall())
+        assignments = ', '.join(f"{column} = :{column}" for column in values)
+        return connection.execute(f"UPDATE users SET {assignments} WHERE id = :user_id",
+                                  dict(values, user_id=user_id)).rowcount
+    
+    def update(self, user_id: str, fields: Dict) -> Optional[bool]:
+        try:
+            with self._write() as connection:
+                if not self._set(connection, user_id, fields):
+                    return None
+        except sqlite3.Error as e:
+            print(f"Error writing {self.db_file}: {e}")
+            return False
+        return True
+    
+    def patch_many(self, updates: Dict[str, Dict]) -> bool:
         try:
-            with open(self.users_file, 'w', encoding='utf-8') as f:
-                json.dump(self.users_data, f, indent=2, ensure_ascii=False)
+            with self._write() as connection:
+                for user_id, fields in updates.items():
+                    self._set(connection, user_id, fields)
+        except sqlite3.Error as e:
+            print(f"Error writing {self.db_file}: {e}")
+            return False
+        return True
+    
+    def delete(self, user_id: str) -> Optional[bool]:
+        try:
+            with self._write() as connection:
+                if not connection.execute("DELETE FROM users WHERE id = ?", (user_id,)).rowcount:
+                    return None
+        except sqlite3.Error as e:
+            print(f"Error writing {self.db_file}: {e}")
+            return False
+        return True
+    
+    def import_users(self, users: List[Dict]) -> Tuple[int, List[Dict]]:
+        """
+        Insert many users in one transaction, for migrations
+        
+        Returns:
+            (number imported, users skipped because their id, email or
+            username is already taken)
+        """
+        skipped = []
+        with self._write() as connection:
+            for user in users:
+                if not connection.execute(self._insert_sql("INSERT OR IGNORE"), self._row(user)).rowcount:
+                    skipped.append(user)
+        return len(users) - len(skipped), skipped
+    
+    def close(self):
+        with self._pool_lock:
+            idle = self._idle
+            self._reset_pool()
+        while not idle.empty():
+            idle.get_nowait().close()
+
+
+class UserManager:
+    def __init__(self, users_file: str = "users.json", compact_every: int = 1000,
+                 write_behind_interval: Optional[float] = None, write_behind_max_dirty: int = 500,
+                 backend: str = "json", hasher: Optional[PasswordHasher] = None):
+        """
+        Initialize the user management system
+        
+        Args:
+            users_file: Path to the JSON snapshot storing user data, or to
+                the database with backend="sqlite"
+            compact_every: Logged mutations between snapshot rewrites (json)
+            write_behind_interval: Seconds between background flushes of
+                last_login updates; None writes them on every login
+            write_behind_max_dirty: Dirty users that trigger an early flush
+            backend: Storage for users, "json" or "sqlite"
+            hasher: Password hashing settings and pool (default scrypt)
+        """
+        self.users_file = users_file
+        if backend == "json":
+            self.store = JsonUserStore(users_file, compact_every)
+        elif backend == "sqlite":
+            self.store = SqliteUserStore(users_file)
+        else:
+            raise ValueError(f"Unknown user store backend: {backend!r} (expected 'json' or 'sqlite')")
+        self.hasher = hasher or PasswordHasher()
+        self._owns_hasher = hasher is None
+        # Unknown emails are checked against this, so they take as long as a wrong password
+        self._dummy_hash = self.hasher.hash(secrets.token_urlsafe(16))
+        
+        # Write-behind: user id -> {field: value} not yet in the store
+        self.write_behind_interval = write_behind_interval
+        self.write_behind_max_dirty = write_behind_max_dirty
+        self._dirty = {}
+        self._dirty_lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._closed = False
+        self._flusher = None
+        if write_behind_interval is not None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="user-write-behind", daemon=True)
+            self._flusher.start()
+            # Flush whatever is pending on interpreter shutdown
+            atexit.register(self.close)
+    
+    def _set_fields(self, user_id: str, fields: Dict) -> bool:
+        """Store non-critical field updates such as last_login
+        
+        In write-behind mode they are only marked dirty here and written by
+        the next flush; a crash can lose the last interval of them, which
+        is acceptable for these fields and never for signup or delete.
+        """
+        if self._flusher is None:
+            return self.store.patch_many({user_id: fields})
+        with self._dirty_lock:
+            self._dirty.setdefault(user_id, {}).update(fields)
+            dirty = len(self._dirty)
+        if dirty >= self.write_behind_max_dirty:
+            self._flush_requested.set()
+        return True
+    
+    def _public(self, user: Dict) -> Dict:
+        """A stored user without the password hash, with its unflushed updates applied"""
+        with self._dirty_lock:
+            user.update(self._dirty.get(user["id"], {}))
+        del user["password_hash"]
+        return user
+    
+    def flush(self) -> bool:
+        """Write all pending write-behind updates to the store in one write"""
+        with self._dirty_lock:
+            dirty = {user_id: dict(fields) for user_id, fields in self._dirty.items()}
+        if not dirty:
             return True
-        except Exception as e:
-            print(f"Error saving users: {e}")
+        if not self.store.patch_many(dirty):
+            # Still dirty, so the next flush retries them
             return False
+        with self._dirty_lock:
+            for user_id, fields in dirty.items():
+                # Unless a newer update came in meanwhile
+                if self._dirty.get(user_id) == fields:
+                    del self._dirty[user_id]
+        return True
+    
+    def _flush_loop(self):
+        while not self._closed:
+            self._flush_requested.wait(self.write_behind_interval)
+            self._flush_requested.clear()
+            self.flush()
+    
+    def close(self):
+        """Stop the write-behind thread, flush pending updates and close the store"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._flusher is not None:
+            self._flush_requested.set()
+            self._flusher.join()
+            atexit.unregister(self.close)
+        self.flush()
+        self.store.close()
+        if self._owns_hasher:
+            self.hasher.close()
     
     def _hash_password(self, password: str) -> str:
-        """Hash password using SHA-256 with salt"""
-        salt = os.urandom(32).hex()
-        password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-        return f"{salt}:{password_hash}"
+        """Hash password with the configured KDF, on the hasher's pool"""
+        return self.hasher.hash(password)
     
     def _verify_password(self, password: str, stored_hash: str) -> bool:
-        """Verify password against stored hash"""
-        try:
-            salt, password_hash = stored_hash.split(':')
-            test_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-            return test_hash == password_hash
-        except ValueError:
-            return False
+        """Verify password against stored hash (KDF or legacy salt:sha256)"""
+        return self.hasher.verify(password, stored_hash)
     
     def _generate_user_id(self) -> str:
         """Generate unique user ID"""
@@ -63,19 +1008,13 @@ class UserManager:
     
     def _check_email_exists(self, email: str) -> bool:
         """Check if email already exists"""
-        for user in self.users_data["users"]:
-            if user["email"].lower() == email.lower():
-                return True
-        return False
+        return self.store.get_by_email(email) is not None
     
     def _check_username_exists(self, username: str) -> bool:
         """Check if username already exists"""
-        for user in self.users_data["users"]:
-            if user["username"].lower() == username.lower():
-                return True
-        return False
+        return self.store.get_by_username(username) is not None
     
-    def signup(self, email: str, password: str, username: str, 
+    def signup(self, email: str, password: str, username: str,
                full_name: str = "", phone: str = "", role: str = "user") -> Tuple[bool, str, Optional[Dict]]:
         """
         Register a new user
@@ -101,7 +1040,7 @@ class UserManager:
         if "@" not in email:
             return False, "Invalid email format", None
         
-        # Check for duplicates
+        # Check for duplicates (the store checks again atomically on insert)
         if self._check_email_exists(email):
             return False, "Email already exists", None
         
@@ -110,7 +1049,8 @@ class UserManager:
         
         # Create new user
         user_id = self._generate_user_id()
-        hashed_password = self._hash_password(password)
+        with stage('auth'):
+            hashed_password = self._hash_password(password)
         
         new_user = {
             "id": user_id,
@@ -125,17 +1065,15 @@ class UserManager:
             "is_active": True
         }
         
-        # Add user to data
-        self.users_data["users"].append(new_user)
+        # Save to store
+        error = self.store.insert(new_user)
+        if error:
+            return False, error, None
         
-        # Save to file
-        if self._save_users():
-            # Return user data without password
-            user_data = new_user.copy()
-            del user_data["password_hash"]
-            return True, "User registered successfully", user_data
-        else:
-            return False, "Failed to save user data", None
+        # Return user data without password
+        user_data = new_user.copy()
+        del user_data["password_hash"]
+        return True, "User registered successfully", user_data
     
     def login(self, email: str, password: str) -> Tuple[bool, str, Optional[Dict]]:
         """
@@ -152,90 +1090,75 @@ class UserManager:
             return False, "Email and password are required", None
         
         # Find user by email
-        user = None
-        for u in self.users_data["users"]:
-            if u["email"].lower() == email.lower():
-                user = u
-                break
+        user = self.store.get_by_email(email)
         
         if not user:
+            # Same derivation as for a real account, so timing does not reveal which emails exist
+            with stage('auth'):
+                self._verify_password(password, self._dummy_hash)
             return False, "Invalid email or password", None
         
         if not user["is_active"]:
             return False, "Account is deactivated", None
         
         # Verify password
-        if not self._verify_password(password, user["password_hash"]):
+        with stage('auth'):
+            verified = self._verify_password(password, user["password_hash"])
+        if not verified:
             return False, "Invalid email or password", None
         
+        # Upgrade legacy hashes, and hashes made with older settings, while the password is at hand
+        if self.hasher.needs_rehash(user["password_hash"]):
+            with stage('auth'):
+                password_hash = self._hash_password(password)
+            self.store.update(user["id"], {"password_hash": password_hash})
+        
         # Update last login
         user["last_login"] = datetime.now().isoformat()
-        self._save_users()
+        self._set_fields(user["id"], {"last_login": user["last_login"]})
         
         # Return user data without password
-        user_data = user.copy()
-        del user_data["password_hash"]
-        return True, "Login successful", user_data
+        return True, "Login successful", self._public(user)
     
     def get_user_by_id(self, user_id: str) -> Optional[Dict]:
         """Get user by ID"""
-        for user in self.users_data["users"]:
-            if user["id"] == user_id:
-                user_data = user.copy()
-                del user_data["password_hash"]
-                return user_data
-        return None
+        user = self.store.get_by_id(user_id)
+        return None if user is None else self._public(user)
     
     def get_user_by_email(self, email: str) -> Optional[Dict]:
         """Get user by email"""
-        for user in self.users_data["users"]:
-            if user["email"].lower() == email.lower():
-                user_data = user.copy()
-                del user_data["password_hash"]
-                return user_data
-        return None
+        user = self.store.get_by_email(email)
+        return None if user is None else self._public(user)
     
     def get_all_users(self) -> list:
         """Get all users (without passwords)"""
-        users = []
-        for user in self.users_data["users"]:
-            user_data = user.copy()
-            del user_data["password_hash"]
-            users.append(user_data)
-        return users
+        return [self._public(user) for user in self.store.all()]
     
     def update_user(self, user_id: str, **kwargs) -> Tuple[bool, str]:
         """Update user information"""
-        user = None
-        for u in self.users_data["users"]:
-            if u["id"] == user_id:
-                user = u
-                break
-        
-        if not user:
-            return False, "User not found"
-        
         # Update allowed fields
         allowed_fields = ["full_name", "phone", "role", "is_active"]
-        for field, value in kwargs.items():
-            if field in allowed_fields:
-                user[field] = value
+        fields = {field: value for field, value in kwargs.items() if field in allowed_fields}
         
-        if self._save_users():
+        saved = self.store.update(user_id, fields)
+        if saved is None:
+            return False, "User not found"
+        if saved:
             return True, "User updated successfully"
         else:
             return False, "Failed to update user"
     
     def delete_user(self, user_id: str) -> Tuple[bool, str]:
         """Delete user account"""
-        for i, user in enumerate(self.users_data["users"]):
-            if user["id"] == user_id:
-                del self.users_data["users"][i]
-                if self._save_users():
-                    return True, "User deleted successfully"
-                else:
-                    return False, "Failed to delete user"
-        return False, "User not found"
+        saved = self.store.delete(user_id)
+        if saved is None:
+            return False, "User not found"
+        with self._dirty_lock:
+            self._dirty.pop(user_id, None)
+        if saved:
+            return True, "User deleted successfully"
+        else:
+            return False, "Failed to delete user"
 
 
 # Example usage
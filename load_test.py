@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Load test for the backend API and the model service
+Synthesizes transactions with the same distributions as the dashboard's
+traffic generator (fraudService.js, testData.js) and sends them at a target
+rate with open-loop scheduling: requests go out on schedule whether or not
+earlier ones have finished, and latency is measured from the scheduled
+send time, so a slow server cannot hide its queueing delay.
+
+Usage: python load_test.py --rps 50 --duration 30
+       python load_test.py --rps 200 --mix predict=1 --json results.json
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Mirrors client/src/components/services/fraudService.js
+MERCHANTS = [
+    'Amazon', 'Walmart', 'Target', 'Best Buy', 'Home Depot', 'Starbucks', "McDonald's", 'Shell',
+    'Exxon', 'CVS', 'Walgreens', 'Costco', 'Apple Store', 'Netflix', 'Spotify'
+]
+LOCATIONS = [
+    'New York, NY', 'Los Angeles, CA', 'Chicago, IL', 'Houston, TX', 'Phoenix, AZ',
+    'Philadelphia, PA', 'San Antonio, TX', 'San Diego, CA', 'Dallas, TX', 'San Jose, CA'
+]
+TRANSACTION_TYPES = ['purchase', 'withdrawal', 'transfer', 'payment']
+
+# Mirrors client/src/testData.js (what users type into the transaction form)
+FORM_TRANSACTIONS = [
+    {'transactionAmount': 25.99, 'accountBalance': 2500.0, 'transactionType': 'Purchase', 'deviceType': 'Web Browser', 'merchantCategory': 'Online Shopping'},
+    {'transactionAmount': 850.0, 'accountBalance': 1200.0, 'transactionType': 'Transfer', 'deviceType': 'Mobile App', 'merchantCategory': 'Financial Services'},
+    {'transactionAmount': 7500.0, 'accountBalance': 8000.0, 'transactionType': 'Withdrawal', 'deviceType': 'ATM', 'merchantCategory': 'Banking'},
+    {'transactionAmount': 12000.0, 'accountBalance': 5000.0, 'transactionType': 'Transfer', 'deviceType': 'Other', 'merchantCategory': 'Other'},
+    {'transactionAmount': 3200.0, 'accountBalance': 4500.0, 'transactionType': 'Purchase', 'deviceType': 'Web Browser', 'merchantCategory': 'Electronics'},
+    {'transactionAmount': 45.5, 'accountBalance': 1850.0, 'transactionType': 'Purchase', 'deviceType': 'Mobile App', 'merchantCategory': 'Groceries'},
+    {'transactionAmount': 999.99, 'accountBalance': 1000.0, 'transactionType': 'Transfer', 'deviceType': 'Web Browser', 'merchantCategory': 'Gambling'},
+    {'transactionAmount': 2200.0, 'accountBalance': 6500.0, 'transactionType': 'Purchase', 'deviceType': 'Mobile App', 'merchantCategory': 'Travel'},
+]
+
+DEMO_USER = {'email': 'demo@fraudguard.com', 'password': 'demo123'}
+DEFAULT_MIX = {'predict': 0.7, 'transaction': 0.25, 'login': 0.05}
+
+
+class TransactionGenerator:
+    """Random transactions shaped like the dashboard's generated and form traffic"""
+
+    def __init__(self, seed=None, form_share=0.2):
+        self.random = random.Random(seed)
+        self.form_share = form_share
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def _amount(self):
+        # 70% normal ($1-$500), 20% medium ($500-$2000), 10% high-value ($2000-$10000)
+        rand = self.random.random()
+        if rand < 0.7:
+            return round(self.random.random() * 500 + 1, 2)
+        elif rand < 0.9:
+            return round(self.random.random() * 1500 + 500, 2)
+        return round(self.random.random() * 8000 + 2000, 2)
+
+    @staticmethod
+    def _ip_flag(amount, hour):
+        if amount > 5000:
+            return 'Blacklisted'
+        if amount > 1000:
+            return 'High Risk'
+        if hour >= 23 or hour <= 5:
+            return 'Suspicious'
+        return 'Safe'
+
+    def transaction(self):
+        """One /predict payload"""
+        with self.lock:
+            self.count += 1
+            number = self.count
+            if self.random.random() < self.form_share:
+                transaction = dict(self.random.choice(FORM_TRANSACTIONS))
+            else:
+                amount = self._amount()
+                transaction = {
+                    'transactionAmount': amount,
+                    'accountBalance': 5000,
+                    'transactionType': self.random.choice(TRANSACTION_TYPES),
+                    'deviceType': 'Web Browser',
+                    'merchantCategory': self.random.choice(MERCHANTS),
+                    'location': self.random.choice(LOCATIONS),
+                    'previousFraudulentActivity': 'None',
+                    'userId': f"user_{self.random.randrange(100000):05d}"
+                }
+            # Spread timestamps over the last day so hour-based features vary
+            timestamp = datetime.now() - timedelta(seconds=self.random.randrange(86400))
+        transaction.setdefault('ipAddressFlag', self._ip_flag(transaction['transactionAmount'], timestamp.hour))
+        transaction['transactionId'] = f"txn_load_{number:08d}"
+        transaction['timestamp'] = timestamp.isoformat()
+        return transaction
+
+
+class LatencyRecorder:
+    """Thread-safe latencies and errors per operation"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, operation, seconds, error=None):
+        with self.lock:
+            self.latencies.setdefault(operation, []).append(seconds)
+            if error is not None:
+                errors = self.errors.setdefault(operation, {})
+                errors[error] = errors.get(error, 0) + 1
+
+    def summary(self, elapsed):
+        """Per-operation counts, error rates and latency percentiles in ms"""
+        with self.lock:
+            operations = {}
+            for operation, latencies in sorted(self.latencies.items()):
+                ordered = sorted(latencies)
+                errors = self.errors.get(operation, {})
+                operations[operation] = {
+                    'requests': len(ordered),
+                    'rps': round(len(ordered) / elapsed, 2) if elapsed > 0 else None,
+                    'errors': sum(errors.values()),
+                    'errorRate': round(sum(errors.values()) / len(ordered), 4),
+                    'errorsByType': dict(errors),
+                    'p50Ms': _percentile(ordered, 50),
+                    'p90Ms': _percentile(ordered, 90),
+                    'p99Ms': _percentile(ordered, 99),
+                    'maxMs': round(ordered[-1] * 1000, 2),
+                    'histogram': _histogram(ordered)
+                }
+            return operations
+
+
+def _percentile(ordered, percent):
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return round(ordered[index] * 1000, 2)
+
+
+def _histogram(ordered):
+    """Request counts in power-of-two millisecond buckets, e.g. {'<=4ms': 10}"""
+    buckets = {}
+    for seconds in ordered:
+        bound = 1
+        while bound < seconds * 1000:
+            bound *= 2
+        label = f"<={bound}ms"
+        buckets[label] = buckets.get(label, 0) + 1
+    return buckets
+
+
+class LoadTest:
+    """Open-loop load against the model service and the backend API"""
+
+    def __init__(self, model_url='http://localhost:5001', backend_url='http://localhost:5000',
+                 mix=None, credentials=None, seed=None, timeout=10.0):
+        """
+        Args:
+            model_url: Base URL of the model service (/predict)
+            backend_url: Base URL of the backend API (/api/login, /api/transactions)
+            mix: {'predict'|'transaction'|'login': weight}; operations with
+                weight 0 are never sent (default DEFAULT_MIX)
+            credentials: {'email', 'password'} used for logins (default: the demo user)
+            seed: Seed for the transaction and mix random streams
+            timeout: Seconds before a request counts as a 'timeout' error
+        """
+        self.model_url = model_url.rstrip('/')
+        self.backend_url = backend_url.rstrip('/')
+        self.mix = {operation: weight for operation, weight in (mix or DEFAULT_MIX).items() if weight > 0}
+        self.credentials = credentials or DEMO_USER
+        self.timeout = timeout
+        self.generator = TransactionGenerator(seed)
+        self.random = random.Random(seed)
+        self.recorder = LatencyRecorder()
+        self.token = None
+
+    def _request(self, url, payload, headers=None):
+        """POST JSON; returns (status, decoded body or None)"""
+        request = urllib.request.Request(
+            url, data=json.dumps(payload).encode(), headers=dict({'Content-Type': 'application/json'}, **(headers or {}))
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read() or b'null')
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+    def login(self):
+        status, body = self._request(f"{self.backend_url}/api/login", self.credentials)
+        if status == 200 and body and body.get('token'):
+            self.token = body['token']
+        return status
+
+    def _send(self, operation):
+        if operation == 'predict':
+            return self._request(f"{self.model_url}/predict", self.generator.transaction())[0]
+        if operation == 'login':
+            return self.login()
+        if operation == 'transaction':
+            if self.token is None:
+                self.login()
+            transaction = self.generator.transaction()
+            transaction['fraudPrediction'] = {'riskScore': round(self.random.random(), 4)}
+            status, _ = self._request(f"{self.backend_url}/api/transactions", transaction,
+                                      {'Authorization': f"Bearer {self.token}"})
+            if status == 401:
+                self.token = None
+            return status
+        raise ValueError(f"Unknown operation: {operation}")
+
+    def _fire(self, operation, scheduled):
+        error = None
+        try:
+            status = self._send(operation)
+            if status >= 400:
+                error = f"http_{status}"
+        except (TimeoutError, urllib.error.URLError) as e:
+            reason = getattr(e, 'reason', e)
+            error = 'timeout' if isinstance(reason, TimeoutError) else 'connection'
+        except Exception as e:
+            error = type(e).__name__
+        # From the scheduled send time, so time spent queued counts as latency
+        self.recorder.record(operation, time.perf_counter() - scheduled, error)
+
+    def run(self, rps, duration, concurrency=256, poisson=True):
+        """
+        Send requests at `rps` per second for `duration` seconds
+
+        Args:
+            rps: Target arrival rate across all operations
+            duration: Seconds to send for (in-flight requests are awaited)
+            concurrency: Threads available for requests in flight
+            poisson: Exponential inter-arrival times instead of a fixed interval
+
+        Returns:
+            Summary dict with the target/achieved rate, scheduler lag and
+            per-operation results
+        """
+        operations = list(self.mix)
+        weights = [self.mix[operation] for operation in operations]
+        if 'transaction' in self.mix:
+            self.login()
+
+        started = time.perf_counter()
+        next_send = started
+        sent = 0
+        max_lag = 0.0
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='load') as executor:
+            while next_send < started + duration:
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                max_lag = max(max_lag, time.perf_counter() - next_send)
+                executor.submit(self._fire, self.random.choices(operations, weights)[0], next_send)
+                sent += 1
+                next_send += self.random.expovariate(rps) if poisson else 1 / rps
+            sending = time.perf_counter() - started
+        elapsed = time.perf_counter() - started
+
+        return {
+            'targetRps': rps,
+            'achievedRps': round(sent / sending, 2) if sending > 0 else None,
+            'sent': sent,
+            'seconds': round(elapsed, 2),
+            'maxSchedulerLagMs': round(max_lag * 1000, 2),
+            'operations': self.recorder.summary(elapsed)
+        }
+
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        operation, _, weight = part.partition('=')
+        if operation not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation '{operation}' (use {', '.join(DEFAULT_MIX)})")
+        mix[operation] = float(weight or 1)
+    return mix
+
+
+def print_report(report):
+    print(f"\n📊 {report['sent']} requests in {report['seconds']}s "
+          f"(target {report['targetRps']} rps, sent {report['achievedRps']} rps, "
+          f"max scheduler lag {report['maxSchedulerLagMs']} ms)")
+    for operation, stats in report['operations'].items():
+        marker = '✅' if stats['errors'] == 0 else '⚠️ '
+        print(f"{marker} {operation:<12} {stats['requests']:>7} req  p50 {stats['p50Ms']:>8} ms  "
+              f"p90 {stats['p90Ms']:>8} ms  p99 {stats['p99Ms']:>8} ms  max {stats['maxMs']:>8} ms  "
+              f"errors {stats['errorRate']:.2%} {stats['errorsByType'] or ''}")
+        peak = max(stats['histogram'].values())
+        for bucket, count in stats['histogram'].items():
+            print(f"      {bucket:>10} {'█' * max(1, round(40 * count / peak)):<40} {count}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open-loop load test for the model service and backend API")
+    parser.add_argument('--rps', type=float, default=20, help="target requests per second")
+    parser.add_argument('--duration', type=float, default=30, help="seconds to send for")
+    parser.add_argument('--mix', type=_parse_mix, default=DEFAULT_MIX,
+                        help="operation weights, e.g. predict=0.7,transaction=0.25,login=0.05")
+    parser.add_argument('--model-url', default='http://localhost:5001')
+    parser.add_argument('--backend-url', default='http://localhost:5000')
+    parser.add_argument('--email', default=DEMO_USER['email'])
+    parser.add_argument('--password', default=DEMO_USER['password'])
+    parser.add_argument('--concurrency', type=int, default=256, help="maximum requests in flight")
+    parser.add_argument('--fixed-interval', action='store_true', help="evenly spaced arrivals instead of Poisson")
+    parser.add_argument('--seed', type=int, help="seed for reproducible traffic")
+    parser.add_argument('--json', metavar='FILE', help="also write the report as JSON")
+    args = parser.parse_args()
+
+    print(f"🚦 Sending {args.rps} rps for {args.duration}s: {args.mix}")
+    test = LoadTest(args.model_url, args.backend_url, args.mix,
+                    {'email': args.email, 'password': args.password}, args.seed)
+    report = test.run(args.rps, args.duration, args.concurrency, poisson=not args.fixed_interval)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"💾 Report written to {args.json}")
@@ -0,0 +1,253 @@
+"""
+Incremental analytics for the fraud model service
+Updates running counters on every prediction so the /analytics snapshot
+costs the same no matter how much traffic the service has seen
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from history_store import CLASSIFICATIONS
+
+# Sliding and tumbling window lengths in seconds
+WINDOWS = {'1m': 60, '5m': 300, '1h': 3600}
+LONGEST_WINDOW = max(WINDOWS, key=WINDOWS.get)
+QUANTILES = [0.5, 0.9, 0.95, 0.99]
+
+
+class AnalyticsAggregator:
+    """
+    Running analytics over the prediction stream
+
+    Maintains per-classification totals, sliding window counts built from
+    per-second buckets, tumbling window counts, a fixed-bin histogram of
+    risk scores for streaming quantiles, and the buffer of recent
+    predictions behind the dashboard trend chart.
+    """
+
+    def __init__(self, recent_size=100, score_bins=1000, clock=time.time):
+        """
+        Args:
+            recent_size: Number of predictions kept for trends and the
+                recent-predictions table
+            score_bins: Resolution of the risk score histogram on [0, 1]
+            clock: Time source in seconds, overridable for tests
+        """
+        self.clock = clock
+        self.recent_size = recent_size
+        self.score_bins = score_bins
+        self._lock = threading.Lock()
+        self._codes = {name: code for code, name in enumerate(CLASSIFICATIONS)}
+        self._totals = np.zeros(len(CLASSIFICATIONS), dtype=np.int64)
+
+        # Sliding windows: one bucket per second over the longest window
+        self._horizon = WINDOWS[LONGEST_WINDOW]
+        self._buckets = np.zeros((self._horizon, len(CLASSIFICATIONS)), dtype=np.int64)
+        self._sliding = {name: np.zeros(len(CLASSIFICATIONS), dtype=np.int64) for name in WINDOWS}
+        self._current_second = None
+
+        # Tumbling windows: [window index, current counts, previous counts]
+        self._tumbling = {
+            name: [None, np.zeros(len(CLASSIFICATIONS), dtype=np.int64), np.zeros(len(CLASSIFICATIONS), dtype=np.int64)]
+            for name in WINDOWS
+        }
+
+        self._histogram = np.zeros(score_bins, dtype=np.int64)
+        self._recent = deque(maxlen=recent_size)
+        self._recent_distribution = np.zeros(len(CLASSIFICATIONS), dtype=np.int64)
+
+    def record(self, prediction):
+        """Fold one prediction result into every aggregate"""
+        code = self._codes[prediction['classification']]
+        risk_score = min(max(prediction['riskScore'], 0.0), 1.0)
+        score_bin = min(int(risk_score * self.score_bins), self.score_bins - 1)
+        now = self.clock()
+
+        with self._lock:
+            self._totals[code] += 1
+            self._histogram[score_bin] += 1
+
+            second = int(now)
+            self._advance(second)
+            self._buckets[second % self._horizon, code] += 1
+            for counts in self._sliding.values():
+                counts[code] += 1
+            self._roll_tumbling(now)
+            for window in self._tumbling.values():
+                window[1][code] += 1
+
+            if len(self._recent) == self._recent.maxlen:
+                self._recent_distribution[self._codes[self._recent[0]['classification']]] -= 1
+            self._recent.append(prediction)
+            self._recent_distribution[code] += 1
+
+    def snapshot(self, include_histogram=False):
+        """
+        Current analytics, in the shape returned by /analytics
+
+        Args:
+            include_histogram: Also return the raw risk score histogram, so
+                snapshots from several processes can be combined with
+                merge_snapshots
+        """
+        now = self.clock()
+        with self._lock:
+            self._advance(int(now))
+            self._roll_tumbling(now)
+            recent = list(self._recent)
+            total = int(self._totals.sum())
+            snapshot = {
+                'totalPredictions': total,
+                'recentPredictions': recent,
+                'fraudDistribution': _by_class(self._recent_distribution),
+                'classificationTotals': _by_class(self._totals),
+                'slidingWindows': {name: _by_class(counts) for name, counts in self._sliding.items()},
+                'tumblingWindows': {
+                    name: {
+                        'start': index * WINDOWS[name] if index is not None else None,
+                        'current': _by_class(current),
+                        'previous': _by_class(previous)
+                    }
+                    for name, (index, current, previous) in self._tumbling.items()
+                },
+                'riskScoreQuantiles': _quantiles(self._histogram, total),
+                'riskTrends': _trends(recent)
+            }
+            if include_histogram:
+                snapshot['riskScoreHistogram'] = self._histogram.tolist()
+            return snapshot
+
+    def _advance(self, second):
+        """Expire per-second buckets that have left each sliding window"""
+        if self._current_second is None:
+            self._current_second = second
+            return
+        if second <= self._current_second:
+            return
+        if second - self._current_second >= self._horizon:
+            # Nothing recorded so far is inside any window any more
+            self._buckets[:] = 0
+            for counts in self._sliding.values():
+                counts[:] = 0
+            self._current_second = second
+            return
+
+        for step in range(self._current_second + 1, second + 1):
+            for name, length in WINDOWS.items():
+                if length < self._horizon:
+                    self._sliding[name] -= self._buckets[(step - length) % self._horizon]
+            # The slot about to be reused holds the second leaving the longest window
+            slot = step % self._horizon
+            self._sliding[LONGEST_WINDOW] -= self._buckets[slot]
+            self._buckets[slot] = 0
+        self._current_second = second
+
+    def _roll_tumbling(self, now):
+        """Start new tumbling windows when the clock crosses a boundary"""
+        for name, window in self._tumbling.items():
+            index = int(now // WINDOWS[name])
+            if window[0] is None:
+                window[0] = index
+            elif index > window[0]:
+                if index == window[0] + 1:
+                    window[2] = window[1]
+                else:
+                    window[2] = np.zeros(len(CLASSIFICATIONS), dtype=np.int64)
+                window[1] = np.zeros(len(CLASSIFICATIONS), dtype=np.int64)
+                window[0] = index
+
+
+
+def merge_snapshots(snapshots, recent_size=100):
+    """
+    Combine snapshots from several processes into one /analytics snapshot
+
+    Counters are summed, recent predictions are interleaved by timestamp,
+    and quantiles are recomputed from the summed histograms, so every
+    snapshot must have been taken with include_histogram=True.
+    """
+    recent = sorted(
+        (prediction for snapshot in snapshots for prediction in snapshot['recentPredictions']),
+        key=lambda prediction: prediction['timestamp']
+    )[-recent_size:]
+    histogram = np.sum([snapshot['riskScoreHistogram'] for snapshot in snapshots], axis=0)
+    total = sum(snapshot['totalPredictions'] for snapshot in snapshots)
+
+    distribution = {name: 0 for name in CLASSIFICATIONS}
+    for prediction in recent:
+        distribution[prediction['classification']] += 1
+
+    tumbling = {}
+    for name, length in WINDOWS.items():
+        windows = [snapshot['tumblingWindows'][name] for snapshot in snapshots]
+        starts = [window['start'] for window in windows if window['start'] is not None]
+        start = max(starts) if starts else None
+        current = {label: 0 for label in CLASSIFICATIONS}
+        previous = {label: 0 for label in CLASSIFICATIONS}
+        for window in windows:
+            if window['start'] is None:
+                continue
+            # A process that has not rolled over yet holds the previous window as current
+            if window['start'] == start:
+                parts = [(current, window['current']), (previous, window['previous'])]
+            elif window['start'] == start - length:
+                parts = [(previous, window['current'])]
+            else:
+                parts = []
+            for merged, counts in parts:
+                for label, count in counts.items():
+                    merged[label] += count
+        tumbling[name] = {'start': start, 'current': current, 'previous': previous}
+
+    return {
+        'totalPredictions': total,
+        'recentPredictions': recent,
+        'fraudDistribution': distribution,
+        'classificationTotals': _sum_by_class(snapshot['classificationTotals'] for snapshot in snapshots),
+        'slidingWindows': {
+            name: _sum_by_class(snapshot['slidingWindows'][name] for snapshot in snapshots)
+            for name in WINDOWS
+        },
+        'tumblingWindows': tumbling,
+        'riskScoreQuantiles': _quantiles(histogram, total),
+        'riskTrends': _trends(recent)
+    }
+
+
+def _quantiles(histogram, total):
+    """Risk score quantiles from the histogram (bin upper edges)"""
+    if total == 0:
+        return {f'p{int(q * 100)}': None for q in QUANTILES}
+    cumulative = np.cumsum(histogram)
+    return {
+        f'p{int(q * 100)}': float((np.searchsorted(cumulative, q * total) + 1) / len(histogram))
+        for q in QUANTILES
+    }
+
+
+def _trends(recent):
+    """Trend chart points for the recent predictions"""
+    return [
+        {
+            'x': i,
+            'y': pred['riskScore'],
+            'timestamp': pred['timestamp'],
+            'classification': pred['classification']
+        }
+        for i, pred in enumerate(recent)
+    ]
+
+
+def _by_class(counts):
+    return {name: int(count) for name, count in zip(CLASSIFICATIONS, counts)}
+
+
+def _sum_by_class(counts):
+    totals = {name: 0 for name in CLASSIFICATIONS}
+    for by_class in counts:
+        for name, count in by_class.items():
+            totals[name] += count
+    return totals
@@ -0,0 +1,329 @@
+# Fraud Detection Model Service - ASGI variant
+# Serves the same endpoints as model_service.py from an asyncio event loop:
+# connections and JSON request parsing are handled on the loop, and each
+# request's preprocessing and inference run on a bounded thread pool.
+#
+# Run with: python asgi_service.py   (needs: pip install uvicorn)
+#      or:  uvicorn asgi_service:app --port 5001
+
+import asyncio
+import contextvars
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Request
+
+import config
+from model_service import app as flask_app, fraud_service, load_default_model
+
+_END = object()
+_TOO_LARGE = object()
+
+# environ key holding a JSON body already parsed on the event loop
+PARSED_JSON = 'asgi_service.parsed_json'
+
+
+class PreparsedJsonRequest(Request):
+    """Flask request that reuses a JSON body the event loop already parsed"""
+
+    def get_json(self, force=False, silent=False, cache=True):
+        if PARSED_JSON in self.environ and (force or self.is_json):
+            return self.environ[PARSED_JSON]
+        return super().get_json(force=force, silent=silent, cache=cache)
+
+
+class AsgiModelService:
+    """
+    ASGI application running a WSGI app on a bounded worker pool
+
+    Request bodies are received and responses sent on the event loop, so a
+    slow client only costs a coroutine. The wrapped app runs on at most
+    `workers` threads; once `max_pending` requests are receiving, queued or
+    running, new requests are rejected with 429 instead of piling up.
+    """
+
+    def __init__(self, wsgi_app, workers=8, max_pending=64, max_body_bytes=16 * 1024 * 1024,
+                 inline_paths=('/health',), streaming_paths=('/predict/stream',),
+                 max_loop_json_bytes=64 * 1024, on_startup=None):
+        """
+        Args:
+            wsgi_app: The Flask app (or any WSGI app) to serve
+            workers: Threads running the app concurrently
+            max_pending: Requests allowed in the pool (running + queued)
+                before new ones get 429
+            max_body_bytes: Largest request body accepted (413 above it)
+            inline_paths: Cheap endpoints run directly on the loop, so they
+                answer even when the pool is saturated
+            streaming_paths: Endpoints whose body is not buffered: the app
+                reads it from the client as it consumes it, with no size limit
+            max_loop_json_bytes: JSON bodies up to this size are parsed on the
+                loop and handed over in environ[PARSED_JSON]; larger ones are
+                left to the app, so they cannot stall the loop
+            on_startup: Optional callable run in the pool at ASGI lifespan startup
+        """
+        self.wsgi_app = wsgi_app
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_body_bytes = max_body_bytes
+        self.inline_paths = set(inline_paths)
+        self.streaming_paths = set(streaming_paths)
+        self.max_loop_json_bytes = max_loop_json_bytes
+        self.on_startup = on_startup
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='inference')
+        # Only touched from the event loop thread, so no lock is needed
+        self.pending = 0
+        self.served = 0
+        self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    def stats(self):
+        """Pool and backpressure counters, served at /concurrency"""
+        return {
+            'workers': self.workers,
+            'maxPending': self.max_pending,
+            'pending': self.pending,
+            'served': self.served,
+            'rejected': self.rejected
+        }
+
+    async def _lifespan(self, receive, send):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.on_startup is not None:
+                    await loop.run_in_executor(self.executor, self.on_startup)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        if scope['path'] == '/concurrency' and scope['method'] == 'GET':
+            await _send_json(send, 200, self.stats())
+            return
+
+        if scope['path'] in self.inline_paths:
+            environ = await self._buffered_environ(scope, receive, send)
+            if environ is not None:
+                await self._respond(send, *self._start(environ), run=_run_inline)
+            return
+
+        if self.pending >= self.max_pending:
+            # Shed load before reading the body
+            self.rejected += 1
+            await _send_json(send, 429, {'error': 'Too many requests in flight, retry shortly'},
+                             [(b'retry-after', b'1')])
+            return
+
+        # Reserve the slot before awaiting the body, so requests that are
+        # still uploading count against max_pending too
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            if scope['path'] in self.streaming_paths:
+                environ = _wsgi_environ(scope, io.BufferedReader(_ReceiveStream(receive, loop)))
+            else:
+                environ = await self._buffered_environ(scope, receive, send)
+                if environ is None:
+                    return
+
+            # One context for every pool call of this request, so context
+            # variables set while starting a streamed response (Flask's
+            # stream_with_context) are still there for the following chunks
+            context = contextvars.copy_context()
+
+            async def run(fn, *args):
+                return await loop.run_in_executor(self.executor, context.run, fn, *args)
+
+            await self._respond(send, *await run(self._start, environ), run=run)
+        finally:
+            self.pending -= 1
+
+    async def _buffered_environ(self, scope, receive, send):
+        """Read the whole body into a WSGI environ, or answer 413 / give up and return None"""
+        body = await self._read_body(receive)
+        if body is None:
+            return None
+        if body is _TOO_LARGE:
+            await _send_json(send, 413, {'error': f'Request body larger than {self.max_body_bytes} bytes'})
+            return None
+
+        environ = _wsgi_environ(scope, io.BytesIO(body), len(body))
+        if body and len(body) <= self.max_loop_json_bytes and _is_json(environ.get('CONTENT_TYPE', '')):
+            try:
+                environ[PARSED_JSON] = json.loads(body)
+            except ValueError:
+                # Left to the app, which answers 400 as usual
+                pass
+        return environ
+
+    async def _read_body(self, receive):
+        """Whole request body, _TOO_LARGE, or None if the client went away"""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size <= self.max_body_bytes:
+                chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks) if size <= self.max_body_bytes else _TOO_LARGE
+
+    def _start(self, environ):
+        """Call the WSGI app and pull the first body chunk (runs on the pool)"""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = headers
+
+        iterable = self.wsgi_app(environ, start_response)
+        iterator = iter(iterable)
+        first = next(iterator, _END)
+        return response, iterable, iterator, first
+
+    async def _respond(self, send, response, iterable, iterator, first, run):
+        """Send the WSGI response, pulling further chunks through `run`"""
+        try:
+            headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response['headers']]
+            await send({'type': 'http.response.start', 'status': response['status'], 'headers': headers})
+            chunk = first
+            while chunk is not _END:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await run(next, iterator, _END)
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            self.served += 1
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+
+class _ReceiveStream(io.RawIOBase):
+    """
+    wsgi.input that pulls the request body from the client as the app reads it
+
+    Read from a pool thread; each receive() runs on the event loop.
+    A disconnect ends the body early.
+    """
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._chunk = memoryview(b'')
+        self._done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self._chunk and not self._done:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message['type'] == 'http.disconnect':
+                self._done = True
+            else:
+                self._chunk = memoryview(message.get('body', b''))
+                self._done = not message.get('more_body', False)
+        size = min(len(target), len(self._chunk))
+        target[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+
+async def _run_inline(fn, *args):
+    return fn(*args)
+
+
+async def _send_json(send, status, payload, extra_headers=()):
+    body = json.dumps(payload).encode()
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers + list(extra_headers)})
+    await send({'type': 'http.response.body', 'body': body, 'more_body': False})
+
+
+def _is_json(content_type):
+    mimetype = content_type.split(';', 1)[0].strip().lower()
+    return mimetype == 'application/json' or mimetype.endswith('+json')
+
+
+def _wsgi_environ(scope, body, content_length=None):
+    """
+    Build a WSGI environ for an ASGI HTTP scope
+
+    Args:
+        scope: ASGI HTTP scope
+        body: File-like request body
+        content_length: Size of a buffered body; None for a body read as it
+            arrives, which is then terminated by EOF instead
+    """
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': content_length is None,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    if content_length is not None:
+        environ['CONTENT_LENGTH'] = str(content_length)
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = 'CONTENT_TYPE' if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+# JSON bodies parsed on the loop reach the Flask views through request.json
+flask_app.request_class = PreparsedJsonRequest
+
+
+def _load_model_if_needed():
+    if fraud_service.model is None:
+        load_default_model()
+
+
+app = AsgiModelService(
+    flask_app,
+    workers=config.ASGI_WORKER_THREADS,
+    max_pending=config.ASGI_MAX_PENDING,
+    max_body_bytes=config.ASGI_MAX_BODY_BYTES,
+    on_startup=_load_model_if_needed
+)
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        print("❌ The ASGI service needs an ASGI server: pip install uvicorn")
+        sys.exit(1)
+
+    print("Starting Fraud Detection Model Service (ASGI)...")
+    print(f"🧵 {config.ASGI_WORKER_THREADS} inference threads, up to {config.ASGI_MAX_PENDING} requests in flight")
+    uvicorn.run(app, host='0.0.0.0', port=5001, log_level='warning')
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Parallel offline batch scorer for nightly re-scoring
+Splits a CSV or Parquet dataset into partitions, scores them in a process
+pool (the model is loaded once per worker) and writes one output file per
+partition. A checkpoint in the output directory records finished
+partitions, so an interrupted job picks up where it stopped.
+
+Usage: python batch_scorer.py transactions.csv scored/ [--model PATH] [--workers N] [--format parquet]
+"""
+
+import argparse
+import glob
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import config
+from feature_importance import file_fingerprint
+
+CHECKPOINT_NAME = '_checkpoint.json'
+OUTPUT_FORMATS = ('csv', 'parquet')
+
+# Must match TransactionManager.determine_transaction_status in the backend
+BLOCK_THRESHOLD = 0.7
+REVIEW_THRESHOLD = 0.2
+
+# Scoring service of a pool worker, loaded once by _init_worker
+_service = None
+
+
+def transaction_status(risk_score):
+    """Transaction status for a risk score: 'approved', 'flagged' or 'blocked'"""
+    if risk_score >= BLOCK_THRESHOLD:
+        return 'blocked'
+    elif risk_score >= REVIEW_THRESHOLD:
+        return 'flagged'
+    else:
+        return 'approved'
+
+
+def _require_parquet():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("Parquet input/output needs pyarrow: pip install pyarrow")
+
+
+def input_files(source):
+    """Input files for a file path, a directory or a glob pattern, in sorted order"""
+    if os.path.isdir(source):
+        files = [os.path.join(source, name) for name in os.listdir(source) if name.endswith(('.csv', '.parquet'))]
+    else:
+        files = glob.glob(source)
+    if not files:
+        raise FileNotFoundError(f"No input files found for {source}")
+    return sorted(files)
+
+
+def _csv_layout(path, partition_rows):
+    """
+    Byte offsets of a CSV file's records, found in one pass over the file
+
+    A newline inside a quoted field does not end a record: a record ends at
+    a newline once the quotes seen since its start are balanced ("" escapes
+    keep the count even). Blank lines are skipped, as pandas skips them.
+
+    Returns:
+        (header_bytes, starts, total, size): length of the header record,
+        offset of every partition_rows-th record, the number of records
+        and the file size
+    """
+    header_bytes = None
+    starts = []
+    total = 0
+    position = 0
+    record_start = None
+    quotes = 0
+    with open(path, 'rb') as file:
+        for line in file:
+            if record_start is None:
+                if line in (b'\n', b'\r\n'):
+                    position += len(line)
+                    continue
+                record_start = position
+            quotes += line.count(b'"')
+            position += len(line)
+            if quotes % 2:
+                continue
+            if header_bytes is None:
+                header_bytes = position
+            else:
+                if total % partition_rows == 0:
+                    starts.append(record_start)
+                total += 1
+            record_start = None
+            quotes = 0
+    return header_bytes or position, starts, total, position
+
+
+def plan_partitions(files, partition_rows):
+    """
+    Split input files into partitions of at most partition_rows rows
+
+    CSV files are split by row range, located by byte offset so each
+    partition is read with a single seek; Parquet files by row group, so
+    partition_rows does not apply to them.
+
+    Returns:
+        List of {'index', 'path', 'start', 'rows'} dicts, plus 'headerBytes',
+        'offset' and 'end' for CSV or 'rowGroup' for Parquet
+    """
+    partitions = []
+    for path in files:
+        if path.endswith('.parquet'):
+            _require_parquet()
+            import pyarrow.parquet as pq
+            metadata = pq.ParquetFile(path).metadata
+            start = 0
+            for group in range(metadata.num_row_groups):
+                rows = metadata.row_group(group).num_rows
+                partitions.append({'index': len(partitions), 'path': path, 'start': start, 'rows': rows, 'rowGroup': group})
+                start += rows
+        else:
+            header_bytes, starts, total, size = _csv_layout(path, partition_rows)
+            for number, offset in enumerate(starts):
+                start = number * partition_rows
+                partitions.append({
+                    'index': len(partitions), 'path': path, 'start': start, 'rows': min(partition_rows, total - start),
+                    'headerBytes': header_bytes, 'offset': offset,
+                    'end': starts[number + 1] if number + 1 < len(starts) else size
+                })
+    return partitions
+
+
+def _read_partition(partition):
+    path = partition['path']
+    if 'rowGroup' in partition:
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).read_row_group(partition['rowGroup']).to_pandas()
+    with open(path, 'rb') as file:
+        header = file.read(partition['headerBytes'])
+        file.seek(partition['offset'])
+        body = file.read(partition['end'] - partition['offset'])
+    return pd.read_csv(io.BytesIO(header + body))
+
+
+def _init_worker(model_path):
+    global _service
+    from model_service import FraudModelService
+    _service = FraudModelService()
+    if not _service.load_model(model_path):
+        raise RuntimeError(f"Could not load model from {model_path}")
+
+
+def score_frame(service, frame, first_row=0):
+    """
+    Score a DataFrame of transactions
+
+    Args:
+        service: FraudModelService with a loaded model
+        frame: Transactions, one per row; missing cells are left out
+        first_row: Dataset row number of the frame's first row
+
+    Returns:
+        DataFrame with row, transactionId, riskScore, classification,
+        isFraud, status and error columns
+    """
+    records = [
+        {column: value for column, value in record.items() if not pd.isna(value)}
+        for record in frame.to_dict('records')
+    ]
+    results = service.predict_many(records, record=False)
+    rows = []
+    for i, (record, result) in enumerate(zip(records, results)):
+        error = result.get('error')
+        rows.append({
+            'row': first_row + i,
+            'transactionId': record.get('transactionId', result.get('transactionId')),
+            'riskScore': None if error else result['riskScore'],
+            'classification': None if error else result['classification'],
+            'isFraud': None if error else result['isFraud'],
+            'status': None if error else transaction_status(result['riskScore']),
+            'error': error
+        })
+    return pd.DataFrame(rows, columns=['row', 'transactionId', 'riskScore', 'classification', 'isFraud', 'status', 'error'])
+
+
+def _score_partition(partition, output_dir, output_format):
+    """Score one partition and write its output file (runs in a pool worker)"""
+    started = time.perf_counter()
+    scored = score_frame(_service, _read_partition(partition), partition['start'])
+    name = f"part-{partition['index']:05d}.{output_format}"
+    path = os.path.join(output_dir, name)
+    temporary = path + '.tmp'
+    if output_format == 'parquet':
+        scored.to_parquet(temporary, index=False)
+    else:
+        scored.to_csv(temporary, index=False)
+    # A partition file only appears once it is complete
+    os.replace(temporary, path)
+    return {
+        'index': partition['index'],
+        'file': name,
+        'rows': len(scored),
+        'errors': int(scored['error'].notna().sum()),
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+def _job_signature(files, model_path, partition_rows, output_format):
+    """Identifies a job, so a checkpoint is only resumed for the same inputs"""
+    return {
+        'inputs': [{'path': os.path.abspath(path), 'size': os.path.getsize(path), 'mtime': os.path.getmtime(path)} for path in files],
+        'model': file_fingerprint(model_path),
+        'partitionRows': partition_rows,
+        # Checkpoints from before CSV partitions carried byte offsets are not resumed
+        'csvPartitions': 'offsets',
+        'format': output_format
+    }
+
+
+def _write_checkpoint(path, checkpoint):
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(checkpoint, file, indent=2)
+    os.replace(temporary, path)
+
+
+def run_job(source, output_dir, model_path, workers=None, partition_rows=config.BATCH_PARTITION_ROWS,
+            output_format='csv', restart=False):
+    """
+    Score a dataset into partitioned output files, resuming from a checkpoint
+
+    Args:
+        source: Input file, directory or glob of CSV/Parquet files
+        output_dir: Directory for part-NNNNN files and the checkpoint
+        model_path: Model file or artifact each worker loads
+        workers: Worker processes (default: one per CPU)
+        partition_rows: Rows per CSV partition
+        output_format: 'csv' or 'parquet'
+        restart: Discard an existing checkpoint instead of resuming
+
+    Returns:
+        Summary dict with partitions, scored, skipped, rows, errors and seconds
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    if output_format == 'parquet':
+        _require_parquet()
+    started = time.perf_counter()
+    files = input_files(source)
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT_NAME)
+    signature = _job_signature(files, model_path, partition_rows, output_format)
+
+    checkpoint = None
+    if os.path.exists(checkpoint_path) and not restart:
+        with open(checkpoint_path) as file:
+            checkpoint = json.load(file)
+        if checkpoint.get('job') != signature:
+            raise ValueError(f"{checkpoint_path} belongs to a different job (inputs, model or options changed); "
+                             "use a new output directory or restart")
+    if checkpoint is None:
+        checkpoint = {'job': signature, 'partitions': plan_partitions(files, partition_rows), 'completed': {}, 'complete': False}
+        _write_checkpoint(checkpoint_path, checkpoint)
+
+    completed = checkpoint['completed']
+    pending = [
+        partition for partition in checkpoint['partitions']
+        if str(partition['index']) not in completed
+        or not os.path.exists(os.path.join(output_dir, completed[str(partition['index'])]['file']))
+    ]
+    skipped = len(checkpoint['partitions']) - len(pending)
+    if skipped:
+        print(f"⏩ Resuming: {skipped} of {len(checkpoint['partitions'])} partitions already scored")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as executor:
+            futures = [executor.submit(_score_partition, partition, output_dir, output_format) for partition in pending]
+            for future in as_completed(futures):
+                entry = future.result()
+                completed[str(entry['index'])] = entry
+                _write_checkpoint(checkpoint_path, checkpoint)
+                print(f"✅ Partition {entry['index']}: {entry['rows']} rows in {entry['seconds']}s "
+                      f"({len(completed)}/{len(checkpoint['partitions'])})")
+
+    checkpoint['complete'] = True
+    _write_checkpoint(checkpoint_path, checkpoint)
+    return {
+        'partitions': len(checkpoint['partitions']),
+        'scored': len(pending),
+        'skipped': skipped,
+        'rows': sum(entry['rows'] for entry in completed.values()),
+        'errors': sum(entry['errors'] for entry in completed.values()),
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet dataset in parallel into partitioned output files")
+    parser.add_argument('source', help="input file, directory or glob of .csv/.parquet files")
+    parser.add_argument('output_dir', help="directory for the part files and the checkpoint")
+    parser.add_argument('--model', default='optimized_fraud_detection_rf.pkl', help="model file or artifact")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument('--partition-rows', type=int, default=config.BATCH_PARTITION_ROWS,
+                        help=f"rows per CSV partition (default {config.BATCH_PARTITION_ROWS})")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='csv', help="output format")
+    parser.add_argument('--restart', action='store_true', help="ignore an existing checkpoint and start over")
+    args = parser.parse_args()
+
+    summary = run_job(args.source, args.output_dir, args.model, args.workers, args.partition_rows, args.format, args.restart)
+    print(f"🏁 {summary['rows']} rows in {summary['partitions']} partitions "
+          f"({summary['scored']} scored, {summary['skipped']} resumed, {summary['errors']} errors) in {summary['seconds']}s")
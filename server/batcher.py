@@ -0,0 +1,160 @@
+"""
+Micro-batching for the fraud model service
+Coalesces concurrent single-transaction predictions into one vectorized
+predict_many call and resolves each caller's future individually
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from profiling import StageTrace, current_trace, tracing
+
+_STOP = object()
+
+
+class PredictionBatcher:
+    """
+    Dynamic batcher in front of FraudModelService.predict_many
+
+    Requests are queued; a worker thread takes the first waiting request,
+    keeps collecting until the batching window has elapsed or the batch is
+    full, then scores everything in a single call. predict_many featurizes
+    each row on its own, so a request gets the same prediction whatever
+    else lands in its window. Requests traced with X-Profile get their
+    queue wait and the batch's stages on their trace.
+    """
+
+    def __init__(self, predict_many, window_ms=2.0, max_batch_size=64, timeout=10.0):
+        """
+        Args:
+            predict_many: Callable scoring a list of transactions, returning
+                one result per row ({'error': ...} for rows that failed)
+            window_ms: Longest time the first request waits for company
+            max_batch_size: Maximum number of rows per model call
+            timeout: Seconds predict() waits for a result by default
+        """
+        self.predict_many = predict_many
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._max_batch = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._worker = threading.Thread(target=self._run, name='prediction-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, transaction_data):
+        """Queue a transaction and return a Future for its prediction"""
+        future = Future()
+        self._queue.put((transaction_data, future, time.perf_counter(), current_trace()))
+        return future
+
+    def predict(self, transaction_data, timeout=None):
+        """
+        Queue a transaction and wait for its prediction
+        
+        Args:
+            transaction_data: Transaction dict
+            timeout: Seconds to wait (default self.timeout); a request still
+                queued by then is withdrawn
+        
+        Raises:
+            TimeoutError: No result within the timeout, e.g. because the
+                worker thread is stuck or has died
+        """
+        timeout = self.timeout if timeout is None else timeout
+        future = self.submit(transaction_data)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise TimeoutError(
+                f"Prediction not ready after {timeout:g}s "
+                f"({self._queue.qsize()} queued, worker {'alive' if self._worker.is_alive() else 'stopped'})"
+            ) from None
+
+    def close(self):
+        """Stop the worker once the requests already queued have been scored"""
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    def stats(self):
+        """Batch size and queue wait metrics since startup"""
+        with self._stats_lock:
+            return {
+                'window_ms': self.window * 1000.0,
+                'max_batch_size': self.max_batch_size,
+                'queued': self._queue.qsize(),
+                'batches': self._batches,
+                'rows': self._rows,
+                'avg_batch_size': self._rows / self._batches if self._batches else 0.0,
+                'largest_batch': self._max_batch,
+                'avg_queue_wait_ms': self._total_wait / self._rows * 1000.0 if self._rows else 0.0,
+                'max_queue_wait_ms': self._max_wait * 1000.0
+            }
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = item[2] + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._score(batch)
+
+    def _score(self, batch):
+        # Callers that timed out have cancelled their futures; skip their rows
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.perf_counter()
+        waits = [started - enqueued for _, _, enqueued, _ in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._rows += len(batch)
+            self._max_batch = max(self._max_batch, len(batch))
+            self._total_wait += sum(waits)
+            self._max_wait = max(self._max_wait, max(waits))
+
+        # The batch's stages run on this thread; traced requests each get a copy
+        traced = any(trace is not None for _, _, _, trace in batch)
+        batch_trace = StageTrace() if traced else None
+        try:
+            with tracing(batch_trace):
+                results = self.predict_many([transaction_data for transaction_data, _, _, _ in batch])
+        except Exception as e:
+            results = None
+            error = e
+        if traced:
+            for (_, _, _, trace), wait in zip(batch, waits):
+                if trace is not None:
+                    trace.add('queue', wait)
+                    trace.extend(batch_trace)
+
+        if results is None:
+            for _, future, _, _ in batch:
+                future.set_exception(error)
+            return
+
+        for (_, future, _, _), result in zip(batch, results):
+            if 'error' in result:
+                future.set_exception(ValueError(result['error']))
+            else:
+                future.set_result(result)
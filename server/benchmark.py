@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Benchmark the model service hot path
+Times preprocess_data, predict/predict_many, get_analytics and the /predict
+routes at several batch sizes against a synthetic forest, reports
+p50/p95/p99 latency and rows/sec, and writes the results as JSON so runs
+from different commits can be compared.
+
+Usage: python benchmark.py [--trees 100] [--depth 12] [--batch-sizes 1,10,100,1000,10000] [-o results.json]
+       python benchmark.py --compare baseline.json          # exit 1 on a p50 regression
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+
+import model_service
+from model_bundle import synthetic_transactions
+from model_service import FraudModelService
+
+DEFAULT_BATCH_SIZES = [1, 10, 100, 1000, 10000]
+CASES = ['preprocess_data', 'predict', 'get_analytics', 'route']
+
+
+def synthetic_forest(trees=100, depth=12, rows=5000, seed=0):
+    """
+    Random forest trained on synthetic transactions, with the service's feature columns
+
+    Returns:
+        (model, transactions) - the transactions it was trained on
+    """
+    transactions = synthetic_transactions(rows, seed=seed)
+    features = FraudModelService().preprocess_data(transactions).drop(columns=['timestamp'])
+    rng = np.random.default_rng(seed)
+    # Fraud gets likelier with the amount, plus noise so trees grow to full depth
+    labels = (features['transactionAmount'] * rng.uniform(0.5, 1.5, len(features)) > 300).astype(int)
+    model = RandomForestClassifier(n_estimators=trees, max_depth=depth, random_state=seed, n_jobs=1)
+    model.fit(features, labels)
+    return model, transactions
+
+
+def measure(fn, rows, min_time=0.5, min_iterations=5, max_iterations=1000, warmup=2):
+    """
+    Time fn() repeatedly
+
+    Runs until both min_time seconds and min_iterations calls have passed
+    (but at most max_iterations calls).
+
+    Returns:
+        Dict with iterations, mean/p50/p95/p99 latency in ms and rowsPerSecond
+    """
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < max_iterations:
+        call_started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - call_started)
+        if len(latencies) >= min_iterations and time.perf_counter() - started >= min_time:
+            break
+    latencies = np.array(latencies) * 1000
+    mean = float(latencies.mean())
+    return {
+        'iterations': len(latencies),
+        'meanMs': round(mean, 4),
+        'p50Ms': round(float(np.percentile(latencies, 50)), 4),
+        'p95Ms': round(float(np.percentile(latencies, 95)), 4),
+        'p99Ms': round(float(np.percentile(latencies, 99)), 4),
+        'rowsPerSecond': round(rows / (mean / 1000), 1) if mean > 0 else None
+    }
+
+
+def _fresh_service(bundle):
+    """Service with the benchmark model and empty history, so runs do not affect each other"""
+    service = FraudModelService()
+    service.bundle = bundle
+    return service
+
+
+def _case(name, bundle, transactions, batch_size):
+    """The callable timed for a case at a batch size"""
+    batch = transactions[:batch_size]
+    if name == 'preprocess_data':
+        service = _fresh_service(bundle)
+        return lambda: service.preprocess_data(batch, bundle)
+    if name == 'predict':
+        service = _fresh_service(bundle)
+        if batch_size == 1:
+            return lambda: service.predict(batch[0])
+        return lambda: service.predict_many(batch)
+    if name == 'get_analytics':
+        # The batch size is the number of predictions in the history
+        service = _fresh_service(bundle)
+        service.predict_many(batch)
+        return service.get_analytics
+    if name == 'route':
+        service = model_service.fraud_service
+        service.bundle = bundle
+        client = model_service.app.test_client()
+        if batch_size == 1:
+            return lambda: client.post('/predict', json=batch[0])
+        return lambda: client.post('/predict/batch', json={'transactions': batch})
+    raise ValueError(f"Unknown benchmark case: {name}")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(trees=100, depth=12, batch_sizes=DEFAULT_BATCH_SIZES, cases=CASES, min_time=0.5, max_iterations=1000, verbose=True):
+    """
+    Run the benchmark suite
+
+    Returns:
+        Dict with 'meta' (commit, versions, model settings) and one 'results'
+        entry per case and batch size
+    """
+    model, _ = synthetic_forest(trees, depth)
+    setup = FraudModelService()
+    setup.model = model
+    setup._compile_features()
+    setup._compile_forest()
+    bundle = setup.bundle
+    transactions = synthetic_transactions(max(batch_sizes), seed=1)
+
+    results = []
+    # The route case scores through the app's global service
+    previous = model_service.fraud_service.bundle
+    try:
+        for name in cases:
+            for batch_size in batch_sizes:
+                stats = measure(_case(name, bundle, transactions, batch_size), batch_size,
+                                min_time=min_time, max_iterations=max_iterations)
+                results.append(dict(case=name, batchSize=batch_size, **stats))
+                if verbose:
+                    print(f"⏱️  {name:<16} {batch_size:>6} rows  p50 {stats['p50Ms']:>10.3f} ms  "
+                          f"p99 {stats['p99Ms']:>10.3f} ms  {stats['rowsPerSecond']:>12} rows/s")
+    finally:
+        model_service.fraud_service.bundle = previous
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'sklearn': sklearn.__version__,
+            'machine': platform.machine(),
+            'trees': trees,
+            'depth': depth,
+            'inferenceBackend': bundle.inference_backend
+        },
+        'results': results
+    }
+
+
+def compare(baseline, current, tolerance=0.10):
+    """
+    p50 changes of current against baseline, for cases present in both
+
+    Returns:
+        List of {'case', 'batchSize', 'baselineMs', 'currentMs', 'change', 'regression'}
+    """
+    previous = {(result['case'], result['batchSize']): result for result in baseline['results']}
+    changes = []
+    for result in current['results']:
+        before = previous.get((result['case'], result['batchSize']))
+        if before is None or not before['p50Ms']:
+            continue
+        change = result['p50Ms'] / before['p50Ms'] - 1
+        changes.append({
+            'case': result['case'],
+            'batchSize': result['batchSize'],
+            'baselineMs': before['p50Ms'],
+            'currentMs': result['p50Ms'],
+            'change': round(change, 4),
+            'regression': change > tolerance
+        })
+    return changes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the fraud model service hot path")
+    parser.add_argument('--trees', type=int, default=100, help="trees in the synthetic forest")
+    parser.add_argument('--depth', type=int, default=12, help="maximum tree depth")
+    parser.add_argument('--batch-sizes', default=','.join(map(str, DEFAULT_BATCH_SIZES)),
+                        help="comma-separated batch sizes")
+    parser.add_argument('--cases', default=','.join(CASES), help=f"comma-separated subset of {','.join(CASES)}")
+    parser.add_argument('--min-time', type=float, default=0.5, help="seconds spent timing each case")
+    parser.add_argument('-o', '--output', help="write results as JSON to this file")
+    parser.add_argument('--compare', metavar='BASELINE', help="JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="p50 slowdown counted as a regression")
+    args = parser.parse_args()
+
+    print(f"🧪 Benchmarking with a {args.trees}-tree forest of depth {args.depth}")
+    report = run(
+        trees=args.trees,
+        depth=args.depth,
+        batch_sizes=[int(size) for size in args.batch_sizes.split(',')],
+        cases=args.cases.split(','),
+        min_time=args.min_time
+    )
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"💾 Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        changes = compare(baseline, report, args.tolerance)
+        print(f"\n📊 Compared with {args.compare} (commit {baseline['meta'].get('commit')})")
+        for change in changes:
+            marker = '❌' if change['regression'] else '✅'
+            print(f"{marker} {change['case']:<16} {change['batchSize']:>6} rows  "
+                  f"{change['baselineMs']:.3f} -> {change['currentMs']:.3f} ms ({change['change']:+.1%})")
+        if any(change['regression'] for change in changes):
+            sys.exit(1)
@@ -1,5 +1,66 @@
+import os
+
 # Model Configuration
 MODEL_PATH = "E:\frauddetection\models\fraud_model.pkl"
 MODEL_NAME = "optimized_fraud_detection_rf.pkl"
 SERVER_HOST = "localhost"
 SERVER_PORT = 5000
+
+# Inference backend: "sklearn" uses the model's own predict_proba,
+# "compiled" flattens supported tree ensembles into NumPy arrays
+INFERENCE_BACKEND = "sklearn"
+
+# Micro-batching of concurrent /predict requests: requests are held for up
+# to BATCH_WINDOW_MS (or until BATCH_MAX_SIZE rows) and scored together
+BATCH_PREDICTIONS = False
+BATCH_WINDOW_MS = 2.0
+BATCH_MAX_SIZE = 64
+# Seconds a batched /predict waits for its result before answering 503
+BATCH_TIMEOUT_SECONDS = 10.0
+
+# Number of recent predictions kept in memory for /history and /analytics
+HISTORY_CAPACITY = 10000
+
+# Per-feature explanations: cached per feature vector, and attached inline
+# to flagged (isFraud) predictions when EXPLAIN_FLAGGED is on
+EXPLANATION_CACHE_SIZE = 10000
+EXPLAIN_FLAGGED = False
+
+# Cache of risk scores keyed by model fingerprint + feature vector, so
+# retried and replayed transactions skip the model; cleared on model load
+PREDICTION_CACHE = False
+PREDICTION_CACHE_SIZE = 100000
+PREDICTION_CACHE_TTL = 300
+
+# Rows in the synthetic batch scored through a newly loaded model before it
+# is swapped in for live traffic
+MODEL_WARMUP_ROWS = 64
+
+# Worker processes forked after the model is loaded (python model_service.py
+# --workers N overrides); 0 runs the single-process Flask development server
+SERVING_WORKERS = 0
+# Seconds /load-model waits for each of the other workers to load and warm up
+# the model; slower workers are reported as unanswered, not waited for
+CLUSTER_LOAD_TIMEOUT_SECONDS = 120.0
+
+# ASGI variant (asgi_service.py): threads running preprocessing + inference,
+# requests allowed in flight before answering 429, and the body size limit
+ASGI_WORKER_THREADS = 8
+ASGI_MAX_PENDING = 64
+ASGI_MAX_BODY_BYTES = 16 * 1024 * 1024
+
+# Most transactions accepted by one /predict/batch call (413 above it);
+# larger inputs belong on /predict/stream
+PREDICT_BATCH_MAX_ROWS = 10000
+
+# Rows per vectorized model call when streaming large inputs through
+# /predict/stream and score_stream.py
+STREAM_BATCH_SIZE = 1000
+
+# Rows per partition for the offline batch scorer (batch_scorer.py); each
+# partition is scored by one pool worker and written to its own file
+BATCH_PARTITION_ROWS = 100000
+
+# Shared secret for admin endpoints (/admin/profile), sent as X-Admin-Token;
+# the endpoints are disabled while it is unset
+ADMIN_TOKEN = os.environ.get('FRAUD_ADMIN_TOKEN')
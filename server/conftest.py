@@ -0,0 +1,119 @@
+"""
+Shared fixtures and helpers for the model service tests
+Helpers are imported by name too, so the test files still run as plain scripts
+"""
+
+import contextlib
+import pickle
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import model_service
+from model_service import FraudModelService
+
+COLUMNS = ['transactionAmount', 'accountBalance']
+# Layout of the pickled models: one categorical and one timestamp feature too
+MODEL_FILE_COLUMNS = ['transactionAmount', 'accountBalance', 'deviceType', 'hour']
+START = datetime(2025, 9, 20, 10, 30, 0, 123456)
+# Without and with the keys device_risk_service scores on
+PARTIAL_TRANSACTION = {'transactionId': 'TXN_P', 'transactionAmount': 250.0, 'accountBalance': 900.0}
+COMPLETE_TRANSACTION = dict(PARTIAL_TRANSACTION, transactionId='TXN_C', deviceType='Mobile',
+                            timestamp='2025-09-20T10:30:00')
+
+_RISK_LABELS = FraudModelService()
+
+
+def small_service():
+    """A fresh service with a small forest on COLUMNS flagging amounts over 500"""
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.uniform(0, 1000, size=(200, len(COLUMNS))), columns=COLUMNS)
+    service = FraudModelService()
+    service.model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, X['transactionAmount'] > 500)
+    service._compile_features()
+    service._compile_forest()
+    return service
+
+
+def device_risk_service():
+    """A service whose forest flags Mobile (device code 0) and ignores the rest
+
+    Scoring a transaction without a deviceType as Mobile, as a batch-mate's
+    deviceType key once made happen, changes its verdict.
+    """
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({
+        'transactionAmount': rng.uniform(0, 1000, 300), 'accountBalance': rng.uniform(0, 1000, 300),
+        'deviceType': rng.integers(0, 7, 300).astype(float), 'hour': rng.integers(0, 24, 300).astype(float)
+    })
+    service = FraudModelService()
+    service.model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, X['deviceType'] == 0)
+    service._compile_features()
+    return service
+
+
+def make_transactions(n):
+    """n transactions with ids TXN_0.. for small_service's layout"""
+    return [{'transactionId': f'TXN_{i}', 'transactionAmount': float(i * 37 % 1000), 'accountBalance': 500.0}
+            for i in range(n)]
+
+
+def model_file(directory, name, seed):
+    """Pickle a forest on MODEL_FILE_COLUMNS into directory/name and return its path"""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.uniform(0, 1000, size=(300, len(MODEL_FILE_COLUMNS))), columns=MODEL_FILE_COLUMNS)
+    y = (X['transactionAmount'] > 500).astype(int)
+    model = RandomForestClassifier(n_estimators=10, random_state=seed).fit(X, y)
+    path = directory / name
+    with open(path, 'wb') as file:
+        pickle.dump({'model': model}, file)
+    return str(path)
+
+
+def make_prediction(i):
+    """The i-th of a series of prediction results, one second apart from START"""
+    risk_score = (i % 10) / 10 + 0.05
+    return {
+        'riskScore': risk_score,
+        'fraudProbability': float(risk_score * 100),
+        'isFraud': risk_score >= 0.7,
+        'classification': _RISK_LABELS._classify_risk(risk_score),
+        'confidence': _RISK_LABELS._calculate_confidence(risk_score),
+        'timestamp': (START + timedelta(seconds=i)).isoformat(),
+        'transactionId': f'TXN_{i}'
+    }
+
+
+@contextlib.contextmanager
+def serving(service=None):
+    """
+    Use the app's global fraud_service, optionally serving another
+    service's model, and put back its models and the batcher afterwards
+    """
+    live = model_service.fraud_service
+    saved = live.bundle, live.previous_bundle, model_service.batcher
+    try:
+        if service is not None:
+            live.bundle = service.bundle
+        yield live
+    finally:
+        if model_service.batcher is not None and model_service.batcher is not saved[2]:
+            model_service.batcher.close()
+        live.bundle, live.previous_bundle, model_service.batcher = saved
+
+
+@pytest.fixture
+def live_service():
+    """The app's fraud_service, serving small_service()'s model"""
+    with serving(small_service()) as service:
+        yield service
+
+
+@pytest.fixture
+def app_service():
+    """The app's fraud_service, for tests that load or swap models through it"""
+    with serving() as service:
+        yield service
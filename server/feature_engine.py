@@ -0,0 +1,196 @@
+"""
+Compiled feature extraction for the fraud model service
+Turns raw transaction dicts straight into a NumPy feature matrix without
+going through pandas, producing the same values as
+FraudModelService.preprocess_data
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ['deviceType', 'merchantCategory', 'ipAddressFlag', 'previousFraudulentActivity', 'transactionType']
+NUMERICAL_COLUMNS = ['transactionAmount', 'accountBalance']
+TIMESTAMP_COLUMNS = ['hour', 'day_of_week', 'is_weekend']
+
+# Simple mapping (you might need to adjust based on your model's training)
+CATEGORICAL_ENCODINGS = {
+    'deviceType': {
+        'Mobile': 0, 'Desktop': 1, 'Tablet': 2, 'ATM': 3,
+        'POS Terminal': 4, 'Web Browser': 5, 'Other': 6
+    },
+    'merchantCategory': {
+        'Grocery': 0, 'Gas Station': 1, 'Restaurant': 2, 'Retail': 3,
+        'Online Shopping': 4, 'Entertainment': 5, 'Healthcare': 6,
+        'Travel': 7, 'Utilities': 8, 'Financial Services': 9, 'Other': 10
+    },
+    'ipAddressFlag': {
+        'Safe': 0, 'Suspicious': 1, 'High Risk': 2, 'Blacklisted': 3, 'Unknown': 4
+    },
+    'previousFraudulentActivity': {
+        'None': 0, 'Low Risk': 1, 'Medium Risk': 2, 'High Risk': 3, 'Previously Flagged': 4
+    },
+    'transactionType': {
+        'Purchase': 0, 'Withdrawal': 1, 'Transfer': 2, 'Deposit': 3,
+        'Refund': 4, 'Payment': 5, 'Other': 6
+    }
+}
+
+_MISSING = object()
+_NAN = float('nan')
+
+
+class FeatureEngine:
+    """
+    Fixed-layout feature extractor compiled once per loaded model
+
+    The column layout comes from the model's feature_names_in_, and the
+    categorical lookup tables and scaler parameters are resolved up front,
+    so transforming a transaction is a single pass over the layout writing
+    into a preallocated float64 matrix.
+    """
+
+    def __init__(self, columns, scaler=None):
+        """
+        Args:
+            columns: Feature names in the order the model expects them
+            scaler: Optional fitted StandardScaler or MinMaxScaler
+        """
+        self.columns = list(columns)
+        self._categorical = []
+        self._numerical = []
+        self._timestamp = []
+        for index, column in enumerate(self.columns):
+            if column in CATEGORICAL_ENCODINGS:
+                # Lookup values are stored as floats so rows need no casting
+                table = {key: float(code) for key, code in CATEGORICAL_ENCODINGS[column].items()}
+                self._categorical.append((index, column, table))
+            elif column in NUMERICAL_COLUMNS:
+                self._numerical.append((index, column))
+            elif column in TIMESTAMP_COLUMNS:
+                self._timestamp.append((index, TIMESTAMP_COLUMNS.index(column)))
+            else:
+                raise ValueError(f"No compiled extractor for feature '{column}'")
+        self._scaling = self._compile_scaler(scaler)
+
+    @classmethod
+    def compile(cls, model, scaler=None, encoder=None):
+        """
+        Build an engine for a loaded model, or return None when the model's
+        preprocessing cannot be reproduced exactly without pandas
+        """
+        if encoder is not None or getattr(model, 'feature_names_in_', None) is None:
+            return None
+        try:
+            return cls(model.feature_names_in_, scaler)
+        except ValueError as e:
+            print(f"Compiled feature extraction unavailable: {str(e)}")
+            return None
+
+    def _compile_scaler(self, scaler):
+        """Resolve scaler parameters to (column indices, operations) for the layout"""
+        if scaler is None:
+            return None
+
+        from sklearn.preprocessing import MinMaxScaler, StandardScaler
+        scaled_columns = list(getattr(scaler, 'feature_names_in_', []))
+        if not scaled_columns:
+            raise ValueError("Scaler was not fitted with feature names")
+
+        positions = [scaled_columns.index(column) if column in scaled_columns else None for column in self.columns]
+        indices = np.array([i for i, position in enumerate(positions) if position is not None], dtype=np.intp)
+        source = np.array([position for position in positions if position is not None], dtype=np.intp)
+
+        # Same operations, in the same order, as the scaler's transform
+        if isinstance(scaler, StandardScaler):
+            ops = []
+            if scaler.with_mean:
+                ops.append(('sub', scaler.mean_[source]))
+            if scaler.with_std:
+                ops.append(('div', scaler.scale_[source]))
+        elif isinstance(scaler, MinMaxScaler) and not scaler.clip:
+            ops = [('mul', scaler.scale_[source]), ('add', scaler.min_[source])]
+        else:
+            raise ValueError(f"Unsupported scaler type: {type(scaler).__name__}")
+        return indices, ops
+
+    def transform(self, transactions):
+        """
+        Extract features for one transaction dict or a list of them
+
+        Each row depends only on its own transaction: a key it lacks is
+        missing (NaN) however many other rows in the batch have it.
+
+        Returns:
+            float64 array of shape (n_transactions, n_features)
+        """
+        rows = transactions if isinstance(transactions, list) else [transactions]
+        matrix = np.empty((len(rows), len(self.columns)), dtype=np.float64)
+        for row_index, transaction in enumerate(rows):
+            self._fill_row(transaction, matrix[row_index])
+
+        if self._scaling is not None:
+            indices, ops = self._scaling
+            block = matrix[:, indices]
+            for op, values in ops:
+                if op == 'sub':
+                    block -= values
+                elif op == 'div':
+                    block /= values
+                elif op == 'mul':
+                    block *= values
+                else:
+                    block += values
+            matrix[:, indices] = block
+        return matrix
+
+    def _fill_row(self, transaction, row):
+        """Write a single transaction's features into a preallocated row"""
+        for index, column, table in self._categorical:
+            value = transaction.get(column, _MISSING)
+            row[index] = _NAN if value is _MISSING else table.get(value, 0.0)
+
+        for index, column in self._numerical:
+            row[index] = _to_number(transaction.get(column))
+
+        if self._timestamp:
+            if 'timestamp' in transaction:
+                parts = _timestamp_parts(transaction['timestamp'])
+                for index, part in self._timestamp:
+                    row[index] = parts[part]
+            else:
+                for index, _ in self._timestamp:
+                    row[index] = _NAN
+
+
+def _to_number(value):
+    """Equivalent of pd.to_numeric(value, errors='coerce') for a scalar"""
+    if value is None:
+        return _NAN
+    if isinstance(value, str) and (not value.isascii() or '_' in value):
+        # pandas' parser only takes ASCII digits without '_' separators,
+        # where float() also accepts '1_000' and other scripts' digits
+        return _NAN
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return _NAN
+
+
+def _timestamp_parts(value):
+    """Return (hour, day_of_week, is_weekend) the way pd.to_datetime would"""
+    parsed = None
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            parsed = None
+    if parsed is None:
+        # Anything other than an ISO string keeps pandas' parsing rules
+        parsed = pd.to_datetime(value)
+        if pd.isna(parsed):
+            # NaT gives NaN hour/day, and isin([5, 6]) is False for NaN
+            return _NAN, _NAN, 0.0
+    day_of_week = parsed.weekday()
+    return float(parsed.hour), float(day_of_week), 1.0 if day_of_week >= 5 else 0.0
@@ -0,0 +1,182 @@
+"""
+Feature importance for the fraud model service
+Computes impurity-based importances once per model and runs permutation
+importance jobs in a background process, caching both by model fingerprint
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from forest_engine import MANIFEST_NAME, PREPROCESSORS_NAME
+
+FEATURE_LABELS = {
+    'transactionAmount': 'Transaction Amount',
+    'accountBalance': 'Account Balance',
+    'deviceType': 'Device Type',
+    'merchantCategory': 'Merchant Category',
+    'ipAddressFlag': 'IP Address Flag',
+    'previousFraudulentActivity': 'Previous Fraudulent Activity',
+    'transactionType': 'Transaction Type',
+    'hour': 'Hour of Day',
+    'day_of_week': 'Day of Week',
+    'is_weekend': 'Weekend'
+}
+
+# Served when the model does not expose feature_importances_
+DEFAULT_FEATURE_IMPORTANCE = [
+    {'feature': 'Transaction Amount', 'importance': 25},
+    {'feature': 'IP Address Flag', 'importance': 25},
+    {'feature': 'Device Type', 'importance': 20},
+    {'feature': 'Merchant Category', 'importance': 15},
+    {'feature': 'Account Balance', 'importance': 15}
+]
+
+
+def file_fingerprint(path):
+    """
+    SHA-256 of a model file, used to key everything cached per model
+
+    For a model artifact directory this covers only what scoring depends
+    on: the feature names and classes, the checksum of every array (from
+    the manifest) and the pickled preprocessors. Export details such as
+    the time are left out, so re-exporting a model keeps its fingerprint.
+    """
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        with open(os.path.join(path, MANIFEST_NAME)) as file:
+            manifest = json.load(file)
+        content = {
+            'featureNames': manifest.get('featureNames'),
+            'classes': manifest.get('classes'),
+            'arrays': {name: array['sha256'] for name, array in manifest['arrays'].items()}
+        }
+        digest.update(json.dumps(content, sort_keys=True).encode())
+        path = os.path.join(path, PREPROCESSORS_NAME)
+        if not os.path.exists(path):
+            return digest.hexdigest()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def feature_names(model):
+    """Feature names for a model, falling back to positional names"""
+    if getattr(model, 'feature_names_in_', None) is not None:
+        return [str(name) for name in model.feature_names_in_]
+    return [f'feature_{i}' for i in range(getattr(model, 'n_features_in_', 0))]
+
+
+def ranked(names, importances):
+    """Importance list in the /analytics format: labelled, in percent, largest first"""
+    importances = np.asarray(importances, dtype=np.float64)
+    total = importances.clip(min=0).sum()
+    if total > 0:
+        importances = importances / total
+    ranking = [
+        {'feature': FEATURE_LABELS.get(name, name), 'importance': round(float(value) * 100, 1)}
+        for name, value in zip(names, importances)
+    ]
+    return sorted(ranking, key=lambda item: item['importance'], reverse=True)
+
+
+def _permutation_job(model, X, y, n_repeats, random_state):
+    """Runs in a worker process so scoring threads are never blocked"""
+    from sklearn.inspection import permutation_importance
+    result = permutation_importance(model, X, y, n_repeats=n_repeats, random_state=random_state)
+    return result.importances_mean
+
+
+class FeatureImportanceCache:
+    """
+    Per-model feature importances keyed by model fingerprint
+
+    Impurity importances are computed synchronously when a model is
+    registered (they are already stored on the fitted forest); permutation
+    importances are computed on request by a single background process.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        # Guards creating and replacing the background process pool
+        self._executor_lock = threading.Lock()
+        self._executor = None
+
+    def register(self, fingerprint, model):
+        """Compute impurity importances for a model unless already cached"""
+        with self._lock:
+            if fingerprint in self._entries:
+                return self._entries[fingerprint]
+
+        if hasattr(model, 'feature_importances_'):
+            impurity = ranked(feature_names(model), model.feature_importances_)
+        else:
+            impurity = None
+        entry = {'impurity': impurity, 'permutation': None, 'permutationStatus': 'not_started'}
+        with self._lock:
+            return self._entries.setdefault(fingerprint, entry)
+
+    def get(self, fingerprint):
+        """Cached entry for a model fingerprint, or None"""
+        with self._lock:
+            return self._entries.get(fingerprint)
+
+    def best(self, fingerprint):
+        """Permutation importances if computed, else impurity, else the defaults"""
+        entry = self.get(fingerprint)
+        if entry is None:
+            return DEFAULT_FEATURE_IMPORTANCE
+        return entry['permutation'] or entry['impurity'] or DEFAULT_FEATURE_IMPORTANCE
+
+    def start_permutation(self, fingerprint, model, X, y, n_repeats=5, random_state=0):
+        """
+        Queue a permutation importance job for a labelled sample
+
+        Returns:
+            False if a job for this model is already running, else True
+        """
+        entry = self.register(fingerprint, model)
+        with self._lock:
+            if entry['permutationStatus'] == 'running':
+                return False
+            entry['permutationStatus'] = 'running'
+
+        names = feature_names(model)
+        try:
+            future = self._submit(_permutation_job, model, X, y, n_repeats, random_state)
+        except Exception as e:
+            with self._lock:
+                entry['permutationStatus'] = f'failed: {e}'
+            raise
+
+        def _store(done):
+            with self._lock:
+                # exception() raises for a cancelled future, so check that first
+                if done.cancelled():
+                    entry['permutationStatus'] = 'cancelled'
+                elif done.exception() is not None:
+                    entry['permutationStatus'] = f'failed: {done.exception()}'
+                else:
+                    entry['permutation'] = ranked(names, done.result())
+                    entry['permutationStatus'] = 'done'
+
+        future.add_done_callback(_store)
+        return True
+
+    def _submit(self, fn, *args):
+        """Submit to the background process, starting it on first use and replacing a broken or shut-down pool"""
+        with self._executor_lock:
+            if self._executor is not None:
+                try:
+                    return self._executor.submit(fn, *args)
+                except RuntimeError:
+                    # BrokenProcessPool, or the pool was shut down
+                    self._executor = None
+            self._executor = ProcessPoolExecutor(max_workers=1)
+            return self._executor.submit(fn, *args)
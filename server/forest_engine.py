@@ -0,0 +1,347 @@
+"""
+Compiled random-forest inference for the fraud model service
+Flattens the trees of a fitted sklearn forest into contiguous NumPy arrays
+and evaluates them with a vectorized traversal over the whole batch; the
+arrays can be saved as a model artifact and memory-mapped back in
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Model artifact layout: one .npy file per node array plus a JSON manifest;
+# missing_left is only written for forests that route NaN values
+ARTIFACT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+# Scaler/encoder that model_bundle.export_model_artifact pickles next to the arrays
+PREPROCESSORS_NAME = 'preprocessors.pkl'
+ARRAY_NAMES = ['feature', 'threshold', 'left', 'right', 'value', 'roots', 'missing_left']
+
+
+class CompiledForest:
+    """
+    Flattened tree ensemble with the same predict_proba output as sklearn
+
+    All trees share one set of node arrays; child indices are global, and
+    leaves point to themselves so every sample can be advanced for a fixed
+    number of steps (the deepest tree's depth) without branching.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth,
+                 classes, n_features, feature_names=None, estimator=None, feature_importances=None,
+                 missing_left=None):
+        """
+        Args:
+            feature, threshold, left, right: Per-node split arrays
+            value: Per-node class probabilities, shape (n_nodes, n_classes)
+            roots: Index of each tree's root node
+            missing_left: Per-node flag sending NaN values left, for sklearn
+                versions whose trees route missing values; None otherwise
+            max_depth: Depth of the deepest tree
+            classes: Class labels, in predict_proba column order
+            n_features: Number of input features
+            feature_names: Input feature names, if the model was fitted with them
+            estimator: The sklearn estimator the arrays were built from, used
+                for inputs the compiled path does not handle; None for a
+                forest loaded from an artifact
+            feature_importances: Impurity importances saved in an artifact
+        """
+        self.estimator = estimator
+        self.classes_ = np.asarray(classes)
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object) if feature_names is not None else None
+        self.n_features_in_ = int(n_features)
+        if feature_importances is not None:
+            self.feature_importances_ = np.asarray(feature_importances, dtype=np.float64)
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.missing_left = missing_left
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        """
+        Compile a fitted RandomForestClassifier, ExtraTreesClassifier or
+        DecisionTreeClassifier; returns None for anything else
+        """
+        from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+        from sklearn.tree import DecisionTreeClassifier
+
+        if isinstance(estimator, (RandomForestClassifier, ExtraTreesClassifier)):
+            trees = [tree.tree_ for tree in getattr(estimator, 'estimators_', [])]
+        elif isinstance(estimator, DecisionTreeClassifier):
+            trees = [estimator.tree_] if hasattr(estimator, 'tree_') else []
+        else:
+            return None
+        if not trees or getattr(estimator, 'n_outputs_', 1) != 1:
+            return None
+
+        routes_missing = _routes_missing_values(estimator) and all(hasattr(tree, 'missing_go_to_left') for tree in trees)
+        features, thresholds, lefts, rights, values, roots, missing = [], [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            node_ids = np.arange(tree.node_count, dtype=np.intp)
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop back to themselves; their split always goes "left"
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+            feature = np.where(is_leaf, 0, tree.feature)
+            threshold = np.where(is_leaf, np.inf, tree.threshold)
+
+            value = tree.value[:, 0, :].astype(np.float64)
+            if _normalizes_tree_values():
+                # Same normalization as DecisionTreeClassifier.predict_proba
+                normalizer = value.sum(axis=1)
+                normalizer[normalizer == 0.0] = 1.0
+                value /= normalizer[:, np.newaxis]
+
+            features.append(feature)
+            thresholds.append(threshold)
+            lefts.append(left)
+            rights.append(right)
+            values.append(value)
+            if routes_missing:
+                missing.append(np.asarray(tree.missing_go_to_left, dtype=bool))
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+            right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.array(roots, dtype=np.intp),
+            missing_left=np.concatenate(missing) if routes_missing else None,
+            max_depth=max(tree.max_depth for tree in trees),
+            classes=estimator.classes_,
+            n_features=estimator.n_features_in_,
+            feature_names=getattr(estimator, 'feature_names_in_', None),
+            estimator=estimator,
+        )
+
+    def save(self, directory, source=None):
+        """
+        Write the forest as a model artifact: flat .npy node arrays plus a
+        JSON manifest describing them
+
+        Args:
+            directory: Artifact directory, created if missing
+            source: Optional dict about the model the forest came from,
+                recorded in the manifest
+
+        Returns:
+            The manifest dict
+        """
+        os.makedirs(directory, exist_ok=True)
+        arrays = {}
+        for name in ARRAY_NAMES:
+            if getattr(self, name) is None:
+                continue
+            array = np.ascontiguousarray(getattr(self, name))
+            filename = f'{name}.npy'
+            np.save(os.path.join(directory, filename), array, allow_pickle=False)
+            arrays[name] = {
+                'file': filename,
+                'dtype': array.dtype.str,
+                'shape': list(array.shape),
+                'sha256': hashlib.sha256(array.tobytes()).hexdigest()
+            }
+
+        importances = getattr(self, 'feature_importances_', None)
+        if importances is None and self.estimator is not None:
+            importances = getattr(self.estimator, 'feature_importances_', None)
+        manifest = {
+            'format': 'compiled-forest',
+            'version': ARTIFACT_VERSION,
+            'estimator': type(self.estimator).__name__ if self.estimator is not None else None,
+            'classes': self.classes_.tolist(),
+            'featureNames': [str(name) for name in self.feature_names_in_] if self.feature_names_in_ is not None else None,
+            'nFeatures': self.n_features_in_,
+            'nTrees': len(self.roots),
+            'nNodes': len(self.feature),
+            'maxDepth': self.max_depth,
+            'featureImportances': [float(value) for value in importances] if importances is not None else None,
+            'arrays': arrays,
+            'source': source
+        }
+        # Write the manifest last so a half-written artifact is never loadable
+        temporary = os.path.join(directory, MANIFEST_NAME + '.tmp')
+        with open(temporary, 'w') as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(temporary, os.path.join(directory, MANIFEST_NAME))
+        return manifest
+
+    @classmethod
+    def load(cls, directory, mmap=True, verify=False):
+        """
+        Load a model artifact written by save()
+
+        With mmap the node arrays are memory-mapped read-only, so loading
+        takes milliseconds and every process serving the same artifact
+        shares one copy of the trees in the page cache.
+
+        Args:
+            directory: Artifact directory
+            mmap: Memory-map the arrays instead of reading them into memory
+            verify: Check every array against its manifest checksum
+        """
+        with open(os.path.join(directory, MANIFEST_NAME)) as file:
+            manifest = json.load(file)
+        if manifest.get('format') != 'compiled-forest' or manifest.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported model artifact: {manifest.get('format')} v{manifest.get('version')}")
+
+        arrays = {}
+        for name in ARRAY_NAMES:
+            entry = manifest['arrays'].get(name)
+            if entry is None:
+                arrays[name] = None
+                continue
+            array = np.load(os.path.join(directory, entry['file']), mmap_mode='r' if mmap else None, allow_pickle=False)
+            if array.dtype.str != entry['dtype'] or list(array.shape) != entry['shape']:
+                raise ValueError(f"Artifact array '{name}' does not match the manifest")
+            if verify and hashlib.sha256(array.tobytes()).hexdigest() != entry['sha256']:
+                raise ValueError(f"Artifact array '{name}' is corrupt")
+            # Plain ndarray view: same mapped pages without np.memmap overhead
+            arrays[name] = np.asarray(array)
+
+        return cls(
+            **arrays,
+            max_depth=manifest['maxDepth'],
+            classes=manifest['classes'],
+            n_features=manifest['nFeatures'],
+            feature_names=manifest['featureNames'],
+            feature_importances=manifest['featureImportances'],
+        )
+
+    def predict_proba(self, X):
+        """Class probabilities for X, averaged over trees like sklearn"""
+        features = self.as_features(X)
+        if features is None:
+            if self.estimator is None:
+                raise ValueError("Compiled model artifacts can only score complete, numeric feature rows")
+            return self.estimator.predict_proba(X)
+
+        leaves = self.apply(features)
+        proba = np.zeros((features.shape[0], self.value.shape[1]), dtype=np.float64)
+        # Accumulate tree by tree, in order, so sums match sklearn exactly
+        for tree_leaves in leaves:
+            proba += self.value[tree_leaves]
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X):
+        """Predicted class labels for X"""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def apply(self, features):
+        """
+        Leaf index reached in every tree for every sample
+
+        Returns:
+            Array of global node indices, shape (n_trees, n_samples)
+        """
+        n_samples = features.shape[0]
+        samples = np.arange(n_samples)
+        nodes = np.repeat(self.roots[:, np.newaxis], n_samples, axis=1)
+        has_missing = np.isnan(features).any()
+        for _ in range(self.max_depth):
+            go_left = self._go_left(features[samples, self.feature[nodes]], nodes, has_missing)
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def contributions(self, X, class_index=1):
+        """
+        Per-feature contributions to one class probability (Saabas method)
+
+        Every split on a sample's decision path credits the change in the
+        class probability between parent and child to the split feature;
+        averaged over trees, bias + contributions.sum(axis=1) equals
+        predict_proba(X)[:, class_index] up to rounding.
+
+        Returns:
+            Tuple of (bias, contributions of shape (n_samples, n_features)),
+            or None when X cannot be handled by the compiled path
+        """
+        features = self.as_features(X)
+        if features is None:
+            return None
+
+        n_samples, n_features = features.shape
+        samples = np.arange(n_samples)
+        nodes = np.repeat(self.roots[:, np.newaxis], n_samples, axis=1)
+        cells = np.broadcast_to(samples * n_features, nodes.shape)
+        class_value = self.value[:, class_index]
+        totals = np.zeros(n_samples * n_features, dtype=np.float64)
+        has_missing = np.isnan(features).any()
+        for _ in range(self.max_depth):
+            split_feature = self.feature[nodes]
+            go_left = self._go_left(features[samples, split_feature], nodes, has_missing)
+            children = np.where(go_left, self.left[nodes], self.right[nodes])
+            # Leaves loop to themselves, so their delta is exactly zero
+            delta = class_value[children] - class_value[nodes]
+            totals += np.bincount((cells + split_feature).ravel(), weights=delta.ravel(), minlength=totals.size)
+            nodes = children
+
+        bias = float(class_value[self.roots].mean())
+        return bias, totals.reshape(n_samples, n_features) / len(self.roots)
+
+    def _go_left(self, values, nodes, has_missing):
+        """Split decisions for the values at the current nodes; NaN never satisfies <="""
+        go_left = values <= self.threshold[nodes]
+        if has_missing:
+            go_left |= np.isnan(values) & self.missing_left[nodes]
+        return go_left
+
+    def as_features(self, X):
+        """
+        Convert X to the float32 matrix sklearn's trees compare against, or
+        return None when the input needs sklearn's own validation
+        """
+        if isinstance(X, pd.DataFrame):
+            if self.feature_names_in_ is not None and list(X.columns) != list(self.feature_names_in_):
+                return None
+        try:
+            features = np.asarray(X, dtype=np.float32)
+        except (TypeError, ValueError):
+            return None
+        if features.ndim != 2 or features.shape[1] != self.n_features_in_:
+            return None
+        if np.isinf(features).any():
+            return None
+        if self.missing_left is None and np.isnan(features).any():
+            return None
+        return features
+
+
+def _routes_missing_values(estimator):
+    """
+    Whether the estimator scores NaN inputs (by each split's
+    missing_go_to_left) rather than rejecting them, as sklearn >= 1.4
+    forests do for dense input
+    """
+    probe = np.full((1, estimator.n_features_in_), np.nan)
+    if getattr(estimator, 'feature_names_in_', None) is not None:
+        probe = pd.DataFrame(probe, columns=estimator.feature_names_in_)
+    try:
+        estimator.predict_proba(probe)
+    except ValueError:
+        return False
+    return True
+
+
+def _normalizes_tree_values():
+    """
+    sklearn < 1.4 stores weighted class counts in tree_.value and normalizes
+    them in predict_proba; newer versions store the fractions directly
+    """
+    import sklearn
+    major, minor = (int(part) for part in sklearn.__version__.split('.')[:2])
+    return (major, minor) < (1, 4)
@@ -0,0 +1,138 @@
+"""
+Bounded prediction history for the fraud model service
+Keeps the most recent predictions in fixed-size columnar NumPy arrays
+instead of an ever-growing list of dicts
+"""
+
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+CLASSIFICATIONS = ['Safe', 'Low Risk', 'Medium Risk', 'High Risk']
+_CLASSIFICATION_CODES = {name: code for code, name in enumerate(CLASSIFICATIONS)}
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_micros(timestamp):
+    """Convert a prediction timestamp (ISO string or naive datetime) to microseconds"""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is not None:
+        # Predictions are stamped in naive local time; compare like with like
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return (timestamp - _EPOCH) // _MICROSECOND
+
+
+def merge_pages(pages, offset=0, limit=100, newest_first=True):
+    """
+    Merge history pages from several processes into one page
+
+    Each page must hold that process's first offset + limit matching
+    predictions, in the order given by newest_first.
+    """
+    merged = heapq.merge(*pages, key=lambda prediction: to_micros(prediction['timestamp']), reverse=newest_first)
+    return list(itertools.islice(merged, offset, offset + limit))
+
+
+class PredictionHistory:
+    """
+    Fixed-capacity ring buffer of predictions
+
+    Each prediction is stored as one slot across parallel columns (risk
+    score, classification code, confidence, timestamp and transaction
+    id). Transaction ids are mostly unique, so they are kept as plain
+    strings rather than interned, which would only grow the interpreter's
+    intern table. Appending is O(1); once full, the oldest prediction
+    is overwritten.
+    """
+
+    def __init__(self, capacity=10000):
+        """
+        Args:
+            capacity: Maximum number of predictions retained
+        """
+        self.capacity = capacity
+        self._scores = np.zeros(capacity, dtype=np.float64)
+        self._classes = np.zeros(capacity, dtype=np.int8)
+        self._confidence = np.zeros(capacity, dtype=np.int8)
+        self._timestamps = np.zeros(capacity, dtype=np.int64)
+        self._transaction_ids = np.empty(capacity, dtype=object)
+        self._next = 0
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, prediction):
+        """Store a prediction result as built by FraudModelService"""
+        timestamp = to_micros(prediction['timestamp'])
+        transaction_id = str(prediction['transactionId'])
+        with self._lock:
+            slot = self._next
+            self._scores[slot] = prediction['riskScore']
+            self._classes[slot] = _CLASSIFICATION_CODES[prediction['classification']]
+            self._confidence[slot] = prediction['confidence']
+            self._timestamps[slot] = timestamp
+            self._transaction_ids[slot] = transaction_id
+            self._next = (slot + 1) % self.capacity
+            self.total += 1
+
+    def latest(self, count):
+        """The most recent predictions, oldest first"""
+        with self._lock:
+            slots = self._chronological_slots()
+            slots = slots[max(len(slots) - count, 0):]
+            return [self._record(slot) for slot in slots]
+
+    def query(self, offset=0, limit=100, since=None, until=None, newest_first=True):
+        """
+        Page through retained predictions, optionally within a time range
+
+        Args:
+            offset: Number of matching predictions to skip
+            limit: Maximum number of predictions to return
+            since: Only predictions at or after this time (ISO string or datetime)
+            until: Only predictions at or before this time (ISO string or datetime)
+            newest_first: Order of the returned page
+
+        Returns:
+            Tuple of (page of prediction dicts, number of matching predictions)
+        """
+        with self._lock:
+            slots = self._chronological_slots()
+            if since is not None or until is not None:
+                timestamps = self._timestamps[slots]
+                mask = np.ones(len(slots), dtype=bool)
+                if since is not None:
+                    mask &= timestamps >= to_micros(since)
+                if until is not None:
+                    mask &= timestamps <= to_micros(until)
+                slots = slots[mask]
+            if newest_first:
+                slots = slots[::-1]
+            page = slots[offset:offset + limit]
+            return [self._record(slot) for slot in page], len(slots)
+
+    def _chronological_slots(self):
+        """Ring slots of retained predictions, oldest first"""
+        size = len(self)
+        start = (self._next - size) % self.capacity
+        return (start + np.arange(size)) % self.capacity
+
+    def _record(self, slot):
+        """Rebuild the prediction dict stored in a slot"""
+        risk_score = float(self._scores[slot])
+        return {
+            'riskScore': risk_score,
+            'fraudProbability': float(risk_score * 100),
+            'isFraud': risk_score >= 0.7,
+            'classification': CLASSIFICATIONS[self._classes[slot]],
+            'confidence': int(self._confidence[slot]),
+            'timestamp': (_EPOCH + int(self._timestamps[slot]) * _MICROSECOND).isoformat(),
+            'transactionId': self._transaction_ids[slot]
+        }
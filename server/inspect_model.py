@@ -1,19 +1,24 @@
 #!/usr/bin/env python3
 """
 Script to inspect the .pkl file and find out what features/fields it expects
+
+Usage: python inspect_model.py [model.pkl] [--export model.forest]
 """
 
+import argparse
+import time
+
 import joblib
 import pandas as pd
 import numpy as np
 
-def inspect_pkl_file():
-    """Inspect the optimized_fraud_detection_rf.pkl file"""
+def inspect_pkl_file(model_path='optimized_fraud_detection_rf.pkl'):
+    """Inspect a .pkl model file (optimized_fraud_detection_rf.pkl by default)"""
     try:
-        print("🔍 Loading optimized_fraud_detection_rf.pkl...")
+        print(f"🔍 Loading {model_path}...")
         
         # Load the pkl file
-        loaded_data = joblib.load('optimized_fraud_detection_rf.pkl')
+        loaded_data = joblib.load(model_path)
         
         print(f"\n📁 File Type: {type(loaded_data)}")
         
@@ -131,5 +136,35 @@ def inspect_pkl_file():
     except Exception as e:
         print(f"❌ Error inspecting file: {str(e)}")
 
+def export_model(model_path, artifact_path):
+    """
+    Export a .pkl model as a memory-mappable model artifact
+    
+    The service loads artifact directories in milliseconds and worker
+    processes share their pages instead of each unpickling the forest.
+    """
+    from model_bundle import export_model_artifact
+    from forest_engine import CompiledForest
+    
+    try:
+        print(f"\n📦 Exporting {model_path} to {artifact_path}...")
+        manifest = export_model_artifact(model_path, artifact_path)
+        print(f"✅ Exported {manifest['nTrees']} trees ({manifest['nNodes']} nodes, {manifest['nFeatures']} features)")
+        
+        start = time.perf_counter()
+        CompiledForest.load(artifact_path, verify=True)
+        print(f"⚡ Artifact verified and mapped in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return True
+    except Exception as e:
+        print(f"❌ Error exporting model: {str(e)}")
+        return False
+
 if __name__ == "__main__":
-    inspect_pkl_file()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Inspect a .pkl model file and optionally export it as a model artifact")
+    parser.add_argument('model_path', nargs='?', default='optimized_fraud_detection_rf.pkl')
+    parser.add_argument('--export', metavar='DIR', help="write a memory-mappable model artifact to DIR")
+    args = parser.parse_args()
+    
+    inspect_pkl_file(args.model_path)
+    if args.export:
+        export_model(args.model_path, args.export)
\ No newline at end of file
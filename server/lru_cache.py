@@ -0,0 +1,72 @@
+"""
+Small thread-safe LRU cache used by the fraud model service
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry"""
+
+    def __init__(self, maxsize=10000, ttl=None, clock=time.monotonic):
+        """
+        Args:
+            maxsize: Maximum number of entries kept
+            ttl: Seconds an entry stays valid, or None to keep it until evicted
+            clock: Time source for expiry, overridable for tests
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Return the cached value for key, marking it most recently used"""
+        with self._lock:
+            try:
+                value, expires_at = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires_at is not None and expires_at <= self.clock():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Cache a value, evicting the least recently used entry if full"""
+        expires_at = self.clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
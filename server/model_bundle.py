@@ -0,0 +1,293 @@
+"""
+Immutable model bundles for the fraud model service
+Everything a prediction needs from a loaded model is built once into a
+ModelBundle, so a new model can be prepared and warmed up off to the side
+and then swapped in with a single reference assignment
+"""
+
+import json
+import os
+import pickle
+import threading
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+
+import joblib
+import numpy as np
+
+from feature_engine import CATEGORICAL_ENCODINGS, FeatureEngine
+from feature_importance import file_fingerprint
+from forest_engine import MANIFEST_NAME, PREPROCESSORS_NAME, CompiledForest
+
+# Dictionary keys checked, in order, for the model in a pickled dict
+MODEL_KEYS = ['model', 'classifier', 'estimator', 'rf_model']
+
+
+def is_model_artifact(model_path):
+    """True if the path is a compiled model artifact directory"""
+    return os.path.isfile(os.path.join(model_path, MANIFEST_NAME))
+
+
+def read_model_file(model_path):
+    """
+    Unpickle a .pkl or .joblib model file, or memory-map a model artifact
+
+    Returns:
+        (model, scaler, encoder); scaler and encoder are None unless the
+        file is a dictionary (or the artifact has preprocessors) that
+        contains them
+    """
+    if is_model_artifact(model_path):
+        return read_model_artifact(model_path)
+    if model_path.endswith('.pkl'):
+        with open(model_path, 'rb') as file:
+            loaded_data = pickle.load(file)
+    elif model_path.endswith('.joblib'):
+        loaded_data = joblib.load(model_path)
+    else:
+        raise ValueError("Unsupported file format. Use .pkl or .joblib")
+
+    print(f"Model loaded successfully from {model_path}")
+    print(f"Loaded data type: {type(loaded_data)}")
+
+    if not isinstance(loaded_data, dict):
+        print("Direct model object loaded")
+        return loaded_data, None, None
+
+    print("Detected dictionary format - extracting model...")
+    for key in MODEL_KEYS:
+        if key in loaded_data:
+            model = loaded_data[key]
+            print(f"Found '{key}' key in dictionary")
+            break
+    else:
+        # Print available keys to help debug
+        print(f"Available keys in dictionary: {list(loaded_data.keys())}")
+        # Try to find any sklearn model in the dictionary
+        for key, value in loaded_data.items():
+            if hasattr(value, 'predict'):
+                model = value
+                print(f"Found model with predict method at key: '{key}'")
+                break
+        else:
+            raise ValueError("No valid model found in dictionary. Available keys: " + str(list(loaded_data.keys())))
+
+    scaler = loaded_data.get('scaler')
+    encoder = loaded_data.get('encoder')
+    if scaler is not None:
+        print("Found scaler in dictionary")
+    if encoder is not None:
+        print("Found encoder in dictionary")
+    return model, scaler, encoder
+
+
+def read_model_artifact(directory):
+    """
+    Memory-map a model artifact written by export_model_artifact
+
+    Returns:
+        (CompiledForest, scaler, encoder)
+    """
+    forest = CompiledForest.load(directory, mmap=True)
+    print(f"Model artifact mapped from {directory} ({len(forest.roots)} trees, {len(forest.feature)} nodes)")
+    preprocessors = {}
+    preprocessors_path = os.path.join(directory, PREPROCESSORS_NAME)
+    if os.path.exists(preprocessors_path):
+        with open(preprocessors_path, 'rb') as file:
+            preprocessors = pickle.load(file)
+    return forest, preprocessors.get('scaler'), preprocessors.get('encoder')
+
+
+def stale_artifact_source(directory):
+    """
+    The model file an artifact was exported from, if it has changed since
+
+    Checks the .pkl next to the artifact (models/fraud_model.pkl for
+    models/fraud_model.forest) and the source path recorded in the manifest,
+    whichever exist, against the fingerprint recorded at export.
+
+    Returns:
+        Path of a source file whose contents no longer match, or None
+    """
+    with open(os.path.join(directory, MANIFEST_NAME)) as file:
+        source = json.load(file).get('source') or {}
+    recorded = source.get('fingerprint')
+    if not recorded:
+        return None
+    candidates = [os.path.splitext(directory)[0] + '.pkl', source.get('path')]
+    for path in dict.fromkeys(filter(None, candidates)):
+        if os.path.isfile(path) and file_fingerprint(path) != recorded:
+            return path
+    return None
+
+
+def export_model_artifact(model_path, directory):
+    """
+    Convert a .pkl/.joblib model into a memory-mappable model artifact
+
+    The forest is flattened into NumPy arrays (see CompiledForest.save);
+    a scaler or encoder found next to the model is pickled alongside.
+
+    Returns:
+        The artifact manifest
+    """
+    model, scaler, encoder = read_model_file(model_path)
+    forest = model if isinstance(model, CompiledForest) else CompiledForest.from_estimator(model)
+    if forest is None:
+        raise ValueError(f"Cannot export {type(model).__name__}: only random forest, extra trees and decision tree classifiers are supported")
+
+    manifest = forest.save(directory, source={
+        'path': os.path.abspath(model_path),
+        'fingerprint': file_fingerprint(model_path),
+        'exportedAt': datetime.now().isoformat()
+    })
+    preprocessors_path = os.path.join(directory, PREPROCESSORS_NAME)
+    if scaler is not None or encoder is not None:
+        with open(preprocessors_path, 'wb') as file:
+            pickle.dump({'scaler': scaler, 'encoder': encoder}, file)
+    elif os.path.exists(preprocessors_path):
+        os.remove(preprocessors_path)
+    return manifest
+
+
+def synthetic_transactions(n, seed=0):
+    """Plausible transactions covering every categorical value, used for warm-up"""
+    rng = np.random.default_rng(seed)
+    start = datetime(2025, 1, 1)
+    transactions = []
+    for i in range(n):
+        transaction = {
+            column: list(table)[i % len(table)]
+            for column, table in CATEGORICAL_ENCODINGS.items()
+        }
+        transaction['transactionAmount'] = float(rng.lognormal(4, 1.5))
+        transaction['accountBalance'] = float(rng.lognormal(8, 1))
+        transaction['timestamp'] = (start + timedelta(hours=int(rng.integers(0, 24 * 7)))).isoformat()
+        transactions.append(transaction)
+    return transactions
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """
+    A loaded model together with everything compiled from it
+
+    Bundles are never modified after they are built; changing the model or
+    its preprocessors builds a new bundle with dataclasses.replace.
+    """
+
+    model: object = None
+    scaler: object = None
+    encoder: object = None
+    feature_engine: object = None
+    feature_columns: tuple = None
+    explainer_forest: object = None
+    compiled_forest: object = None
+    inference_backend: str = 'sklearn'
+    fingerprint: str = None
+    path: str = None
+    loaded_at: str = None
+
+    @classmethod
+    def build(cls, model, scaler=None, encoder=None, backend='sklearn', fingerprint=None, path=None):
+        """Compile the feature layout and forest for a model into a new bundle"""
+        bundle = cls(
+            model=model,
+            scaler=scaler,
+            encoder=encoder,
+            fingerprint=fingerprint,
+            path=path,
+            loaded_at=datetime.now().isoformat()
+        )
+        return bundle.with_features().with_forest(backend)
+
+    def with_features(self):
+        """Copy of the bundle with the feature layout compiled for its model and preprocessors"""
+        feature_engine = FeatureEngine.compile(self.model, self.scaler, self.encoder)
+        feature_columns = tuple(self.model.feature_names_in_) if getattr(self.model, 'feature_names_in_', None) is not None else None
+        print(f"Compiled feature extraction: {'enabled' if feature_engine else 'disabled'}")
+        return replace(self, feature_engine=feature_engine, feature_columns=feature_columns)
+
+    def with_forest(self, backend='sklearn'):
+        """Copy of the bundle with the forest flattened for explanations and, if requested, inference"""
+        compiled_forest = None
+        if isinstance(self.model, CompiledForest):
+            # Model artifacts are already compiled and have no sklearn model behind them
+            explainer_forest = compiled_forest = self.model
+        else:
+            explainer_forest = CompiledForest.from_estimator(self.model)
+        if backend == 'compiled' and compiled_forest is None:
+            if explainer_forest is not None:
+                compiled_forest = explainer_forest
+            else:
+                print(f"Compiled inference not supported for {type(self.model).__name__}, using sklearn")
+        bundle = replace(
+            self,
+            explainer_forest=explainer_forest,
+            compiled_forest=compiled_forest,
+            inference_backend='compiled' if compiled_forest is not None else 'sklearn'
+        )
+        print(f"Inference backend: {bundle.inference_backend}")
+        return bundle
+
+    def describe(self):
+        """Summary of the bundle for status responses"""
+        return {
+            'modelPath': self.path,
+            'modelType': type(self.model).__name__,
+            'fingerprint': self.fingerprint,
+            'loadedAt': self.loaded_at,
+            'inferenceBackend': self.inference_backend,
+            'compiledFeatures': self.feature_engine is not None
+        }
+
+
+class LoadStatus:
+    """
+    Thread-safe progress record of the most recent model load
+
+    States: idle, loading, warming, validating, then ready or failed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status = {
+            'state': 'idle',
+            'modelPath': None,
+            'progress': 0,
+            'error': None,
+            'startedAt': None,
+            'finishedAt': None
+        }
+
+    def start(self, model_path):
+        """Reset the record for a new load"""
+        with self._lock:
+            self._status = {
+                'state': 'loading',
+                'modelPath': model_path,
+                'progress': 0,
+                'error': None,
+                'startedAt': datetime.now().isoformat(),
+                'finishedAt': None
+            }
+
+    def update(self, state, progress, error=None):
+        """Move the current load to a new state"""
+        with self._lock:
+            self._status['state'] = state
+            self._status['progress'] = progress
+            self._status['error'] = error
+            if state in ('ready', 'failed'):
+                self._status['finishedAt'] = datetime.now().isoformat()
+
+    @property
+    def in_progress(self):
+        """True while a load is between start and ready/failed"""
+        with self._lock:
+            return self._status['state'] in ('loading', 'warming', 'validating')
+
+    def snapshot(self):
+        """Copy of the current status"""
+        with self._lock:
+            return dict(self._status)
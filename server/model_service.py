@@ -1,88 +1,239 @@
 # Fraud Detection Model Service
 # This service loads and runs the actual .pkl model file
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-import pickle
+import argparse
+import json
+import hashlib
+import hmac
+import threading
 import pandas as pd
 import numpy as np
 import os
+from dataclasses import replace
 from datetime import datetime
 import joblib
+import config
+from analytics import AnalyticsAggregator, merge_snapshots
+from batcher import PredictionBatcher
+from history_store import PredictionHistory, merge_pages
+from lru_cache import LRUCache
+import metrics
+import profiling
+from metrics import stage_seconds
+from profiling import stage
+from feature_importance import FEATURE_LABELS, FeatureImportanceCache, feature_names, file_fingerprint
+from prefork import cluster, serve as serve_prefork
+from model_bundle import LoadStatus, ModelBundle, is_model_artifact, read_model_file, stale_artifact_source, synthetic_transactions
+from stream_scoring import StreamStats, format_ndjson, read_transactions, score_stream
+from feature_engine import CATEGORICAL_COLUMNS, NUMERICAL_COLUMNS, CATEGORICAL_ENCODINGS
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
+metrics.instrument(app)
+
+def _is_admin(req):
+    """Admin endpoints need config.ADMIN_TOKEN in the X-Admin-Token header"""
+    return bool(config.ADMIN_TOKEN) and hmac.compare_digest(req.headers.get('X-Admin-Token', ''), config.ADMIN_TOKEN)
+
+profiling.instrument(app, _is_admin)
+
+predictions_recorded = metrics.registry.counter(
+    'fraud_predictions_total', 'Predictions recorded for analytics', ('classification',)
+)
 
 class FraudModelService:
     def __init__(self):
-        self.model = None
-        self.feature_columns = None
-        self.scaler = None
-        self.encoder = None
-        self.prediction_history = []
+        # The active model and everything compiled from it; replaced as a
+        # whole, never mutated, so a request that reads it once sees one model
+        self.bundle = None
+        self.previous_bundle = None
+        self.load_status = LoadStatus()
+        self._load_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self.explanation_cache = LRUCache(config.EXPLANATION_CACHE_SIZE)
+        self.prediction_cache = LRUCache(
+            config.PREDICTION_CACHE_SIZE, ttl=config.PREDICTION_CACHE_TTL
+        ) if config.PREDICTION_CACHE else None
+        self.feature_importance = FeatureImportanceCache()
+        self.prediction_history = PredictionHistory(config.HISTORY_CAPACITY)
+        self.analytics = AnalyticsAggregator()
+    
+    @property
+    def model(self):
+        return self.bundle.model if self.bundle else None
+    
+    @model.setter
+    def model(self, model):
+        self.bundle = replace(self.bundle or ModelBundle(), model=model)
+    
+    @property
+    def scaler(self):
+        return self.bundle.scaler if self.bundle else None
+    
+    @scaler.setter
+    def scaler(self, scaler):
+        self.bundle = replace(self.bundle or ModelBundle(), scaler=scaler)
+    
+    @property
+    def encoder(self):
+        return self.bundle.encoder if self.bundle else None
+    
+    @encoder.setter
+    def encoder(self, encoder):
+        self.bundle = replace(self.bundle or ModelBundle(), encoder=encoder)
+    
+    @property
+    def feature_engine(self):
+        return self.bundle.feature_engine if self.bundle else None
+    
+    @property
+    def feature_columns(self):
+        return self.bundle.feature_columns if self.bundle else None
+    
+    @property
+    def compiled_forest(self):
+        return self.bundle.compiled_forest if self.bundle else None
+    
+    @property
+    def explainer_forest(self):
+        return self.bundle.explainer_forest if self.bundle else None
+    
+    @property
+    def inference_backend(self):
+        return self.bundle.inference_backend if self.bundle else 'sklearn'
+    
+    @property
+    def model_fingerprint(self):
+        return self.bundle.fingerprint if self.bundle else None
         
     def load_model(self, model_path):
-        """Load the trained model from .pkl file"""
+        """
+        Load, warm up and swap in the model from a .pkl or .joblib file
+        
+        Blocks until done; waits for any background load to finish first.
+        
+        Returns:
+            True if the new model is now serving predictions
+        """
+        with self._load_lock:
+            self.load_status.start(model_path)
+            return self._load(model_path)
+    
+    def start_model_load(self, model_path):
+        """
+        Load a model in a background thread, serving the current one meanwhile
+        
+        Returns:
+            False if another load is already in progress
+        """
+        if not self._load_lock.acquire(blocking=False):
+            return False
+        self.load_status.start(model_path)
+        
+        def _run():
+            try:
+                self._load(model_path)
+            finally:
+                self._load_lock.release()
+        
+        threading.Thread(target=_run, name='model-loader', daemon=True).start()
+        return True
+    
+    def _load(self, model_path):
+        """Build a bundle for a model file, warm it up, validate it and swap it in"""
         try:
-            if model_path.endswith('.pkl'):
-                with open(model_path, 'rb') as file:
-                    loaded_data = pickle.load(file)
-            elif model_path.endswith('.joblib'):
-                loaded_data = joblib.load(model_path)
-            else:
-                raise ValueError("Unsupported file format. Use .pkl or .joblib")
+            fingerprint = file_fingerprint(model_path)
+            model, scaler, encoder = read_model_file(model_path)
+            print(f"Final model type: {type(model)}")
+            print(f"Model has predict method: {hasattr(model, 'predict')}")
+            self.load_status.update('loading', 40)
             
-            print(f"Model loaded successfully from {model_path}")
-            print(f"Loaded data type: {type(loaded_data)}")
+            bundle = ModelBundle.build(
+                model, scaler, encoder,
+                backend=config.INFERENCE_BACKEND,
+                fingerprint=fingerprint,
+                path=model_path
+            )
             
-            # Handle different .pkl file formats
-            if isinstance(loaded_data, dict):
-                print("Detected dictionary format - extracting model...")
-                # Try common dictionary keys for the model
-                if 'model' in loaded_data:
-                    self.model = loaded_data['model']
-                    print("Found 'model' key in dictionary")
-                elif 'classifier' in loaded_data:
-                    self.model = loaded_data['classifier']
-                    print("Found 'classifier' key in dictionary")
-                elif 'estimator' in loaded_data:
-                    self.model = loaded_data['estimator']
-                    print("Found 'estimator' key in dictionary")
-                elif 'rf_model' in loaded_data:
-                    self.model = loaded_data['rf_model']
-                    print("Found 'rf_model' key in dictionary")
-                else:
-                    # Print available keys to help debug
-                    print(f"Available keys in dictionary: {list(loaded_data.keys())}")
-                    # Try to find any sklearn model in the dictionary
-                    for key, value in loaded_data.items():
-                        if hasattr(value, 'predict'):
-                            self.model = value
-                            print(f"Found model with predict method at key: '{key}'")
-                            break
-                    else:
-                        raise ValueError("No valid model found in dictionary. Available keys: " + str(list(loaded_data.keys())))
-                
-                # Load other components if available
-                if 'scaler' in loaded_data:
-                    self.scaler = loaded_data['scaler']
-                    print("Found scaler in dictionary")
-                if 'encoder' in loaded_data:
-                    self.encoder = loaded_data['encoder']
-                    print("Found encoder in dictionary")
-                    
-            else:
-                # Direct model object
-                self.model = loaded_data
-                print("Direct model object loaded")
+            self.load_status.update('warming', 60)
+            features, scores = self._warm_up(bundle)
+            self.load_status.update('validating', 80)
+            self._validate(bundle, features, scores)
             
-            print(f"Final model type: {type(self.model)}")
-            print(f"Model has predict method: {hasattr(self.model, 'predict')}")
+            self._swap(bundle)
+            # Only a model that made it into service gets importances cached
+            self.feature_importance.register(fingerprint, model)
+            self.load_status.update('ready', 100)
+            print(f"✅ Model swapped in (fingerprint {fingerprint[:12]})")
             return True
         except Exception as e:
             print(f"Error loading model: {str(e)}")
+            self.load_status.update('failed', 100, error=str(e))
             return False
     
+    def _warm_up(self, bundle):
+        """
+        Score a synthetic batch through a new bundle before it takes traffic
+        
+        Returns:
+            (model input, risk scores) for the batch
+        """
+        features = self._model_input(synthetic_transactions(config.MODEL_WARMUP_ROWS), bundle)
+        return features, self._risk_scores(features, bundle)
+    
+    def _validate(self, bundle, features, scores):
+        """Reject a bundle that cannot score transactions or whose scores are unusable"""
+        underivable = [column for column in features.columns if features[column].isna().all()]
+        if underivable:
+            raise ValueError(f"Model features cannot be derived from transactions: {underivable}")
+        scores = np.asarray(scores, dtype=np.float64)
+        if scores.shape != (len(features),):
+            raise ValueError(f"Warm-up returned {scores.shape} scores for {len(features)} rows")
+        if not np.isfinite(scores).all() or scores.min() < 0 or scores.max() > 1:
+            raise ValueError("Warm-up risk scores are not probabilities in [0, 1]")
+        if bundle.compiled_forest is not None:
+            # The compiled forest must agree with the model it was built from
+            expected = bundle.model.predict_proba(features)
+            expected = expected[:, 1] if expected.shape[1] > 1 else expected[:, 0]
+            if not np.allclose(scores, expected):
+                raise ValueError("Compiled forest disagrees with the model")
+    
+    def _swap(self, bundle):
+        """Make a bundle the active one, keeping the current one for rollback"""
+        with self._swap_lock:
+            self.previous_bundle = self.bundle
+            self.bundle = bundle
+        cluster.publish_model(bundle.path)
+        # Cached entries are keyed by fingerprint, so clearing only frees memory
+        self.explanation_cache.clear()
+        if self.prediction_cache is not None:
+            self.prediction_cache.clear()
+    
+    def rollback_model(self):
+        """
+        Swap the previously active bundle back in
+        
+        Returns:
+            False if there is no previous bundle
+        """
+        with self._swap_lock:
+            if self.previous_bundle is None:
+                return False
+            self.bundle, self.previous_bundle = self.previous_bundle, self.bundle
+        cluster.publish_model(self.bundle.path)
+        print(f"↩️  Rolled back to model {self.bundle.path}")
+        return True
+    
+    def model_status(self):
+        """Load progress plus the active and rollback bundles"""
+        return {
+            'load': self.load_status.snapshot(),
+            'active': self.bundle.describe() if self.bundle and self.bundle.model is not None else None,
+            'previous': self.previous_bundle.describe() if self.previous_bundle else None
+        }
+    
     def load_preprocessors(self, scaler_path=None, encoder_path=None):
         """Load any preprocessors (scaler, encoder) if available"""
         try:
@@ -93,14 +244,39 @@ class FraudModelService:
             if encoder_path and os.path.exists(encoder_path):
                 self.encoder = joblib.load(encoder_path)
                 print("Encoder loaded successfully")
+            
+            self._compile_features()
         except Exception as e:
             print(f"Error loading preprocessors: {str(e)}")
     
-    def preprocess_data(self, transaction_data):
-        """Preprocess transaction data for model prediction"""
+    def _compile_features(self):
+        """Rebuild the compiled feature layout for the current model and preprocessors"""
+        self.bundle = self.bundle.with_features()
+    
+    def _compile_forest(self):
+        """Re-flatten the current forest for explanations and, if configured, inference"""
+        self.bundle = self.bundle.with_forest(config.INFERENCE_BACKEND)
+        self.explanation_cache.clear()
+    
+    def preprocess_data(self, transaction_data, bundle=None):
+        """Preprocess transaction data for model prediction
+
+        Accepts a single transaction dict or a list of them; a list is
+        preprocessed as one multi-row DataFrame. Uses the preprocessors of
+        the given bundle, or of the active one.
+        """
+        bundle = bundle or self.bundle
+        encoder = bundle.encoder if bundle else None
+        scaler = bundle.scaler if bundle else None
         try:
             # Convert to DataFrame
-            df = pd.DataFrame([transaction_data])
+            rows = transaction_data if isinstance(transaction_data, list) else [transaction_data]
+            df = pd.DataFrame(rows)
+            # Rows missing a key other rows have, to be reset to NaN below
+            absent = {
+                col: np.array([col not in row for row in rows])
+                for col in CATEGORICAL_COLUMNS + ['timestamp'] if col in df.columns
+            }
             
             # Handle timestamp
             if 'timestamp' in df.columns:
@@ -110,26 +286,34 @@ class FraudModelService:
                 df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
             
             # Convert categorical variables if needed
-            categorical_columns = ['deviceType', 'merchantCategory', 'ipAddressFlag', 'previousFraudulentActivity', 'transactionType']
-            for col in categorical_columns:
+            for col in CATEGORICAL_COLUMNS:
                 if col in df.columns:
-                    if self.encoder:
+                    if encoder:
                         # Use trained encoder
-                        df[col] = self.encoder.transform(df[[col]])
+                        df[col] = encoder.transform(df[[col]])
                     else:
                         # Simple mapping (you might need to adjust based on your model)
-                        df[col] = self._encode_categorical(col, df[col].iloc[0])
+                        df[col] = df[col].map(lambda value, col=col: self._encode_categorical(col, value))
             
             # Handle numerical columns
-            numerical_columns = ['transactionAmount', 'accountBalance']
-            for col in numerical_columns:
+            for col in NUMERICAL_COLUMNS:
                 if col in df.columns:
                     df[col] = pd.to_numeric(df[col], errors='coerce')
             
+            # Each row gets the features it would get on its own: the batch
+            # DataFrame fills a key a row lacks with NaN, which encodes as the
+            # unknown category (and a NaT as a weekday), where a one-row frame
+            # has no such column at all
+            for col, mask in absent.items():
+                if mask.any():
+                    derived = ['hour', 'day_of_week', 'is_weekend'] if col == 'timestamp' else [col]
+                    for name in derived:
+                        df[name] = df[name].where(~mask)
+            
             # Apply scaling if scaler is available
-            if self.scaler:
+            if scaler:
                 numerical_cols = df.select_dtypes(include=[np.number]).columns
-                df[numerical_cols] = self.scaler.transform(df[numerical_cols])
+                df[numerical_cols] = scaler.transform(df[numerical_cols])
             
             return df
         except Exception as e:
@@ -138,64 +322,44 @@ class FraudModelService:
     
     def _encode_categorical(self, column, value):
         """Simple categorical encoding - adjust based on your model's training"""
-        encodings = {
-            'deviceType': {
-                'Mobile': 0, 'Desktop': 1, 'Tablet': 2, 'ATM': 3, 
-                'POS Terminal': 4, 'Web Browser': 5, 'Other': 6
-            },
-            'merchantCategory': {
-                'Grocery': 0, 'Gas Station': 1, 'Restaurant': 2, 'Retail': 3,
-                'Online Shopping': 4, 'Entertainment': 5, 'Healthcare': 6,
-                'Travel': 7, 'Utilities': 8, 'Financial Services': 9, 'Other': 10
-            },
-            'ipAddressFlag': {
-                'Safe': 0, 'Suspicious': 1, 'High Risk': 2, 'Blacklisted': 3, 'Unknown': 4
-            },
-            'previousFraudulentActivity': {
-                'None': 0, 'Low Risk': 1, 'Medium Risk': 2, 'High Risk': 3, 'Previously Flagged': 4
-            },
-            'transactionType': {
-                'Purchase': 0, 'Withdrawal': 1, 'Transfer': 2, 'Deposit': 3,
-                'Refund': 4, 'Payment': 5, 'Other': 6
-            }
-        }
-        return encodings.get(column, {}).get(value, 0)
+        return CATEGORICAL_ENCODINGS.get(column, {}).get(value, 0)
+    
+    def _model_input(self, transaction_data, bundle):
+        """
+        Turn one transaction or a list of them into model input for a bundle
+        
+        Uses the compiled feature engine when available, otherwise the pandas
+        preprocessing, narrowed to the columns the model was trained on.
+        """
+        with stage_seconds.time('preprocess'), stage('preprocess'):
+            if bundle.feature_engine is not None:
+                features = bundle.feature_engine.transform(transaction_data)
+                # Keep feature names so sklearn's input validation still applies
+                return pd.DataFrame(features, columns=bundle.feature_engine.columns, copy=False)
+            
+            processed_data = self.preprocess_data(transaction_data, bundle)
+            if bundle.feature_columns is not None:
+                processed_data = processed_data.reindex(columns=list(bundle.feature_columns))
+            return processed_data
     
     def predict(self, transaction_data):
         """Make fraud prediction using the loaded model"""
         try:
-            if self.model is None:
+            # Read the active bundle once so a concurrent swap cannot mix models
+            bundle = self.bundle
+            if bundle is None or bundle.model is None:
                 raise ValueError("Model not loaded")
             
             # Preprocess the data
-            processed_data = self.preprocess_data(transaction_data)
+            processed_data = self._model_input(transaction_data, bundle)
             
             # Make prediction
-            if hasattr(self.model, 'predict_proba'):
-                # For models that support probability prediction
-                probabilities = self.model.predict_proba(processed_data)
-                fraud_probability = probabilities[0][1] if len(probabilities[0]) > 1 else probabilities[0][0]
-                risk_score = fraud_probability
-            else:
-                # For models that only give binary predictions
-                prediction = self.model.predict(processed_data)
-                risk_score = float(prediction[0])
-                fraud_probability = risk_score * 100
-            
-            # Create prediction result
-            is_fraud = risk_score >= 0.7  # High risk is considered fraud
-            prediction_result = {
-                'riskScore': float(risk_score),
-                'fraudProbability': float(fraud_probability * 100),
-                'isFraud': is_fraud,
-                'classification': self._classify_risk(risk_score),
-                'confidence': self._calculate_confidence(risk_score),
-                'timestamp': datetime.now().isoformat(),
-                'transactionId': transaction_data.get('transactionId', f"TXN_{int(datetime.now().timestamp())}")
-            }
+            risk_score = self._cached_risk_scores(processed_data, bundle)[0]
+            prediction_result = self._build_result(transaction_data, risk_score)
+            self._explain_flagged([transaction_data], [prediction_result], bundle)
             
             # Store prediction for analytics
-            self.prediction_history.append(prediction_result)
+            self._record_prediction(prediction_result)
             
             return prediction_result
             
@@ -203,6 +367,131 @@ class FraudModelService:
             print(f"Error in prediction: {str(e)}")
             raise e
     
+    def predict_many(self, transactions, record=True):
+        """
+        Make fraud predictions for a batch of transactions
+        
+        The batch is preprocessed as one DataFrame and scored with a single
+        model call. Results are returned in input order; a row that cannot
+        be scored gets {'index': i, 'error': message} instead of a
+        prediction, without failing the rest of the batch.
+        
+        Args:
+            transactions: List of transaction dicts
+            record: Add the predictions to the live history and analytics;
+                off for offline re-scoring
+        """
+        bundle = self.bundle
+        if bundle is None or bundle.model is None:
+            raise ValueError("Model not loaded")
+        
+        results = [None] * len(transactions)
+        valid_indices = []
+        for i, transaction_data in enumerate(transactions):
+            if isinstance(transaction_data, dict) and transaction_data:
+                valid_indices.append(i)
+            else:
+                results[i] = {'index': i, 'error': 'Invalid transaction data'}
+        
+        if valid_indices:
+            try:
+                processed_data = self._model_input([transactions[i] for i in valid_indices], bundle)
+                scores = list(self._cached_risk_scores(processed_data, bundle))
+            except Exception:
+                # Something in the batch is malformed - score rows one by one
+                # so the bad rows can be reported individually
+                scores = []
+                for i in valid_indices:
+                    try:
+                        scores.append(self._cached_risk_scores(self._model_input(transactions[i], bundle), bundle)[0])
+                    except Exception as e:
+                        scores.append(e)
+            
+            for i, risk_score in zip(valid_indices, scores):
+                if isinstance(risk_score, Exception):
+                    results[i] = {'index': i, 'error': str(risk_score)}
+                else:
+                    results[i] = self._build_result(transactions[i], risk_score)
+                    if record:
+                        self._record_prediction(results[i])
+            
+            self._explain_flagged(
+                [transactions[i] for i in valid_indices],
+                [results[i] for i in valid_indices],
+                bundle
+            )
+        
+        return results
+    
+    def _record_prediction(self, prediction_result):
+        """Add a prediction to the history and the running analytics"""
+        self.prediction_history.append(prediction_result)
+        self.analytics.record(prediction_result)
+        predictions_recorded.inc(prediction_result['classification'])
+    
+    def _cached_risk_scores(self, processed_data, bundle):
+        """Risk scores for preprocessed rows, served from the prediction cache when possible"""
+        keys = self._cache_keys(processed_data, bundle)
+        if keys is None:
+            return self._risk_scores(processed_data, bundle)
+        
+        scores = np.empty(len(keys), dtype=np.float64)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self.prediction_cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                scores[i] = cached
+        
+        if missing:
+            rows = processed_data if len(missing) == len(keys) else processed_data.iloc[missing]
+            for i, risk_score in zip(missing, self._risk_scores(rows, bundle)):
+                scores[i] = risk_score
+                self.prediction_cache.put(keys[i], float(risk_score))
+        return scores
+    
+    def _cache_keys(self, processed_data, bundle):
+        """
+        Prediction cache keys: a digest of the model fingerprint and each
+        row's feature vector. None when caching is off or the rows are not
+        purely numeric.
+        """
+        if self.prediction_cache is None:
+            return None
+        try:
+            features = np.ascontiguousarray(processed_data.to_numpy(dtype=np.float64))
+        except (TypeError, ValueError):
+            return None
+        prefix = (bundle.fingerprint or '').encode()
+        return [hashlib.blake2b(prefix + row.tobytes(), digest_size=16).digest() for row in features]
+    
+    def _risk_scores(self, processed_data, bundle):
+        """Return the fraud risk score (0-1) for every row of preprocessed data"""
+        with stage_seconds.time('inference'), stage('infer'):
+            if bundle.compiled_forest is not None:
+                probabilities = bundle.compiled_forest.predict_proba(processed_data)
+                return probabilities[:, 1] if probabilities.shape[1] > 1 else probabilities[:, 0]
+            if hasattr(bundle.model, 'predict_proba'):
+                # For models that support probability prediction
+                probabilities = bundle.model.predict_proba(processed_data)
+                return probabilities[:, 1] if probabilities.shape[1] > 1 else probabilities[:, 0]
+            # For models that only give binary predictions
+            return np.asarray(bundle.model.predict(processed_data), dtype=float)
+    
+    def _build_result(self, transaction_data, risk_score):
+        """Build the prediction response for a single scored transaction"""
+        is_fraud = risk_score >= 0.7  # High risk is considered fraud
+        return {
+            'riskScore': float(risk_score),
+            'fraudProbability': float(risk_score * 100),
+            'isFraud': bool(is_fraud),
+            'classification': self._classify_risk(risk_score),
+            'confidence': self._calculate_confidence(risk_score),
+            'timestamp': datetime.now().isoformat(),
+            'transactionId': transaction_data.get('transactionId', f"TXN_{int(datetime.now().timestamp())}")
+        }
+    
     def _classify_risk(self, risk_score):
         """Classify risk based on score"""
         if risk_score >= 0.7:
@@ -220,42 +509,140 @@ class FraudModelService:
         confidence = min(90, max(60, 80 + (abs(risk_score - 0.5) * 20)))
         return int(confidence)
     
-    def get_analytics(self):
+    def get_analytics(self, include_histogram=False):
         """Get analytics data for dashboard"""
-        recent_predictions = self.prediction_history[-100:]  # Last 100 predictions
-        
-        # Calculate fraud distribution
-        distribution = {'Safe': 0, 'Low Risk': 0, 'Medium Risk': 0, 'High Risk': 0}
-        for pred in recent_predictions:
-            distribution[pred['classification']] += 1
-        
-        # Calculate trends
-        trends = []
-        for i, pred in enumerate(recent_predictions):
-            trends.append({
-                'x': i,
-                'y': pred['riskScore'],
-                'timestamp': pred['timestamp'],
-                'classification': pred['classification']
-            })
+        analytics = self.analytics.snapshot(include_histogram=include_histogram)
+        analytics['featureImportance'] = self.feature_importance.best(self.model_fingerprint)
+        return analytics
+
+    def explain(self, transactions):
+        """
+        Explain risk scores with per-feature contributions
         
-        return {
-            'totalPredictions': len(self.prediction_history),
-            'recentPredictions': recent_predictions,
-            'fraudDistribution': distribution,
-            'riskTrends': trends,
-            'featureImportance': [
-                {'feature': 'Transaction Amount', 'importance': 25},
-                {'feature': 'IP Address Flag', 'importance': 25},
-                {'feature': 'Device Type', 'importance': 20},
-                {'feature': 'Merchant Category', 'importance': 15},
-                {'feature': 'Account Balance', 'importance': 15}
-            ]
-        }
+        Contributions come from the decision paths of the forest (Saabas
+        method): bias + the sum of all contributions is the risk score.
+        
+        Returns:
+            One explanation dict per transaction, in order
+        """
+        bundle = self.bundle
+        if bundle is None or bundle.model is None:
+            raise ValueError("Model not loaded")
+        if bundle.explainer_forest is None:
+            raise ValueError(f"Explanations are not supported for {type(bundle.model).__name__}")
+        
+        explanations = self._explanations(self._model_input(transactions, bundle), bundle)
+        return [
+            dict(explanation, transactionId=transaction_data.get('transactionId'))
+            for transaction_data, explanation in zip(transactions, explanations)
+        ]
+    
+    def _explain_flagged(self, transactions, results, bundle):
+        """Attach explanations to flagged results when EXPLAIN_FLAGGED is on"""
+        if not config.EXPLAIN_FLAGGED or bundle.explainer_forest is None:
+            return
+        flagged = [i for i, result in enumerate(results) if 'error' not in result and result['isFraud']]
+        if not flagged:
+            return
+        try:
+            explanations = self._explanations(self._model_input([transactions[i] for i in flagged], bundle), bundle)
+        except Exception as e:
+            print(f"Error explaining flagged transactions: {str(e)}")
+            return
+        for i, explanation in zip(flagged, explanations):
+            results[i]['explanation'] = explanation
+    
+    def _explanations(self, processed_data, bundle):
+        """Contribution breakdowns for preprocessed rows, cached per feature vector"""
+        forest = bundle.explainer_forest
+        features = forest.as_features(processed_data)
+        if features is None:
+            raise ValueError("Cannot explain transactions with missing or non-numeric features")
+        
+        class_index = 1 if len(forest.classes_) > 1 else 0
+        keys = [(bundle.fingerprint, row.tobytes()) for row in features]
+        explanations = [self.explanation_cache.get(key) for key in keys]
+        missing = [i for i, explanation in enumerate(explanations) if explanation is None]
+        if missing:
+            bias, contributions = forest.contributions(features[missing], class_index)
+            names = feature_names(bundle.model)
+            for i, row in zip(missing, contributions):
+                explanations[i] = {
+                    'riskScore': float(bias + row.sum()),
+                    'bias': bias,
+                    'contributions': sorted(
+                        [
+                            {
+                                'feature': name,
+                                'label': FEATURE_LABELS.get(name, name),
+                                'value': float(value),
+                                'contribution': float(contribution)
+                            }
+                            for name, value, contribution in zip(names, features[i], row)
+                        ],
+                        key=lambda item: abs(item['contribution']),
+                        reverse=True
+                    )
+                }
+                self.explanation_cache.put(keys[i], explanations[i])
+        return explanations
+    
+    def start_permutation_importance(self, sample_path, label_column='isFraud', sample_size=5000, n_repeats=5):
+        """
+        Start a background permutation importance job on a labelled CSV sample
+        
+        Returns:
+            False if a job for the current model is already running
+        """
+        bundle = self.bundle
+        if bundle is None or bundle.model is None:
+            raise ValueError("Model not loaded")
+        if not hasattr(bundle.model, 'fit'):
+            raise ValueError("Permutation importance needs the original sklearn model, not a compiled model artifact")
+        
+        sample = pd.read_csv(sample_path)
+        if label_column not in sample.columns:
+            raise ValueError(f"Label column '{label_column}' not found in sample")
+        if len(sample) > sample_size:
+            sample = sample.sample(n=sample_size, random_state=0)
+        
+        labels = sample.pop(label_column).astype(int).to_numpy()
+        features = self._model_input(sample.to_dict('records'), bundle)
+        return self.feature_importance.start_permutation(
+            bundle.fingerprint, bundle.model, features, labels, n_repeats=n_repeats
+        )
 
 # Initialize the service
 fraud_service = FraudModelService()
 
+def _create_batcher():
+    """Coalesce concurrent /predict calls into vectorized batches when enabled"""
+    if not config.BATCH_PREDICTIONS:
+        return None
+    return PredictionBatcher(
+        fraud_service.predict_many,
+        window_ms=config.BATCH_WINDOW_MS,
+        max_batch_size=config.BATCH_MAX_SIZE,
+        timeout=config.BATCH_TIMEOUT_SECONDS
+    )
+
+batcher = _create_batcher()
+
+def _post_fork(worker_index):
+    """Per-worker setup in pre-fork mode: threads started in the parent do not survive fork"""
+    global batcher
+    # Warm-up and startup values belong to the parent, not to every worker
+    metrics.registry.reset()
+    batcher = _create_batcher()
+    # A restarted worker catches up with models the cluster swapped in since startup
+    active = cluster.active_model()
+    if active and active != (fraud_service.bundle.path if fraud_service.bundle else None):
+        fraud_service.load_model(active)
+
+def _cluster_wide():
+    """True when a request should cover every pre-forked worker, not just this one"""
+    return cluster.enabled and request.args.get('scope') != 'local'
+
 # API Routes
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -263,91 +650,389 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'model_loaded': fraud_service.model is not None,
+        'compiled_features': fraud_service.feature_engine is not None,
+        'inference_backend': fraud_service.inference_backend,
+        'model_load': fraud_service.load_status.snapshot()['state'],
+        'batching': batcher.stats() if batcher else None,
+        'explanation_cache': fraud_service.explanation_cache.stats(),
+        'prediction_cache': fraud_service.prediction_cache.stats() if fraud_service.prediction_cache else None,
+        'worker': cluster.describe(),
         'timestamp': datetime.now().isoformat()
     })
 
 @app.route('/load-model', methods=['POST'])
 def load_model():
-    """Load model from specified path"""
+    """
+    Load a model from the specified path without interrupting predictions
+    
+    The model is loaded, warmed up and validated off to the side and then
+    swapped in; the current model keeps serving until then. The response
+    comes once the load has finished. Pass "async": true to get a 202 right
+    away instead and poll /load-model/status for progress. In pre-fork mode
+    every worker loads the model; workers that have not answered within
+    config.CLUSTER_LOAD_TIMEOUT_SECONDS are listed in "unansweredWorkers".
+    """
     try:
-        data = request.json
+        data = request.json or {}
         model_path = data.get('model_path')
         
         if not model_path or not os.path.exists(model_path):
             return jsonify({'error': 'Invalid model path'}), 400
         
-        success = fraud_service.load_model(model_path)
-        if success:
-            return jsonify({'message': 'Model loaded successfully'})
-        else:
-            return jsonify({'error': 'Failed to load model'}), 500
+        cluster_fields = {'workers': None}
+        if _cluster_wide():
+            answers = cluster.ask('/load-model', payload=data, timeout=config.CLUSTER_LOAD_TIMEOUT_SECONDS)
+            cluster_fields = {
+                'workers': [response for response in answers.values() if response is not None],
+                # Still loading, or stuck; they keep their current model until they finish
+                'unansweredWorkers': sorted(index for index, response in answers.items() if response is None)
+            }
+        # Synchronous unless asked otherwise; "wait": false is the older spelling of "async": true
+        if not data.get('async') and data.get('wait', True):
+            success = fraud_service.load_model(model_path)
+            if success:
+                return jsonify({'message': 'Model loaded successfully', 'status': fraud_service.model_status(), **cluster_fields})
+            else:
+                return jsonify({'error': 'Failed to load model', 'status': fraud_service.model_status(), **cluster_fields}), 500
+        
+        if not fraud_service.start_model_load(model_path):
+            return jsonify({'error': 'A model load is already in progress', 'status': fraud_service.model_status(), **cluster_fields}), 409
+        return jsonify({'message': 'Model load started', 'status': fraud_service.model_status(), **cluster_fields}), 202
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/load-model/status', methods=['GET'])
+def load_model_status():
+    """Progress of the latest model load plus the active and rollback models"""
+    return jsonify(fraud_service.model_status())
+
+@app.route('/rollback-model', methods=['POST'])
+def rollback_model():
+    """Swap the previously active model back in (on every worker in pre-fork mode)"""
+    workers = cluster.gather('/rollback-model', payload={}) if _cluster_wide() else None
+    if not fraud_service.rollback_model():
+        return jsonify({'error': 'No previous model to roll back to', 'workers': workers}), 409
+    return jsonify({'message': 'Rolled back to previous model', 'status': fraud_service.model_status(), 'workers': workers})
+
 @app.route('/predict', methods=['POST'])
 def predict_fraud():
     """Make fraud prediction"""
     try:
-        transaction_data = request.json
+        with stage('parse'):
+            transaction_data = request.json
         
         if not transaction_data:
             return jsonify({'error': 'No transaction data provided'}), 400
         
-        prediction = fraud_service.predict(transaction_data)
-        return jsonify(prediction)
+        if batcher:
+            prediction = batcher.predict(transaction_data)
+        else:
+            prediction = fraud_service.predict(transaction_data)
+        with stage('serialize'):
+            return jsonify(prediction)
+        
+    except TimeoutError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_fraud_batch():
+    """Make fraud predictions for a batch of transactions
+    
+    Accepts a JSON list, {"transactions": [...]}, or an NDJSON body
+    (one transaction per line, Content-Type: application/x-ndjson), of
+    up to config.PREDICT_BATCH_MAX_ROWS transactions.
+    """
+    try:
+        with stage('parse'):
+            if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+                transactions = _parse_ndjson(request.get_data(as_text=True))
+            else:
+                data = request.get_json(silent=True)
+                transactions = data.get('transactions') if isinstance(data, dict) else data
+        
+        if not isinstance(transactions, list) or not transactions:
+            return jsonify({'error': 'No transaction data provided'}), 400
+        if len(transactions) > config.PREDICT_BATCH_MAX_ROWS:
+            return jsonify({
+                'error': f'At most {config.PREDICT_BATCH_MAX_ROWS} transactions per batch; use /predict/stream for more'
+            }), 413
+        
+        results = fraud_service.predict_many(transactions)
+        with stage('serialize'):
+            return jsonify({
+                'results': results,
+                'count': len(results),
+                'errors': sum(1 for result in results if 'error' in result)
+            })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _parse_ndjson(body):
+    """Parse an NDJSON body into a list; unparseable lines become None"""
+    transactions = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            transactions.append(json.loads(line))
+        except ValueError:
+            transactions.append(None)
+    return transactions
+
+@app.route('/predict/stream', methods=['POST'])
+def predict_fraud_stream():
+    """Score an NDJSON or CSV body of any size, streaming results back as NDJSON
+    
+    The body is read and scored batchSize rows at a time (default
+    config.STREAM_BATCH_SIZE), so memory use stays flat for large
+    backfills. Each output line is a prediction with its input 'index';
+    the last line is {"summary": {...}} with row, error and throughput
+    counts. Predictions are not recorded in /history or /analytics.
+    """
+    if fraud_service.model is None:
+        return jsonify({'error': 'Model not loaded'}), 503
+    try:
+        batch_size = int(request.args.get('batchSize', config.STREAM_BATCH_SIZE))
+        if batch_size < 1:
+            raise ValueError('batchSize must be positive')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    input_format = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+    
+    def _generate():
+        stats = StreamStats()
+        transactions = read_transactions(request.stream, input_format)
+        yield from format_ndjson(score_stream(fraud_service, transactions, batch_size, stats))
+        yield json.dumps({'summary': stats.summary()}) + '\n'
+    
+    return Response(stream_with_context(_generate()), mimetype='application/x-ndjson')
+
+@app.route('/explain', methods=['POST'])
+def explain_prediction():
+    """Explain fraud risk for a transaction, a list, or {"transactions": [...]}"""
+    try:
+        data = request.json
+        transactions = data.get('transactions', data) if isinstance(data, dict) else data
+        
+        if not transactions:
+            return jsonify({'error': 'No transaction data provided'}), 400
+        
+        if isinstance(transactions, dict):
+            return jsonify(fraud_service.explain([transactions])[0])
+        return jsonify({'explanations': fraud_service.explain(transactions)})
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/analytics', methods=['GET'])
 def get_analytics():
-    """Get analytics data"""
+    """Get analytics data, combined across workers in pre-fork mode"""
     try:
-        analytics = fraud_service.get_analytics()
+        if not cluster.enabled:
+            return jsonify(fraud_service.get_analytics())
+        if not _cluster_wide():
+            # A sibling worker is collecting: include what it needs to merge
+            return jsonify(fraud_service.get_analytics(include_histogram=True))
+        
+        snapshots = [fraud_service.get_analytics(include_histogram=True)] + cluster.gather('/analytics')
+        snapshots = [snapshot for snapshot in snapshots if 'riskScoreHistogram' in snapshot]
+        analytics = merge_snapshots(snapshots, recent_size=fraud_service.analytics.recent_size)
+        analytics['featureImportance'] = snapshots[0]['featureImportance']
+        analytics['workers'] = {'responded': len(snapshots), 'total': len(cluster.ports)}
         return jsonify(analytics)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/feature-importance', methods=['GET'])
+def get_feature_importance():
+    """Get cached impurity and permutation importances for the loaded model"""
+    entry = fraud_service.feature_importance.get(fraud_service.model_fingerprint)
+    if entry is None:
+        return jsonify({'error': 'Model not loaded'}), 404
+    return jsonify(dict(entry, fingerprint=fraud_service.model_fingerprint))
+
+@app.route('/feature-importance/permutation', methods=['POST'])
+def start_permutation_importance():
+    """Start a permutation importance job on a labelled CSV sample"""
+    try:
+        data = request.json or {}
+        sample_path = data.get('sample_path')
+        
+        if not sample_path or not os.path.exists(sample_path):
+            return jsonify({'error': 'Invalid sample path'}), 400
+        
+        started = fraud_service.start_permutation_importance(
+            sample_path,
+            label_column=data.get('label_column', 'isFraud'),
+            sample_size=int(data.get('sample_size', 5000)),
+            n_repeats=int(data.get('n_repeats', 5))
+        )
+        if not started:
+            return jsonify({'message': 'Permutation importance already running'}), 409
+        return jsonify({'message': 'Permutation importance started'}), 202
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Largest page /history returns, in either scope
+MAX_HISTORY_LIMIT = 1000
+
+def _gather_history(params, count, order):
+    """
+    The first `count` matching predictions of every other worker
+    
+    Workers cap each page at MAX_HISTORY_LIMIT like any other client, so
+    deeper windows are fetched a page at a time until every worker has
+    returned `count` rows or run out. Returns the first round's responses
+    (for their totals) and every fetched page, each in `order`.
+    """
+    first, pages = None, []
+    page_offset = 0
+    while page_offset < count:
+        page_limit = min(MAX_HISTORY_LIMIT, count - page_offset)
+        responses = [response for response in cluster.gather('/history', dict(params, limit=page_limit, offset=page_offset, order=order))
+                     if 'predictions' in response]
+        if first is None:
+            first = responses
+        pages += [response['predictions'] for response in responses]
+        if all(len(response['predictions']) < page_limit for response in responses):
+            break
+        page_offset += page_limit
+    return first or [], pages
+
 @app.route('/history', methods=['GET'])
 def get_prediction_history():
-    """Get prediction history"""
+    """
+    Get prediction history, newest first
+    
+    Query parameters: limit (default 100, max 1000), offset, since/until
+    (ISO timestamps) and order ('desc' or 'asc'). In pre-fork mode the
+    pages of all workers are merged by timestamp.
+    """
     try:
-        return jsonify(fraud_service.prediction_history)
+        limit = min(int(request.args.get('limit', 100)), MAX_HISTORY_LIMIT)
+        offset = int(request.args.get('offset', 0))
+        if limit < 0 or offset < 0:
+            return jsonify({'error': 'limit and offset must be non-negative'}), 400
+        
+        since = request.args.get('since')
+        until = request.args.get('until')
+        order = request.args.get('order', 'desc')
+        history = fraud_service.prediction_history
+        if not _cluster_wide():
+            predictions, matching = history.query(
+                offset=offset,
+                limit=limit,
+                since=since,
+                until=until,
+                newest_first=order != 'asc'
+            )
+            return jsonify({
+                'predictions': predictions,
+                'count': len(predictions),
+                'total': matching,
+                'offset': offset,
+                'limit': limit,
+                'capacity': history.capacity,
+                'totalPredictions': history.total
+            })
+        
+        # Every worker contributes its first offset + limit matches; merge those
+        predictions, matching = history.query(offset=0, limit=offset + limit, since=since, until=until, newest_first=order != 'asc')
+        params = {key: value for key, value in [('since', since), ('until', until)] if value is not None}
+        responses, pages = _gather_history(params, offset + limit, order)
+        responses = [{'total': matching, 'capacity': history.capacity, 'totalPredictions': history.total}] + responses
+        predictions = merge_pages([predictions] + pages, offset, limit, order != 'asc')
+        return jsonify({
+            'predictions': predictions,
+            'count': len(predictions),
+            'total': sum(response['total'] for response in responses),
+            'offset': offset,
+            'limit': limit,
+            'capacity': sum(response['capacity'] for response in responses),
+            'totalPredictions': sum(response['totalPredictions'] for response in responses),
+            'workers': {'responded': len(responses), 'total': len(cluster.ports)}
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-if __name__ == '__main__':
-    print("Starting Fraud Detection Model Service...")
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics, summed over all workers in pre-fork mode
     
-    # Try to automatically load model from server directory and other locations
-    model_paths_to_try = [
-        'optimized_fraud_detection_rf.pkl',  # Your specific model in server folder
-        '../models/fraud_model.pkl',
-        'models/fraud_model.pkl',
-        '../models/model.pkl',
-        'models/model.pkl'
-    ]
-    
-    model_loaded = False
-    for model_path in model_paths_to_try:
+    ?format=json returns this process's raw values, which is how workers
+    collect each other's.
+    """
+    if request.args.get('format') == 'json':
+        return jsonify({'metrics': metrics.registry.snapshot()})
+    snapshots = []
+    if _cluster_wide():
+        snapshots = [response['metrics'] for response in cluster.gather('/metrics', {'format': 'json'}) if 'metrics' in response]
+    return Response(metrics.registry.render(snapshots), content_type=metrics.CONTENT_TYPE)
+
+# Model files tried at startup, in order
+DEFAULT_MODEL_PATHS = [
+    # Memory-mapped artifacts (inspect_model.py --export, setup_model.py) load fastest;
+    # one whose source .pkl has changed since export is skipped
+    'optimized_fraud_detection_rf.forest',
+    '../models/fraud_model.forest',
+    'models/fraud_model.forest',
+    'optimized_fraud_detection_rf.pkl',  # Your specific model in server folder
+    '../models/fraud_model.pkl',
+    'models/fraud_model.pkl',
+    '../models/model.pkl',
+    'models/model.pkl'
+]
+
+def load_default_model():
+    """Try to automatically load model from server directory and other locations"""
+    for model_path in DEFAULT_MODEL_PATHS:
         if os.path.exists(model_path):
             print(f"Found model file: {model_path}")
+            if is_model_artifact(model_path):
+                changed = stale_artifact_source(model_path)
+                if changed:
+                    print(f"⚠️  Skipping stale model artifact {model_path}: {changed} has changed since it was exported")
+                    print(f"   Re-export it with: python inspect_model.py {changed} --export {model_path}")
+                    continue
             if fraud_service.load_model(model_path):
                 print(f"✅ Model loaded successfully from {model_path}")
                 print(f"✅ Using your team's trained model: optimized_fraud_detection_rf.pkl")
-                model_loaded = True
-                break
+                return True
             else:
                 print(f"❌ Failed to load model from {model_path}")
     
-    if not model_loaded:
-        print("⚠️  No model loaded automatically.")
-        print("📁 Available options:")
-        print("   1. Your model file: optimized_fraud_detection_rf.pkl (should be in server folder)")
-        print("   2. Copy your .pkl file to 'models/fraud_model.pkl'")
-        print("   3. Use the /load-model API endpoint")
-        print("   4. The system will work with simulated predictions until then")
+    print("⚠️  No model loaded automatically.")
+    print("📁 Available options:")
+    print("   1. Your model file: optimized_fraud_detection_rf.pkl (should be in server folder)")
+    print("   2. Copy your .pkl file to 'models/fraud_model.pkl'")
+    print("   3. Use the /load-model API endpoint")
+    print("   4. The system will work with simulated predictions until then")
+    return False
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fraud Detection Model Service")
+    parser.add_argument('--workers', type=int, default=config.SERVING_WORKERS,
+                        help="pre-forked worker processes; 0 runs the Flask development server")
+    args = parser.parse_args()
+    
+    print("Starting Fraud Detection Model Service...")
+    
+    load_default_model()
     
-    print("🚀 Server starting on http://localhost:5001")
-    app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
+    if args.workers > 0:
+        # Production mode: fork workers now that the model is loaded
+        serve_prefork(app, '0.0.0.0', 5001, args.workers, post_fork=_post_fork)
+    else:
+        print("🚀 Server starting on http://localhost:5001")
+        app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
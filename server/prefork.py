@@ -0,0 +1,237 @@
+"""
+Pre-fork serving for the fraud model service
+Loads the model once in a parent process, then forks worker processes that
+accept connections from one shared listening socket. Workers share the
+parent's model memory copy-on-write, so scoring scales across cores
+instead of being bound to one GIL.
+"""
+
+import gc
+import json
+import mmap
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import make_server
+
+
+class SharedText:
+    """
+    A short string in anonymous shared memory
+
+    Created in the parent before forking, so the parent and every worker
+    read and write the same bytes.
+    """
+
+    def __init__(self, size=4096):
+        self._memory = mmap.mmap(-1, size)
+        self._lock = multiprocessing.Lock()
+
+    def set(self, text):
+        data = text.encode('utf-8')
+        if len(data) + 4 > len(self._memory):
+            raise ValueError(f"Shared text is limited to {len(self._memory) - 4} bytes")
+        with self._lock:
+            self._memory[:4] = len(data).to_bytes(4, 'little')
+            self._memory[4:4 + len(data)] = data
+
+    def get(self):
+        """The stored string, or None if nothing was set"""
+        with self._lock:
+            size = int.from_bytes(self._memory[:4], 'little')
+            return self._memory[4:4 + size].decode('utf-8') if size else None
+
+
+class WorkerCluster:
+    """
+    This process's place among the pre-forked workers
+
+    Besides the shared public socket, every worker serves the app on a
+    private loopback port so a worker handling /analytics or /history can
+    collect the other workers' local state and merge it. The path of the
+    model the workers last swapped in is kept in memory shared with the
+    parent, so a restarted worker serves that model rather than the one
+    it inherits from the parent.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.ports = []
+        self._active_model = None
+
+    def publish_model(self, path):
+        """Record the model path this worker now serves (no-op outside pre-fork mode)"""
+        if self._active_model is not None and path:
+            self._active_model.set(path)
+
+    def active_model(self):
+        """Model path last published by any worker, or None if none was"""
+        return self._active_model.get() if self._active_model is not None else None
+
+    @property
+    def enabled(self):
+        """True in a worker of a multi-worker cluster"""
+        return self.index is not None and len(self.ports) > 1
+
+    def describe(self):
+        """Summary for /health"""
+        return {'index': self.index, 'pid': os.getpid(), 'workers': max(len(self.ports), 1)}
+
+    def gather(self, path, params=None, payload=None, timeout=5.0):
+        """
+        Call an endpoint with scope=local on every other worker
+
+        Args:
+            path: Endpoint path, e.g. '/analytics'
+            params: Query parameters to forward
+            payload: JSON body; the request is a POST when given
+            timeout: Seconds to wait for each worker
+
+        Returns:
+            Decoded JSON responses of the workers that answered
+        """
+        answers = self.ask(path, params, payload, timeout)
+        return [response for response in answers.values() if response is not None]
+
+    def ask(self, path, params=None, payload=None, timeout=5.0):
+        """
+        Like gather, but keyed by worker index
+
+        Returns:
+            {worker index: decoded JSON response, or None if it did not answer
+            within the timeout}, for every other worker
+        """
+        query = dict(params or {}, scope='local')
+        urls = {
+            index: f"http://127.0.0.1:{port}{path}?{urllib.parse.urlencode(query)}"
+            for index, port in enumerate(self.ports) if index != self.index
+        }
+        data = json.dumps(payload).encode() if payload is not None else None
+
+        def _fetch(url):
+            request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    return json.loads(response.read())
+            except urllib.error.HTTPError as e:
+                # Error responses still carry the worker's JSON body
+                return json.loads(e.read() or b'null')
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Worker at {url} did not answer: {str(e)}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=len(urls) or 1) as executor:
+            return dict(zip(urls, executor.map(_fetch, urls.values())))
+
+
+cluster = WorkerCluster()
+
+
+def _listen(host, port, backlog=1024):
+    """Bound, listening TCP socket that forked workers inherit"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    listener = socket.socket(family, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(backlog)
+    return listener
+
+
+def serve(app, host, port, workers, post_fork=None):
+    """
+    Serve a WSGI app from pre-forked worker processes until interrupted
+
+    Call after the model is loaded so workers inherit it. Workers that die
+    are restarted; SIGINT/SIGTERM stop all of them.
+
+    Args:
+        app: WSGI application
+        host, port: Public address shared by all workers
+        workers: Number of worker processes
+        post_fork: Optional callable(worker_index) run in each worker
+            before it starts serving (threads do not survive fork); it can
+            load cluster.active_model() when that differs from the
+            inherited model
+    """
+    if not hasattr(os, 'fork'):
+        print("⚠️  Pre-fork serving needs a POSIX system; serving from a single process")
+        app.run(host=host, port=port, threaded=True)
+        return
+
+    listener = _listen(host, port)
+    internal = [_listen('127.0.0.1', 0) for _ in range(workers)]
+    cluster.ports = [sock.getsockname()[1] for sock in internal]
+    cluster._active_model = SharedText()
+
+    # Move everything allocated so far (the model included) out of the
+    # collector's generations, so GC passes in the workers do not write to
+    # - and so un-share - the pages holding it
+    gc.collect()
+    gc.freeze()
+
+    children = {}
+    stopping = False
+
+    def _spawn(index):
+        pid = os.fork()
+        if pid:
+            return pid
+        status = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            cluster.index = index
+            if post_fork is not None:
+                post_fork(index)
+            private = make_server('127.0.0.1', cluster.ports[index], app, threaded=True, fd=internal[index].fileno())
+            threading.Thread(target=private.serve_forever, name='internal-server', daemon=True).start()
+            public = make_server(host, port, app, threaded=True, fd=listener.fileno())
+            print(f"👷 Worker {index} (pid {os.getpid()}) serving on http://{host}:{port}")
+            public.serve_forever()
+        except BaseException as e:
+            print(f"❌ Worker {index} failed: {str(e)}")
+            status = 1
+        finally:
+            os._exit(status)
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    for index in range(workers):
+        children[_spawn(index)] = index
+    print(f"🚀 {workers} workers serving on http://{host}:{port}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is not None and not stopping:
+            print(f"⚠️  Worker {index} (pid {pid}) exited with status {status}, restarting")
+            active = cluster.active_model()
+            if active:
+                print(f"📦 Worker {index} will load the active model {active}")
+            # Back off so a worker that cannot start does not spin
+            time.sleep(1)
+            children[_spawn(index)] = index
+
+    listener.close()
+    print("👋 All workers stopped")
@@ -0,0 +1,197 @@
+"""
+On-demand profiling for the Flask services
+- SamplingProfiler: samples every thread's Python stack with
+  sys._current_frames() and returns collapsed stacks, the input format of
+  flamegraph.pl and speedscope. Nothing runs until a profile is requested.
+- stage(): per-request stage timings, returned in the X-Profile and
+  Server-Timing response headers when a request sends X-Profile: 1.
+  Work done for a request on another thread is recorded by passing its
+  trace along (current_trace() and tracing()).
+The backend uses the same module: backend/profiling.py is a vendored copy.
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+MAX_PROFILE_SECONDS = 60
+
+_local = threading.local()
+
+
+class SamplingProfiler:
+    """Statistical profiler over all threads of this process; one profile at a time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._lock.locked()
+
+    def profile(self, seconds, interval=0.005, idle=False):
+        """
+        Sample all threads for `seconds`, blocking the calling thread
+
+        Args:
+            seconds: How long to sample (at most MAX_PROFILE_SECONDS)
+            interval: Seconds between samples
+            idle: Include threads waiting in the server's accept/select loop
+
+        Returns:
+            (collapsed, samples): Counter of 'thread;outer;...;inner' stacks
+            and the number of sampling passes, or None if a profile is
+            already running
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            seconds = min(seconds, MAX_PROFILE_SECONDS)
+            own = threading.get_ident()
+            names = {}
+            collapsed = collections.Counter()
+            samples = 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                frames = sys._current_frames()
+                if len(names) != len(frames):
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    stack = _collapse(frame)
+                    if idle or not _is_idle(stack):
+                        collapsed[f"{names.get(ident, ident)};{stack}"] += 1
+                samples += 1
+                time.sleep(interval)
+            return collapsed, samples
+        finally:
+            self._lock.release()
+
+
+def _collapse(frame):
+    """'outer;...;inner' for a frame and its callers"""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
+
+
+def _is_idle(stack):
+    """True for threads parked waiting for work rather than doing any"""
+    leaf = stack.rsplit(';', 1)[-1]
+    return leaf.startswith(('select (', 'poll (', 'wait (', 'accept (', '_worker (', 'serve_forever ('))
+
+
+def format_collapsed(collapsed):
+    """Collapsed stacks as text, one 'stack count' line each, heaviest first"""
+    return ''.join(f"{stack} {count}\n" for stack, count in collapsed.most_common())
+
+
+profiler = SamplingProfiler()
+
+
+class StageTrace:
+    """Milliseconds spent per named stage of one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds * 1000
+
+    def extend(self, other):
+        """Add another trace's stages to this one"""
+        for name, milliseconds in other.stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + milliseconds
+
+    def header(self):
+        """Server-Timing syntax: 'parse;dur=0.12, infer;dur=1.80, total;dur=2.40'"""
+        timings = dict(self.stages, total=(time.perf_counter() - self.started) * 1000)
+        return ', '.join(f"{name};dur={duration:.2f}" for name, duration in timings.items())
+
+
+def current_trace():
+    """Trace of the request this thread is handling, or None if it is not traced"""
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def tracing(trace):
+    """Record stage() blocks on this thread into `trace` (or nothing, if None) for the with-block"""
+    previous = getattr(_local, 'trace', None)
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+@contextmanager
+def stage(name):
+    """Time a with-block as a stage of the current request, if it is being traced"""
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - started)
+
+
+def instrument(app, is_admin):
+    """
+    Add X-Profile tracing and the admin profiling endpoint to a Flask app
+
+    GET /admin/profile?seconds=5&interval=0.005 samples the process and
+    returns collapsed stacks as text/plain.
+
+    Args:
+        app: Flask application
+        is_admin: Callable(request) -> bool deciding who may profile
+    """
+    from flask import Response, jsonify, request
+
+    @app.before_request
+    def _start_trace():
+        _local.trace = StageTrace() if request.headers.get('X-Profile') else None
+
+    @app.after_request
+    def _finish_trace(response):
+        trace = getattr(_local, 'trace', None)
+        if trace is not None:
+            _local.trace = None
+            response.headers['X-Profile'] = trace.header()
+            response.headers['Server-Timing'] = response.headers['X-Profile']
+        return response
+
+    @app.route('/admin/profile', methods=['GET'])
+    def sample_profile():
+        """Sample this process for N seconds and return collapsed stacks"""
+        if not is_admin(request):
+            return jsonify({'error': 'Admin access required'}), 403
+        try:
+            seconds = float(request.args.get('seconds', 5))
+            interval = float(request.args.get('interval', 0.005))
+            if seconds <= 0 or interval <= 0:
+                raise ValueError('seconds and interval must be positive')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        result = profiler.profile(seconds, interval, idle=request.args.get('idle') == '1')
+        if result is None:
+            return jsonify({'error': 'A profile is already running'}), 409
+        collapsed, samples = result
+        response = Response(format_collapsed(collapsed), mimetype='text/plain')
+        response.headers['X-Profile-Samples'] = str(samples)
+        return response
+
+    return app
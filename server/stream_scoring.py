@@ -0,0 +1,125 @@
+"""
+Streaming batch scoring for the fraud model service
+Reads NDJSON or CSV transactions incrementally, scores them in fixed-size
+vectorized batches through FraudModelService.predict_many and yields the
+results as they are produced, so memory use does not depend on input size
+"""
+
+import csv
+import io
+import itertools
+import json
+import time
+
+# Columns written when results are streamed out as CSV
+RESULT_COLUMNS = [
+    'index', 'transactionId', 'riskScore', 'fraudProbability', 'isFraud',
+    'classification', 'confidence', 'timestamp', 'error'
+]
+
+
+def read_ndjson(lines):
+    """Transactions from NDJSON lines; unparseable lines become None"""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def read_csv(lines):
+    """Transactions from CSV lines with a header row; empty cells are treated as missing"""
+    if not isinstance(lines, io.TextIOBase):
+        lines = (line.decode('utf-8') if isinstance(line, bytes) else line for line in lines)
+    for row in csv.DictReader(lines):
+        yield {column: value for column, value in row.items() if value not in ('', None)}
+
+
+def read_transactions(lines, input_format='ndjson'):
+    """Transactions from an iterable of lines in 'ndjson' or 'csv' format"""
+    if input_format == 'csv':
+        return read_csv(lines)
+    if input_format == 'ndjson':
+        return read_ndjson(lines)
+    raise ValueError(f"Unsupported input format: {input_format}")
+
+
+class StreamStats:
+    """Running row, error and throughput counts for a scoring stream"""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.rows = 0
+        self.errors = 0
+        self.flagged = 0
+
+    def update(self, results):
+        self.rows += len(results)
+        for result in results:
+            if 'error' in result:
+                self.errors += 1
+            elif result['isFraud']:
+                self.flagged += 1
+
+    def summary(self):
+        elapsed = self.clock() - self.started
+        return {
+            'rows': self.rows,
+            'errors': self.errors,
+            'flagged': self.flagged,
+            'seconds': round(elapsed, 3),
+            'rowsPerSecond': round(self.rows / elapsed, 1) if elapsed > 0 else None
+        }
+
+
+def score_stream(service, transactions, batch_size=1000, stats=None):
+    """
+    Score an iterable of transactions in batches, yielding one result per row
+
+    Only one batch is held in memory at a time. Every result carries the
+    row's position in the input as 'index'. Predictions are not added to
+    the service's live history or analytics.
+
+    Args:
+        service: FraudModelService with a loaded model
+        transactions: Iterable of transaction dicts (None for unreadable rows)
+        batch_size: Rows per predict_many call
+        stats: Optional StreamStats updated after every batch
+    """
+    iterator = iter(transactions)
+    offset = 0
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        results = service.predict_many(batch, record=False)
+        for i, result in enumerate(results):
+            result['index'] = offset + i
+        if stats is not None:
+            stats.update(results)
+        offset += len(batch)
+        yield from results
+
+
+def format_ndjson(results):
+    """Encode results as NDJSON lines"""
+    for result in results:
+        yield json.dumps(result) + '\n'
+
+
+def format_csv(results):
+    """Encode results as CSV lines, header first"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=RESULT_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    for result in results:
+        writer.writerow(result)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,105 @@
+"""
+Tests for the incremental analytics aggregator
+Compares the running aggregates against brute-force recomputation
+"""
+
+import random
+
+from analytics import AnalyticsAggregator, WINDOWS, merge_snapshots
+from history_store import CLASSIFICATIONS
+from model_service import FraudModelService
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _prediction(risk_score, service=FraudModelService()):
+    return {
+        'riskScore': risk_score,
+        'classification': service._classify_risk(risk_score),
+        'timestamp': '2025-09-20T10:30:00',
+        'transactionId': 'TXN'
+    }
+
+
+def _counts(events):
+    counts = {name: 0 for name in CLASSIFICATIONS}
+    for _, prediction in events:
+        counts[prediction['classification']] += 1
+    return counts
+
+
+def test_matches_brute_force():
+    rng = random.Random(3)
+    clock = FakeClock()
+    aggregator = AnalyticsAggregator(recent_size=50, clock=clock)
+    events = []
+
+    for _ in range(3000):
+        clock.now += rng.choice([0.0, 0.2, 1.5, 7.0, 45.0])
+        prediction = _prediction(rng.random())
+        aggregator.record(prediction)
+        events.append((clock.now, prediction))
+
+        if rng.random() < 0.05:
+            clock.now += rng.choice([0.0, 30.0, 400.0])
+            snapshot = aggregator.snapshot()
+            now_second = int(clock.now)
+            for name, length in WINDOWS.items():
+                in_window = [e for e in events if int(e[0]) > now_second - length]
+                assert snapshot['slidingWindows'][name] == _counts(in_window), name
+                index = int(clock.now // length)
+                current = [e for e in events if int(e[0] // length) == index]
+                assert snapshot['tumblingWindows'][name]['current'] == _counts(current), name
+            assert snapshot['classificationTotals'] == _counts(events)
+            assert snapshot['fraudDistribution'] == _counts(events[-50:])
+            assert snapshot['recentPredictions'] == [p for _, p in events[-50:]]
+            assert [t['y'] for t in snapshot['riskTrends']] == [p['riskScore'] for _, p in events[-50:]]
+
+
+def test_quantiles_and_idle_gap():
+    clock = FakeClock()
+    aggregator = AnalyticsAggregator(clock=clock)
+    assert aggregator.snapshot()['riskScoreQuantiles']['p50'] is None
+
+    for i in range(1000):
+        aggregator.record(_prediction(i / 1000))
+    quantiles = aggregator.snapshot()['riskScoreQuantiles']
+    assert abs(quantiles['p50'] - 0.5) <= 0.002
+    assert abs(quantiles['p99'] - 0.99) <= 0.002
+
+    clock.now += 2 * 3600
+    snapshot = aggregator.snapshot()
+    assert sum(snapshot['slidingWindows']['1h'].values()) == 0
+    assert sum(snapshot['tumblingWindows']['1h']['previous'].values()) == 0
+    assert snapshot['totalPredictions'] == 1000
+
+
+def test_merged_worker_snapshots_match_single_aggregator():
+    rng = random.Random(5)
+    clock = FakeClock()
+    combined = AnalyticsAggregator(recent_size=50, clock=clock)
+    workers = [AnalyticsAggregator(recent_size=50, clock=clock) for _ in range(4)]
+
+    for i in range(2000):
+        clock.now += rng.choice([0.0, 0.5, 3.0, 40.0])
+        prediction = dict(_prediction(rng.random()), timestamp=f'2025-09-20T10:30:00.{i:06d}')
+        combined.record(prediction)
+        rng.choice(workers).record(prediction)
+
+    merged = merge_snapshots([worker.snapshot(include_histogram=True) for worker in workers], recent_size=50)
+    assert merged == combined.snapshot()
+
+
+if __name__ == "__main__":
+    print("🧪 Testing incremental analytics")
+    print("=" * 50)
+    for test in [test_matches_brute_force, test_quantiles_and_idle_gap,
+                 test_merged_worker_snapshots_match_single_aggregator]:
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,183 @@
+"""
+Tests for the ASGI variant of the model service
+Drives the ASGI app directly with an asyncio harness, no server needed
+"""
+
+import asyncio
+import json
+import threading
+
+import model_service
+from asgi_service import PARSED_JSON, AsgiModelService
+from conftest import serving, small_service
+
+
+async def _request(app, method, path, body=b'', chunk_size=None):
+    """Send one HTTP request through an ASGI app; returns (status, headers, body)"""
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] if chunk_size and body else [body]
+    messages = [
+        {'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(),
+        'headers': [(b'content-type', b'application/json')], 'http_version': '1.1', 'scheme': 'http'
+    }
+    await app(scope, receive, send)
+    start = sent[0]
+    return start['status'], dict(start['headers']), b''.join(m.get('body', b'') for m in sent[1:])
+
+
+def test_serves_flask_endpoints(live_service):
+    service = live_service
+    app = AsgiModelService(model_service.app, workers=2, max_pending=4)
+
+    transaction = {'transactionAmount': 900.0, 'accountBalance': 10.0, 'transactionId': 'TXN_ASGI'}
+    status, headers, body = asyncio.run(_request(app, 'POST', '/predict', json.dumps(transaction).encode(), chunk_size=7))
+    assert status == 200 and headers[b'content-type'] == b'application/json'
+    prediction = json.loads(body)
+    assert prediction['transactionId'] == 'TXN_ASGI'
+    assert prediction['riskScore'] == service.predict(transaction)['riskScore']
+
+    # The streaming endpoint reads an unbuffered body of any size
+    lines = b''.join(json.dumps(dict(transaction, transactionId=f'TXN_{i}')).encode() + b'\n' for i in range(50))
+    status, _, body = asyncio.run(_request(AsgiModelService(model_service.app, max_body_bytes=64),
+                                           'POST', '/predict/stream?batchSize=8', lines, chunk_size=100))
+    results = [json.loads(line) for line in body.splitlines()]
+    assert status == 200 and results[-1]['summary']['rows'] == 50
+    assert [result['transactionId'] for result in results[:-1]] == [f'TXN_{i}' for i in range(50)]
+
+    status, _, body = asyncio.run(_request(app, 'GET', '/history?limit=1'))
+    assert status == 200 and json.loads(body)['predictions'][0]['transactionId'] == 'TXN_ASGI'
+    assert asyncio.run(_request(app, 'GET', '/missing'))[0] == 404
+
+
+def test_backpressure_and_limits():
+    release = threading.Event()
+
+    def slow_app(environ, start_response):
+        if environ['PATH_INFO'] != '/health':
+            release.wait(10)
+        start_response('200 OK', [('Content-Type', 'application/json')])
+        return [environ['wsgi.input'].read() or b'{}']
+
+    app = AsgiModelService(slow_app, workers=1, max_pending=2, max_body_bytes=64)
+
+    async def scenario():
+        busy = [asyncio.ensure_future(_request(app, 'POST', '/predict', b'{"n": %d}' % i)) for i in range(2)]
+        await asyncio.sleep(0.05)
+        assert app.pending == 2
+        rejected = await _request(app, 'POST', '/predict', b'{}')
+        health = await _request(app, 'GET', '/health')
+        stats = json.loads((await _request(app, 'GET', '/concurrency'))[2])
+        release.set()
+        return rejected, health, stats, await asyncio.gather(*busy)
+
+    rejected, health, stats, busy = asyncio.run(scenario())
+    assert rejected[0] == 429 and rejected[1][b'retry-after'] == b'1'
+    assert health[0] == 200
+    assert stats['pending'] == 2 and stats['rejected'] == 1
+    assert [json.loads(body) for _, _, body in busy] == [{'n': 0}, {'n': 1}]
+    assert app.pending == 0
+
+    assert asyncio.run(_request(app, 'POST', '/predict', b'x' * 65, chunk_size=10))[0] == 413
+
+
+def test_pending_counts_requests_still_uploading():
+    app = AsgiModelService(lambda environ, start_response: [], workers=1, max_pending=2)
+
+    async def scenario():
+        disconnect = asyncio.Event()
+
+        async def stalled_receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def ignore(message):
+            pass
+
+        scope = {'type': 'http', 'method': 'POST', 'path': '/predict', 'headers': []}
+        uploading = [asyncio.ensure_future(app(scope, stalled_receive, ignore)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        rejected = await _request(app, 'POST', '/predict', b'{}')
+        pending = app.pending
+        disconnect.set()
+        await asyncio.gather(*uploading)
+        return rejected, pending
+
+    rejected, pending = asyncio.run(scenario())
+    assert rejected[0] == 429 and pending == 2
+    assert app.pending == 0
+
+
+def test_json_is_parsed_on_the_loop():
+    seen = []
+
+    def app_(environ, start_response):
+        seen.append((environ.get(PARSED_JSON), threading.current_thread().name))
+        start_response('200 OK', [('Content-Type', 'application/json')])
+        return [b'{}']
+
+    app = AsgiModelService(app_, workers=1, max_loop_json_bytes=32)
+    for body in [b'{"a": [1, 2]}', b'not json', b'{"big": "' + b'x' * 40 + b'"}']:
+        assert asyncio.run(_request(app, 'POST', '/predict', body))[0] == 200
+    assert [parsed for parsed, _ in seen] == [{'a': [1, 2]}, None, None]
+    assert all(name.startswith('inference') for _, name in seen)
+
+
+def test_streaming_paths_respond_before_the_body_ends():
+    def echo(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'application/x-ndjson')])
+        return (line.upper() for line in environ['wsgi.input'])
+
+    app = AsgiModelService(echo, streaming_paths=('/echo',), max_body_bytes=4)
+
+    async def scenario():
+        first_line_sent = asyncio.Event()
+        messages = [{'type': 'http.request', 'body': b'one\ntw', 'more_body': True},
+                    {'type': 'http.request', 'body': b'o\n', 'more_body': True}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            # The last chunk only arrives once a response line went out
+            await first_line_sent.wait()
+            return {'type': 'http.request', 'body': b'three\n', 'more_body': False}
+
+        async def send(message):
+            sent.append(message)
+            if message.get('body'):
+                first_line_sent.set()
+
+        scope = {'type': 'http', 'method': 'POST', 'path': '/echo', 'headers': []}
+        await asyncio.wait_for(app(scope, receive, send), 5)
+        return sent
+
+    sent = asyncio.run(scenario())
+    assert sent[0]['status'] == 200
+    assert [m['body'] for m in sent[1:] if m.get('body')] == [b'ONE\n', b'TWO\n', b'THREE\n']
+
+
+if __name__ == "__main__":
+    print("🧪 Testing ASGI model service")
+    print("=" * 50)
+    with serving(small_service()) as service:
+        test_serves_flask_endpoints(service)
+    print("✅ test_serves_flask_endpoints")
+    for test in [test_backpressure_and_limits,
+                 test_pending_counts_requests_still_uploading, test_json_is_parsed_on_the_loop,
+                 test_streaming_paths_respond_before_the_body_ends]:
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,121 @@
+"""
+Tests for the parallel offline batch scorer
+"""
+
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from batch_scorer import CHECKPOINT_NAME, _read_partition, plan_partitions, run_job, transaction_status
+from model_service import FraudModelService
+
+COLUMNS = ['transactionAmount', 'accountBalance']
+
+
+def _dataset(tmp_path, rows=45):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.uniform(0, 1000, size=(300, 2)), columns=COLUMNS)
+    model_path = str(tmp_path / 'model.pkl')
+    with open(model_path, 'wb') as file:
+        pickle.dump({'model': RandomForestClassifier(n_estimators=5, random_state=0).fit(X, X['transactionAmount'] > 500)}, file)
+
+    data = pd.DataFrame(rng.uniform(0, 1000, size=(rows, 2)), columns=COLUMNS)
+    data.insert(0, 'transactionId', [f'TXN_{i}' for i in range(rows)])
+    data.loc[3, 'accountBalance'] = np.nan
+    source = str(tmp_path / 'transactions.csv')
+    data.to_csv(source, index=False)
+    return source, model_path, data
+
+
+def _read_output(output_dir):
+    parts = sorted(name for name in os.listdir(output_dir) if name.startswith('part-'))
+    return pd.concat([pd.read_csv(os.path.join(output_dir, name)) for name in parts], ignore_index=True)
+
+
+def test_transaction_status_thresholds():
+    assert [transaction_status(score) for score in (0.0, 0.19, 0.2, 0.69, 0.7, 1.0)] == [
+        'approved', 'approved', 'flagged', 'flagged', 'blocked', 'blocked'
+    ]
+
+
+def test_scores_partitions_in_parallel(tmp_path):
+    source, model_path, data = _dataset(tmp_path)
+    output_dir = str(tmp_path / 'scored')
+    summary = run_job(source, output_dir, model_path, workers=2, partition_rows=10)
+    assert summary['partitions'] == 5 and summary['scored'] == 5 and summary['rows'] == 45
+
+    service = FraudModelService()
+    service.load_model(model_path)
+    records = [{k: v for k, v in record.items() if not pd.isna(v)} for record in data.to_dict('records')]
+    expected = service.predict_many(records, record=False)
+
+    scored = _read_output(output_dir)
+    assert list(scored['row']) == list(range(45))
+    assert list(scored['transactionId']) == list(data['transactionId'])
+    np.testing.assert_allclose(scored['riskScore'], [result['riskScore'] for result in expected])
+    assert list(scored['status']) == [transaction_status(result['riskScore']) for result in expected]
+    assert list(scored['classification']) == [result['classification'] for result in expected]
+
+
+def test_csv_partitions_are_read_by_byte_offset(tmp_path):
+    source = str(tmp_path / 'tricky.csv')
+    with open(source, 'wb') as file:
+        file.write(b'transactionId,note,transactionAmount\r\n')
+        for i in range(23):
+            note = f'"line one\nline ""{i}""\r\nline three"' if i % 4 == 0 else f'plain {i}'
+            file.write(f'TXN_{i},{note},{i * 1.5}\r\n'.encode())
+            if i == 10:
+                file.write(b'\r\n')
+    expected = pd.read_csv(source)
+
+    partitions = plan_partitions([source], 5)
+    assert [(p['start'], p['rows']) for p in partitions] == [(0, 5), (5, 5), (10, 5), (15, 5), (20, 3)]
+    frames = [_read_partition(partition) for partition in partitions]
+    pd.testing.assert_frame_equal(pd.concat(frames, ignore_index=True), expected)
+
+
+def test_resumes_from_checkpoint(tmp_path):
+    source, model_path, _ = _dataset(tmp_path)
+    output_dir = str(tmp_path / 'scored')
+    run_job(source, output_dir, model_path, workers=1, partition_rows=10)
+    before = _read_output(output_dir)
+
+    # Simulate a job interrupted before partitions 1 and 4 finished
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT_NAME)
+    with open(checkpoint_path) as file:
+        checkpoint = json.load(file)
+    for index in ('1', '4'):
+        os.remove(os.path.join(output_dir, checkpoint['completed'].pop(index)['file']))
+    checkpoint['complete'] = False
+    with open(checkpoint_path, 'w') as file:
+        json.dump(checkpoint, file)
+
+    summary = run_job(source, output_dir, model_path, workers=1, partition_rows=10)
+    assert summary['scored'] == 2 and summary['skipped'] == 3 and summary['rows'] == 45
+    pd.testing.assert_frame_equal(_read_output(output_dir), before)
+
+    # A checkpoint is not reused for a different job
+    try:
+        run_job(source, output_dir, model_path, workers=1, partition_rows=20)
+        assert False, "expected a checkpoint mismatch"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+
+    print("🧪 Testing batch scorer")
+    print("=" * 50)
+    test_transaction_status_thresholds()
+    print("✅ test_transaction_status_thresholds")
+    for test in [test_scores_partitions_in_parallel, test_csv_partitions_are_read_by_byte_offset,
+                 test_resumes_from_checkpoint]:
+        with tempfile.TemporaryDirectory() as directory:
+            test(pathlib.Path(directory))
+        print(f"✅ {test.__name__}")
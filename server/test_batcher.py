@@ -0,0 +1,110 @@
+"""
+Tests for the micro-batching request coalescer
+"""
+
+import threading
+
+import pytest
+
+from batcher import PredictionBatcher
+from conftest import COMPLETE_TRANSACTION, PARTIAL_TRANSACTION, device_risk_service
+
+
+def _echo_many(calls):
+    def predict_many(transactions):
+        calls.append(len(transactions))
+        return [{'error': 'bad row'} if t.get('bad') else {'transactionId': t['id']} for t in transactions]
+    return predict_many
+
+
+def test_concurrent_requests_are_coalesced():
+    calls = []
+    batcher = PredictionBatcher(_echo_many(calls), window_ms=50, max_batch_size=16)
+    results = {}
+    start = threading.Barrier(40)
+
+    def client(i):
+        start.wait()
+        results[i] = batcher.predict({'id': i})
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert all(results[i] == {'transactionId': i} for i in range(40))
+    assert sum(calls) == 40
+    assert max(calls) <= 16 and len(calls) < 40
+    stats = batcher.stats()
+    assert stats['rows'] == 40 and stats['batches'] == len(calls)
+    assert stats['largest_batch'] == max(calls)
+
+
+def test_errors_resolve_individual_futures():
+    batcher = PredictionBatcher(_echo_many([]), window_ms=20)
+    good = batcher.submit({'id': 1})
+    bad = batcher.submit({'id': 2, 'bad': True})
+    assert good.result(5) == {'transactionId': 1}
+    with pytest.raises(ValueError, match='bad row'):
+        bad.result(5)
+
+    def broken(transactions):
+        raise ValueError("Model not loaded")
+
+    batcher.predict_many = broken
+    with pytest.raises(ValueError, match='Model not loaded'):
+        batcher.predict({'id': 3}, timeout=5)
+    batcher.close()
+
+
+def test_stuck_worker_times_out():
+    calls = []
+    started, release = threading.Event(), threading.Event()
+
+    def slow_many(transactions):
+        calls.append([t['id'] for t in transactions])
+        started.set()
+        release.wait(5)
+        return [{'transactionId': t['id']} for t in transactions]
+
+    batcher = PredictionBatcher(slow_many, window_ms=1, timeout=0.1)
+    stuck = batcher.submit({'id': 1})
+    started.wait(5)
+    with pytest.raises(TimeoutError, match='not ready after 0.1s'):
+        batcher.predict({'id': 2})
+    release.set()
+    assert stuck.result(5) == {'transactionId': 1}
+    # The withdrawn request is not scored once the worker frees up
+    assert batcher.predict({'id': 3}, timeout=5) == {'transactionId': 3}
+    batcher.close()
+    assert calls == [[1], [3]]
+
+
+def test_batched_results_equal_unbatched():
+    # A coalesced request scores as it would alone, whatever shares its window
+    service = device_risk_service()
+    alone = [service.predict(t) for t in [PARTIAL_TRANSACTION, COMPLETE_TRANSACTION]]
+    calls = []
+
+    def predict_many(transactions):
+        calls.append(len(transactions))
+        return service.predict_many(transactions)
+
+    batcher = PredictionBatcher(predict_many, window_ms=200)
+    futures = [batcher.submit(t) for t in [PARTIAL_TRANSACTION, COMPLETE_TRANSACTION]]
+    batched = [future.result(5) for future in futures]
+    batcher.close()
+    assert calls == [2]
+    assert [r['riskScore'] for r in batched] == [r['riskScore'] for r in alone]
+    assert [r['classification'] for r in batched] == [r['classification'] for r in alone]
+
+
+if __name__ == "__main__":
+    print("🧪 Testing prediction batcher")
+    print("=" * 50)
+    for test in [test_concurrent_requests_are_coalesced, test_errors_resolve_individual_futures,
+                 test_stuck_worker_times_out, test_batched_results_equal_unbatched]:
+        test()
+        print(f"✅ {test.__name__}")
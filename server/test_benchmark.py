@@ -0,0 +1,34 @@
+"""
+Smoke tests for the benchmark harness
+"""
+
+import benchmark
+
+
+def test_run_reports_every_case():
+    report = benchmark.run(trees=3, depth=4, batch_sizes=[1, 20], min_time=0, max_iterations=3, verbose=False)
+    assert report['meta']['trees'] == 3
+    assert [(result['case'], result['batchSize']) for result in report['results']] == [
+        (case, size) for case in benchmark.CASES for size in (1, 20)
+    ]
+    for result in report['results']:
+        assert result['iterations'] == 3
+        assert 0 < result['p50Ms'] <= result['p95Ms'] <= result['p99Ms']
+
+
+def test_compare_flags_regressions():
+    baseline = {'results': [{'case': 'predict', 'batchSize': 1, 'p50Ms': 2.0},
+                            {'case': 'predict', 'batchSize': 10, 'p50Ms': 4.0}]}
+    current = {'results': [{'case': 'predict', 'batchSize': 1, 'p50Ms': 2.1},
+                           {'case': 'predict', 'batchSize': 10, 'p50Ms': 5.0},
+                           {'case': 'route', 'batchSize': 1, 'p50Ms': 1.0}]}
+    changes = benchmark.compare(baseline, current, tolerance=0.10)
+    assert [(change['batchSize'], change['regression']) for change in changes] == [(1, False), (10, True)]
+
+
+if __name__ == "__main__":
+    print("🧪 Testing benchmark harness")
+    print("=" * 50)
+    for test in [test_run_reports_every_case, test_compare_flags_regressions]:
+        test()
+        print(f"✅ {test.__name__}")
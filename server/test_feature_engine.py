@@ -0,0 +1,168 @@
+"""
+Parity tests for the compiled feature engine
+Checks that FeatureEngine produces bit-identical features to the pandas
+preprocess_data path for the same transactions
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from feature_engine import FeatureEngine
+from model_service import FraudModelService
+
+FEATURES = [
+    'transactionAmount', 'accountBalance', 'deviceType', 'merchantCategory',
+    'ipAddressFlag', 'previousFraudulentActivity', 'transactionType',
+    'hour', 'day_of_week', 'is_weekend'
+]
+
+FULL_TRANSACTIONS = [
+    {'transactionAmount': 1500.0, 'accountBalance': 5000.0, 'deviceType': 'Mobile',
+     'merchantCategory': 'Online Shopping', 'ipAddressFlag': 'Suspicious',
+     'previousFraudulentActivity': 'None', 'transactionType': 'Purchase',
+     'timestamp': '2025-09-20T10:30:00Z'},
+    {'transactionAmount': '249.99', 'accountBalance': 12, 'deviceType': 'Smart Fridge',
+     'merchantCategory': 'Travel', 'ipAddressFlag': 'Blacklisted',
+     'previousFraudulentActivity': 'Previously Flagged', 'transactionType': 'Transfer',
+     'timestamp': '2025-09-21T23:59:59.123+05:30'},
+    {'transactionAmount': 'not a number', 'accountBalance': None, 'deviceType': None,
+     'merchantCategory': 'Other', 'ipAddressFlag': 'Unknown',
+     'previousFraudulentActivity': 'Low Risk', 'transactionType': 'Refund',
+     'timestamp': '2025-09-22'},
+    {'transactionAmount': 0, 'accountBalance': -3.5, 'deviceType': 'ATM',
+     'merchantCategory': 'Grocery', 'ipAddressFlag': 'Safe',
+     'previousFraudulentActivity': 'High Risk', 'transactionType': 'Withdrawal',
+     'timestamp': 'September 27, 2025 04:15'},
+    {'transactionAmount': 1e6, 'accountBalance': 7, 'deviceType': 'Tablet',
+     'merchantCategory': 'Healthcare', 'ipAddressFlag': 'High Risk',
+     'previousFraudulentActivity': 'Medium Risk', 'transactionType': 'Payment',
+     'timestamp': 1758362400000000000},
+    {'transactionAmount': 10, 'accountBalance': 20, 'deviceType': 'Desktop',
+     'merchantCategory': 'Retail', 'ipAddressFlag': 'Safe',
+     'previousFraudulentActivity': 'None', 'transactionType': 'Deposit',
+     'timestamp': None},
+]
+
+PARTIAL_TRANSACTIONS = [
+    {'transactionAmount': 100.0, 'deviceType': 'Mobile'},
+    {'accountBalance': 5000.0, 'merchantCategory': 'Retail', 'timestamp': '2025-09-20T10:30:00'},
+    {'transactionId': 'TXN_1', 'location': 'Test City', 'transactionAmount': 5.0},
+]
+
+# Strings float() parses but pandas' numeric parser does not, and ones both take
+NUMBER_STRINGS = ['1_000', '١٢', '１２', ' 12 ', '1e3', '+3', '.5', 'Infinity', '-inf', 'nan',
+                  '0x10', '1,000', '', '   ', True, False, [1]]
+
+MIXED_BATCHES = [
+    PARTIAL_TRANSACTIONS,
+    [FULL_TRANSACTIONS[0], {'transactionAmount': 3.0}, {'deviceType': 'ATM', 'timestamp': '2025-09-27T08:00:00Z'}],
+    [{'transactionAmount': 1.0, 'ipAddressFlag': 'Safe'}, {'accountBalance': 2.0}],
+]
+
+
+def _service(scaler=None):
+    """Build a service with a small forest trained on the expected feature layout"""
+    rng = np.random.default_rng(7)
+    X = pd.DataFrame(rng.uniform(0, 10, size=(200, len(FEATURES))), columns=FEATURES)
+    y = (X['transactionAmount'] > 5).astype(int)
+
+    service = FraudModelService()
+    service.model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+    if scaler is not None:
+        service.scaler = scaler.fit(X)
+    service._compile_features()
+    return service
+
+
+def _assert_parity(service, transactions):
+    for transaction in transactions:
+        expected = service.preprocess_data(transaction).reindex(columns=FEATURES).to_numpy(dtype=np.float64)
+        actual = service.feature_engine.transform(transaction)
+        assert actual.shape == expected.shape
+        assert np.array_equal(actual.view(np.int64), expected.view(np.int64)), (transaction, actual, expected)
+
+
+def test_parity_without_scaler():
+    service = _service()
+    assert service.feature_engine is not None
+    _assert_parity(service, FULL_TRANSACTIONS + PARTIAL_TRANSACTIONS)
+
+
+def test_parity_for_number_strings():
+    service = _service()
+    _assert_parity(service, [{'transactionAmount': value, 'accountBalance': 1.0} for value in NUMBER_STRINGS])
+
+
+def test_parity_for_mixed_key_batches():
+    service = _service()
+    for batch in MIXED_BATCHES:
+        expected = service.preprocess_data(batch).reindex(columns=FEATURES).to_numpy(dtype=np.float64)
+        actual = service.feature_engine.transform(batch)
+        assert np.array_equal(actual.view(np.int64), expected.view(np.int64)), (batch, actual, expected)
+
+
+def test_rows_do_not_depend_on_their_batch():
+    # A row lacking keys that other rows have is featurized as if alone
+    service = _service()
+    for batch in MIXED_BATCHES:
+        for engine in [service.feature_engine.transform,
+                       lambda rows: service.preprocess_data(rows).reindex(columns=FEATURES).to_numpy(dtype=np.float64)]:
+            together = engine(batch)
+            alone = np.vstack([engine(transaction) for transaction in batch])
+            assert np.array_equal(together.view(np.int64), alone.view(np.int64)), (batch, together, alone)
+    partial, full = {'transactionAmount': 5.0, 'accountBalance': 5.0}, FULL_TRANSACTIONS[0]
+    assert np.isnan(service.feature_engine.transform(partial)[0][2:]).all()
+    assert np.array_equal(service.feature_engine.transform([partial, full])[0],
+                          service.feature_engine.transform([partial])[0], equal_nan=True)
+
+
+def test_parity_with_standard_scaler():
+    service = _service(StandardScaler())
+    assert service.feature_engine is not None
+    _assert_parity(service, FULL_TRANSACTIONS)
+
+
+def test_parity_with_minmax_scaler():
+    service = _service(MinMaxScaler())
+    assert service.feature_engine is not None
+    _assert_parity(service, FULL_TRANSACTIONS)
+
+
+def test_batch_matches_rows():
+    service = _service(StandardScaler())
+    batch = service.feature_engine.transform(FULL_TRANSACTIONS)
+    rows = np.vstack([service.feature_engine.transform(t) for t in FULL_TRANSACTIONS])
+    assert np.array_equal(batch.view(np.int64), rows.view(np.int64))
+
+
+def test_predictions_match_pandas_path():
+    service = _service(StandardScaler())
+    for transaction in FULL_TRANSACTIONS:
+        if np.isnan(service.feature_engine.transform(transaction)).any():
+            continue
+        fast = service.predict(transaction)['riskScore']
+        expected = service.preprocess_data(transaction).reindex(columns=FEATURES)
+        assert fast == service.model.predict_proba(expected)[0][1]
+
+
+def test_unsupported_layouts_fall_back():
+    service = _service()
+    assert FeatureEngine.compile(service.model, encoder=object()) is None
+
+    unknown = pd.DataFrame({'transactionAmount': [1.0, 2.0], 'location': [0.0, 1.0]})
+    model = RandomForestClassifier(n_estimators=2, random_state=0).fit(unknown, [0, 1])
+    assert FeatureEngine.compile(model) is None
+
+
+if __name__ == "__main__":
+    print("🧪 Testing compiled feature engine parity")
+    print("=" * 50)
+    for test in [test_parity_without_scaler, test_parity_for_number_strings,
+                 test_parity_for_mixed_key_batches, test_rows_do_not_depend_on_their_batch,
+                 test_parity_with_standard_scaler,
+                 test_parity_with_minmax_scaler, test_batch_matches_rows,
+                 test_predictions_match_pandas_path, test_unsupported_layouts_fall_back]:
+        test()
+        print(f"✅ {test.__name__}")
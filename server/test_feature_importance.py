@@ -0,0 +1,84 @@
+"""
+Tests for cached impurity importances and background permutation importance jobs
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from feature_importance import DEFAULT_FEATURE_IMPORTANCE, FeatureImportanceCache
+
+COLUMNS = ['transactionAmount', 'accountBalance', 'hour']
+
+
+def _model_and_sample():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.uniform(0, 1000, size=(200, len(COLUMNS))), columns=COLUMNS)
+    y = (X['transactionAmount'] > 500).astype(int).to_numpy()
+    return RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y), X, y
+
+
+def _wait_for_job(cache, fingerprint, timeout=60):
+    deadline = time.monotonic() + timeout
+    while cache.get(fingerprint)['permutationStatus'] == 'running':
+        assert time.monotonic() < deadline, "permutation job did not finish"
+        time.sleep(0.01)
+    return cache.get(fingerprint)
+
+
+def test_impurity_importances_are_cached():
+    model, _, _ = _model_and_sample()
+    cache = FeatureImportanceCache()
+    assert cache.best('abc') == DEFAULT_FEATURE_IMPORTANCE
+
+    entry = cache.register('abc', model)
+    assert cache.register('abc', model) is entry
+    assert entry['permutationStatus'] == 'not_started'
+    assert entry['impurity'][0]['feature'] == 'Transaction Amount'
+    assert sorted(item['feature'] for item in entry['impurity']) == ['Account Balance', 'Hour of Day', 'Transaction Amount']
+    assert round(sum(item['importance'] for item in entry['impurity'])) == 100
+    assert cache.best('abc') == entry['impurity']
+
+
+def test_permutation_job_completes():
+    model, X, y = _model_and_sample()
+    cache = FeatureImportanceCache()
+    assert cache.start_permutation('abc', model, X, y, n_repeats=2)
+    assert not cache.start_permutation('abc', model, X, y, n_repeats=2)
+
+    entry = _wait_for_job(cache, 'abc')
+    assert entry['permutationStatus'] == 'done'
+    assert entry['permutation'][0]['feature'] == 'Transaction Amount'
+    assert cache.best('abc') == entry['permutation']
+
+
+def test_failed_and_cancelled_jobs():
+    model, X, y = _model_and_sample()
+    cache = FeatureImportanceCache()
+    # A thread pool stands in for the process, so a job can be held in its queue
+    cache._executor = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    cache._executor.submit(release.wait, 10)
+
+    assert cache.start_permutation('abc', model, X, y[:10])
+    cache._executor.shutdown(wait=False, cancel_futures=True)
+    release.set()
+    assert cache.get('abc')['permutationStatus'] == 'cancelled'
+
+    # The shut-down pool is replaced, and a bad sample is reported as a failure
+    assert cache.start_permutation('abc', model, X, y[:10])
+    entry = _wait_for_job(cache, 'abc')
+    assert entry['permutationStatus'].startswith('failed: ')
+    assert entry['permutation'] is None and cache.best('abc') == entry['impurity']
+
+
+if __name__ == "__main__":
+    print("🧪 Testing feature importance cache")
+    print("=" * 50)
+    for test in [test_impurity_importances_are_cached, test_permutation_job_completes, test_failed_and_cancelled_jobs]:
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,150 @@
+"""
+Equivalence tests for the compiled random-forest backend
+Checks that CompiledForest.predict_proba matches sklearn's output
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import ExtraTreesClassifier, GradientBoostingClassifier, RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+import config
+from forest_engine import CompiledForest
+from model_service import FraudModelService
+
+
+def _data(n_samples=500, n_features=10, n_classes=2, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_samples, n_features)) * rng.uniform(0.1, 1000, size=n_features)
+    y = (X[:, 0] / X[:, 0].std() + X[:, 1] / X[:, 1].std() + rng.normal(size=n_samples) > 0).astype(int)
+    if n_classes > 2:
+        y = y + (X[:, 2] > 0) * (n_classes - 2)
+    return X, y
+
+
+def _assert_equivalent(estimator, X):
+    compiled = CompiledForest.from_estimator(estimator)
+    assert compiled is not None
+    expected = estimator.predict_proba(X)
+    actual = compiled.predict_proba(X)
+    assert actual.shape == expected.shape
+    assert np.array_equal(actual, expected), np.abs(actual - expected).max()
+    assert np.array_equal(compiled.predict(X), estimator.predict(X))
+
+
+def test_random_forest_matches_sklearn():
+    X, y = _data()
+    forest = RandomForestClassifier(n_estimators=50, random_state=0).fit(X, y)
+    _assert_equivalent(forest, X)
+    _assert_equivalent(forest, _data(seed=1)[0])
+    _assert_equivalent(forest, X[:1])
+
+
+def test_other_tree_models_match_sklearn():
+    X, y = _data(n_classes=3)
+    _assert_equivalent(ExtraTreesClassifier(n_estimators=20, max_depth=6, random_state=0).fit(X, y), X)
+    _assert_equivalent(RandomForestClassifier(n_estimators=10, min_samples_leaf=5, random_state=0).fit(X, y), X)
+    _assert_equivalent(DecisionTreeClassifier(random_state=0).fit(X, y), X)
+
+
+def test_dataframe_input_and_fallback():
+    X, y = _data(n_features=3)
+    columns = ['transactionAmount', 'accountBalance', 'deviceType']
+    frame = pd.DataFrame(X, columns=columns)
+    forest = RandomForestClassifier(n_estimators=10, random_state=0).fit(frame, y)
+    compiled = CompiledForest.from_estimator(forest)
+
+    assert np.array_equal(compiled.predict_proba(frame), forest.predict_proba(frame))
+    # Inputs the compiled path cannot handle are passed through to sklearn
+    assert compiled.as_features(frame[columns[::-1]]) is None
+    assert compiled.as_features(frame.assign(deviceType=np.inf)) is None
+
+    # Missing values follow each split's missing_go_to_left, like sklearn
+    missing = frame.mask(np.random.default_rng(0).random(frame.shape) < 0.3)
+    assert np.array_equal(compiled.predict_proba(missing), forest.predict_proba(missing))
+
+    assert CompiledForest.from_estimator(GradientBoostingClassifier(n_estimators=5).fit(X, y)) is None
+
+
+def test_contributions_sum_to_probability():
+    X, y = _data(n_features=6)
+    forest = RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+    compiled = CompiledForest.from_estimator(forest)
+    bias, contributions = compiled.contributions(X[:200])
+    assert contributions.shape == (200, 6)
+    assert np.allclose(bias + contributions.sum(axis=1), forest.predict_proba(X[:200])[:, 1])
+
+    # Walk one sample's paths tree by tree and compare
+    sample = X[0].astype(np.float32)
+    expected = np.zeros(6)
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        value = tree.value[:, 0, 1] / tree.value[:, 0, :].sum(axis=1)
+        node = 0
+        while tree.children_left[node] != -1:
+            child = tree.children_left[node] if sample[tree.feature[node]] <= tree.threshold[node] else tree.children_right[node]
+            expected[tree.feature[node]] += value[child] - value[node]
+            node = child
+    assert np.allclose(contributions[0], expected / len(forest.estimators_))
+
+
+def test_artifact_roundtrip(tmp_path):
+    X, y = _data(n_features=4)
+    forest = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+    manifest = CompiledForest.from_estimator(forest).save(str(tmp_path))
+    assert manifest['nTrees'] == 20 and manifest['nFeatures'] == 4
+
+    loaded = CompiledForest.load(str(tmp_path), verify=True)
+    assert loaded.estimator is None
+    # Node arrays are read-only views of the mapped files
+    assert isinstance(loaded.threshold.base, np.memmap) and not loaded.threshold.flags.writeable
+    assert np.array_equal(loaded.predict_proba(X), forest.predict_proba(X))
+    assert np.array_equal(loaded.predict(X), forest.predict(X))
+    assert np.array_equal(loaded.feature_importances_, forest.feature_importances_)
+
+    (tmp_path / 'threshold.npy').write_bytes((tmp_path / 'threshold.npy').read_bytes()[:-8] + b'\0' * 8)
+    try:
+        CompiledForest.load(str(tmp_path), verify=True)
+        raise AssertionError("corrupt artifact was loaded")
+    except ValueError:
+        pass
+
+
+def test_service_uses_configured_backend():
+    X, y = _data(n_features=2)
+    frame = pd.DataFrame(X, columns=['transactionAmount', 'accountBalance'])
+    transaction = {'transactionAmount': float(X[0, 0]), 'accountBalance': float(X[0, 1])}
+
+    backend = config.INFERENCE_BACKEND
+    try:
+        service = FraudModelService()
+        service.model = RandomForestClassifier(n_estimators=10, random_state=0).fit(frame, y)
+        service._compile_features()
+
+        config.INFERENCE_BACKEND = 'compiled'
+        service._compile_forest()
+        assert service.inference_backend == 'compiled'
+        compiled_score = service.predict(transaction)['riskScore']
+
+        config.INFERENCE_BACKEND = 'sklearn'
+        service._compile_forest()
+        assert service.inference_backend == 'sklearn'
+        assert service.predict(transaction)['riskScore'] == compiled_score
+    finally:
+        config.INFERENCE_BACKEND = backend
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+
+    print("🧪 Testing compiled forest backend against sklearn")
+    print("=" * 50)
+    for test in [test_random_forest_matches_sklearn, test_other_tree_models_match_sklearn,
+                 test_dataframe_input_and_fallback, test_contributions_sum_to_probability,
+                 test_service_uses_configured_backend]:
+        test()
+        print(f"✅ {test.__name__}")
+    with tempfile.TemporaryDirectory() as directory:
+        test_artifact_roundtrip(pathlib.Path(directory))
+    print("✅ test_artifact_roundtrip")
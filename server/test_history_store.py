@@ -0,0 +1,70 @@
+"""
+Tests for the bounded prediction history store
+"""
+
+from datetime import timedelta
+
+from conftest import START, make_prediction
+from history_store import PredictionHistory, merge_pages
+
+
+def test_records_round_trip():
+    history = PredictionHistory(capacity=20)
+    predictions = [make_prediction(i) for i in range(15)]
+    for prediction in predictions:
+        history.append(prediction)
+    assert len(history) == 15 and history.total == 15
+    assert history.latest(100) == predictions
+    assert history.latest(3) == predictions[-3:]
+    assert history.latest(0) == []
+
+
+def test_capacity_is_bounded():
+    history = PredictionHistory(capacity=8)
+    for i in range(30):
+        history.append(make_prediction(i))
+    assert len(history) == 8 and history.total == 30
+    assert [p['transactionId'] for p in history.latest(100)] == [f'TXN_{i}' for i in range(22, 30)]
+
+
+def test_pagination_and_time_range():
+    history = PredictionHistory(capacity=50)
+    for i in range(60):
+        history.append(make_prediction(i))
+
+    page, matching = history.query(offset=0, limit=5)
+    assert matching == 50
+    assert [p['transactionId'] for p in page] == [f'TXN_{i}' for i in range(59, 54, -1)]
+
+    page, _ = history.query(offset=5, limit=5, newest_first=False)
+    assert [p['transactionId'] for p in page] == [f'TXN_{i}' for i in range(15, 20)]
+
+    page, matching = history.query(
+        since=(START + timedelta(seconds=20)).isoformat(),
+        until=START + timedelta(seconds=29),
+        newest_first=False
+    )
+    assert matching == 10
+    assert [p['transactionId'] for p in page] == [f'TXN_{i}' for i in range(20, 30)]
+
+
+def test_merged_worker_pages_match_single_history():
+    combined = PredictionHistory(capacity=100)
+    workers = [PredictionHistory(capacity=100) for _ in range(3)]
+    for i in range(90):
+        combined.append(make_prediction(i))
+        workers[(i * 7) % 3].append(make_prediction(i))
+
+    for offset, limit, newest_first in [(0, 10, True), (25, 20, True), (5, 30, False), (80, 20, True)]:
+        pages = [worker.query(offset=0, limit=offset + limit, newest_first=newest_first)[0] for worker in workers]
+        expected, _ = combined.query(offset=offset, limit=limit, newest_first=newest_first)
+        assert merge_pages(pages, offset, limit, newest_first) == expected
+
+
+if __name__ == "__main__":
+    print("🧪 Testing prediction history store")
+    print("=" * 50)
+    for test in [test_records_round_trip, test_capacity_is_bounded, test_pagination_and_time_range,
+                 test_merged_worker_pages_match_single_history]:
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,81 @@
+"""
+Tests for the sharded metrics registry and the /metrics endpoint
+"""
+
+import threading
+
+import model_service
+from conftest import serving, small_service
+from metrics import MIN_SWEEP, MetricsRegistry
+
+
+def test_counts_from_many_threads():
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests', ('route',))
+    latency = registry.histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+
+    def _work():
+        for i in range(1000):
+            requests.inc('/predict')
+            latency.observe(0.05 if i % 2 else 0.5, '/predict')
+
+    threads = [threading.Thread(target=_work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    requests.inc('/health')
+
+    # Shards of finished threads are folded in, not lost
+    totals = registry.collect()
+    assert totals[('requests_total', ('/predict',))] == 8000
+    assert totals[('latency_seconds', ('/predict',))][:3] == [4000, 4000, 0]
+    assert len(registry._shards) == 1
+
+    text = registry.render()
+    assert 'requests_total{route="/predict"} 8000' in text
+    assert 'latency_seconds_bucket{route="/predict",le="0.1"} 4000' in text
+    assert 'latency_seconds_bucket{route="/predict",le="+Inf"} 8000' in text
+    assert 'latency_seconds_count{route="/predict"} 8000' in text
+
+    # Snapshots from other workers are added in
+    doubled = registry.render([registry.snapshot()])
+    assert 'requests_total{route="/predict"} 16000' in doubled
+
+
+def test_exited_threads_are_retired_without_a_scrape():
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests')
+    # One short-lived thread per request, as Werkzeug's threaded server runs them
+    for _ in range(2000):
+        thread = threading.Thread(target=requests.inc)
+        thread.start()
+        thread.join()
+        assert len(registry._shards) + len(registry._new_shards) <= 2 * MIN_SWEEP
+
+    assert registry.collect()[('requests_total', ())] == 2000
+    assert len(registry._shards) == 0 and len(registry._new_shards) == 0
+
+
+def test_metrics_endpoint(live_service):
+    client = model_service.app.test_client()
+    assert client.post('/predict', json={'transactionAmount': 900.0, 'accountBalance': 10.0}).status_code == 200
+    response = client.get('/metrics')
+
+    text = response.get_data(as_text=True)
+    assert response.status_code == 200 and response.content_type.startswith('text/plain')
+    assert 'http_requests_total{method="POST",route="/predict",status="200"}' in text
+    assert 'stage_duration_seconds_count{stage="inference"}' in text
+    assert 'stage_duration_seconds_count{stage="preprocess"}' in text
+    assert 'fraud_predictions_total{classification=' in text
+
+
+if __name__ == "__main__":
+    print("🧪 Testing metrics")
+    print("=" * 50)
+    for test in [test_counts_from_many_threads, test_exited_threads_are_retired_without_a_scrape]:
+        test()
+        print(f"✅ {test.__name__}")
+    with serving(small_service()) as service:
+        test_metrics_endpoint(service)
+    print("✅ test_metrics_endpoint")
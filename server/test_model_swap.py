@@ -0,0 +1,176 @@
+"""
+Tests for background model loading, warm-up and hot swapping
+"""
+
+import pickle
+import threading
+import time
+
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+import model_service
+from conftest import model_file, serving
+from feature_importance import file_fingerprint
+from model_bundle import export_model_artifact, stale_artifact_source
+from model_service import FraudModelService
+
+TRANSACTION = {'transactionAmount': 250.0, 'accountBalance': 900.0, 'deviceType': 'Mobile', 'timestamp': '2025-09-20T10:30:00'}
+
+
+def _wait_for_load(service, timeout=30):
+    deadline = time.monotonic() + timeout
+    while service.load_status.in_progress:
+        assert time.monotonic() < deadline, "model load did not finish"
+        time.sleep(0.01)
+    return service.load_status.snapshot()
+
+
+def test_background_load_swap_and_rollback(tmp_path):
+    service = FraudModelService()
+    first_path = model_file(tmp_path, 'first.pkl', 0)
+    assert service.load_model(first_path)
+    first = service.bundle
+    assert service.load_status.snapshot()['state'] == 'ready'
+
+    # Predictions keep flowing while the next model loads
+    errors = []
+    stop = threading.Event()
+
+    def _predict():
+        while not stop.is_set():
+            try:
+                service.predict(TRANSACTION)
+            except Exception as e:
+                errors.append(e)
+
+    workers = [threading.Thread(target=_predict) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    assert service.start_model_load(model_file(tmp_path, 'second.pkl', 1))
+    status = _wait_for_load(service)
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    assert not errors
+    assert status['state'] == 'ready' and status['progress'] == 100
+    assert service.bundle is not first and service.previous_bundle is first
+    assert service.model_status()['active']['modelPath'].endswith('second.pkl')
+
+    assert service.rollback_model()
+    assert service.bundle is first
+    assert service.model_status()['active']['modelPath'] == first_path
+
+
+def test_failed_load_keeps_current_model(tmp_path):
+    service = FraudModelService()
+    assert service.load_model(model_file(tmp_path, 'good.pkl', 0))
+    before = service.bundle
+    score = service.predict(TRANSACTION)['riskScore']
+
+    # A model that cannot score the service's transactions fails warm-up
+    unusable = RandomForestClassifier(n_estimators=2, random_state=0).fit(
+        pd.DataFrame({'location': [0.0, 1.0]}), [0, 1]
+    )
+    path = tmp_path / 'bad.pkl'
+    with open(path, 'wb') as file:
+        pickle.dump(unusable, file)
+    assert service.start_model_load(str(path))
+    status = _wait_for_load(service)
+
+    assert status['state'] == 'failed' and status['error']
+    assert service.bundle is before and service.previous_bundle is None
+    # Nothing is cached for a model that never served
+    assert service.feature_importance.get(file_fingerprint(str(path))) is None
+    assert service.predict(TRANSACTION)['riskScore'] == score
+    assert not service.rollback_model()
+
+
+def test_model_artifact_matches_pickle(tmp_path):
+    pickle_path = model_file(tmp_path, 'model.pkl', 0)
+    artifact_path = str(tmp_path / 'model.forest')
+    export_model_artifact(pickle_path, artifact_path)
+
+    from_pickle = FraudModelService()
+    assert from_pickle.load_model(pickle_path)
+    from_artifact = FraudModelService()
+    assert from_artifact.load_model(artifact_path)
+    assert from_artifact.inference_backend == 'compiled'
+
+    transactions = [TRANSACTION, dict(TRANSACTION, transactionAmount=900.0), {'transactionAmount': 700.0}]
+    expected = [result['riskScore'] for result in from_pickle.predict_many(transactions)]
+    assert [result['riskScore'] for result in from_artifact.predict_many(transactions)] == expected
+    assert from_artifact.explain([TRANSACTION]) == from_pickle.explain([TRANSACTION])
+    assert from_artifact.get_analytics()['featureImportance'] == from_pickle.get_analytics()['featureImportance']
+
+
+def test_reexported_artifact_keeps_its_fingerprint(tmp_path):
+    pickle_path = model_file(tmp_path, 'model.pkl', 0)
+    artifact_path = str(tmp_path / 'model.forest')
+    first = export_model_artifact(pickle_path, artifact_path)
+    fingerprint = file_fingerprint(artifact_path)
+    second = export_model_artifact(pickle_path, artifact_path)
+    assert first['source']['exportedAt'] != second['source']['exportedAt']
+    assert file_fingerprint(artifact_path) == fingerprint
+
+    model_file(tmp_path, 'model.pkl', 1)
+    export_model_artifact(pickle_path, artifact_path)
+    assert file_fingerprint(artifact_path) != fingerprint
+
+
+def test_stale_artifact_is_skipped_at_startup(app_service, tmp_path):
+    pickle_path = model_file(tmp_path, 'fraud_model.pkl', 0)
+    artifact_path = str(tmp_path / 'fraud_model.forest')
+    export_model_artifact(pickle_path, artifact_path)
+    assert stale_artifact_source(artifact_path) is None
+
+    # The team replaces the .pkl but forgets to re-export
+    model_file(tmp_path, 'fraud_model.pkl', 1)
+    assert stale_artifact_source(artifact_path) == pickle_path
+
+    previous_paths = model_service.DEFAULT_MODEL_PATHS
+    try:
+        model_service.DEFAULT_MODEL_PATHS = [artifact_path, pickle_path]
+        assert model_service.load_default_model()
+        assert app_service.bundle.path == pickle_path
+    finally:
+        model_service.DEFAULT_MODEL_PATHS = previous_paths
+
+
+def test_load_model_route_is_synchronous_unless_async(app_service, tmp_path):
+    service = app_service
+    client = model_service.app.test_client()
+    first_path = model_file(tmp_path, 'first.pkl', 0)
+    # Clients that treat any 2xx as "loaded" see the new model right away
+    response = client.post('/load-model', json={'model_path': first_path})
+    assert response.status_code == 200
+    assert service.model_status()['active']['modelPath'] == first_path
+
+    second_path = model_file(tmp_path, 'second.pkl', 1)
+    response = client.post('/load-model', json={'model_path': second_path, 'async': True})
+    assert response.status_code == 202
+    assert _wait_for_load(service)['state'] == 'ready'
+    assert service.model_status()['active']['modelPath'] == second_path
+
+    broken = tmp_path / 'broken.pkl'
+    broken.write_bytes(b'not a pickle')
+    assert client.post('/load-model', json={'model_path': str(broken)}).status_code == 500
+    assert service.model_status()['active']['modelPath'] == second_path
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+
+    print("🧪 Testing hot model swap")
+    print("=" * 50)
+    for test in [test_background_load_swap_and_rollback, test_failed_load_keeps_current_model,
+                 test_model_artifact_matches_pickle, test_reexported_artifact_keeps_its_fingerprint]:
+        with tempfile.TemporaryDirectory() as directory:
+            test(pathlib.Path(directory))
+        print(f"✅ {test.__name__}")
+    for test in [test_stale_artifact_is_skipped_at_startup, test_load_model_route_is_synchronous_unless_async]:
+        with tempfile.TemporaryDirectory() as directory, serving() as service:
+            test(service, pathlib.Path(directory))
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,122 @@
+"""
+Tests for batch scoring: FraudModelService.predict_many and /predict/batch
+with JSON and NDJSON bodies
+"""
+
+import json
+from dataclasses import replace
+
+import config
+import model_service
+from conftest import (COMPLETE_TRANSACTION, PARTIAL_TRANSACTION, device_risk_service, make_transactions,
+                      serving, small_service)
+from model_service import _parse_ndjson
+
+
+def test_predict_many_matches_single_predictions():
+    service = small_service()
+    transactions = make_transactions(6)
+    results = service.predict_many(transactions[:3] + [None, {}, 'TXN_9'] + transactions[3:])
+
+    assert [r.get('error') for r in results[3:6]] == ['Invalid transaction data'] * 3
+    assert [r['index'] for r in results[3:6]] == [3, 4, 5]
+    scored = results[:3] + results[6:]
+    assert [r['transactionId'] for r in scored] == [t['transactionId'] for t in transactions]
+    assert [r['riskScore'] for r in scored] == [service.predict(t)['riskScore'] for t in transactions]
+    # Only the scored rows are recorded (then once more by each predict above)
+    assert service.prediction_history.total == 12
+
+
+def test_failed_batch_falls_back_to_rows():
+    service = small_service()
+    model_input = service._model_input
+    calls = []
+
+    def fragile(transactions, bundle):
+        rows = transactions if isinstance(transactions, list) else [transactions]
+        calls.append(len(rows))
+        if any(row.get('transactionId') == 'TXN_2' for row in rows):
+            raise ValueError('cannot preprocess TXN_2')
+        return model_input(transactions, bundle)
+
+    service._model_input = fragile
+    transactions = make_transactions(4)
+    results = service.predict_many(transactions)
+
+    # One batch attempt, then each row on its own
+    assert calls == [4, 1, 1, 1, 1]
+    assert results[2] == {'index': 2, 'error': 'cannot preprocess TXN_2'}
+    del service._model_input
+    assert [r['riskScore'] for r in results if 'riskScore' in r] == \
+        [r['riskScore'] for r in service.predict_many(transactions[:2] + transactions[3:], record=False)]
+
+
+def test_partial_rows_score_as_if_alone():
+    # Keys the complete row has must not fill in the partial row's gaps
+    service = device_risk_service()
+    for bundle in [service.bundle, replace(service.bundle, feature_engine=None)]:
+        service.bundle = bundle
+        alone = [service.predict(t)['riskScore'] for t in [PARTIAL_TRANSACTION, COMPLETE_TRANSACTION]]
+        together = service.predict_many([PARTIAL_TRANSACTION, COMPLETE_TRANSACTION])
+        assert [r['riskScore'] for r in together] == alone
+        reordered = service.predict_many([COMPLETE_TRANSACTION, PARTIAL_TRANSACTION])
+        assert [r['riskScore'] for r in reordered] == alone[::-1]
+
+
+def test_parse_ndjson():
+    body = '{"transactionId": "TXN_0"}\n\n  \nnot json\r\n{"transactionId": "TXN_1"}\n[1, 2'
+    assert _parse_ndjson(body) == [{'transactionId': 'TXN_0'}, None, {'transactionId': 'TXN_1'}, None]
+    assert _parse_ndjson('') == []
+
+
+def test_batch_route_accepts_json_and_ndjson(live_service):
+    client = model_service.app.test_client()
+    transactions = make_transactions(5)
+    as_list = client.post('/predict/batch', json=transactions).get_json()
+    wrapped = client.post('/predict/batch', json={'transactions': transactions}).get_json()
+    lines = [json.dumps(t) for t in transactions]
+    lines.insert(2, '{"transactionId": ')
+    ndjson = client.post('/predict/batch', data='\n'.join(lines) + '\n',
+                         content_type='application/x-ndjson').get_json()
+
+    assert as_list['count'] == 5 and as_list['errors'] == 0
+    scores = [(r['transactionId'], r['riskScore']) for r in as_list['results']]
+    assert [(r['transactionId'], r['riskScore']) for r in wrapped['results']] == scores
+    # The malformed line keeps its place and is reported on its own
+    assert ndjson['count'] == 6 and ndjson['errors'] == 1
+    assert ndjson['results'][2] == {'index': 2, 'error': 'Invalid transaction data'}
+    assert [(r['transactionId'], r['riskScore']) for r in ndjson['results'] if 'riskScore' in r] == scores
+
+
+def test_batch_route_rejects_empty_and_oversized_bodies(live_service):
+    client = model_service.app.test_client()
+    recorded = live_service.prediction_history.total
+    assert client.post('/predict/batch', json=[]).status_code == 400
+    assert client.post('/predict/batch', json={'rows': make_transactions(2)}).status_code == 400
+    assert client.post('/predict/batch', data='', content_type='application/x-ndjson').status_code == 400
+
+    limit = config.PREDICT_BATCH_MAX_ROWS
+    try:
+        config.PREDICT_BATCH_MAX_ROWS = 3
+        assert client.post('/predict/batch', json=make_transactions(3)).status_code == 200
+        response = client.post('/predict/batch', json=make_transactions(4))
+        assert response.status_code == 413 and '/predict/stream' in response.get_json()['error']
+        lines = '\n'.join(json.dumps(t) for t in make_transactions(4))
+        assert client.post('/predict/batch', data=lines, content_type='application/x-ndjson').status_code == 413
+    finally:
+        config.PREDICT_BATCH_MAX_ROWS = limit
+    # Nothing from the rejected batches was scored
+    assert live_service.prediction_history.total == recorded + 3
+
+
+if __name__ == "__main__":
+    print("🧪 Testing batch predictions")
+    print("=" * 50)
+    for test in [test_predict_many_matches_single_predictions, test_failed_batch_falls_back_to_rows,
+                 test_parse_ndjson, test_partial_rows_score_as_if_alone]:
+        test()
+        print(f"✅ {test.__name__}")
+    for test in [test_batch_route_accepts_json_and_ndjson, test_batch_route_rejects_empty_and_oversized_bodies]:
+        with serving(small_service()) as service:
+            test(service)
+        print(f"✅ {test.__name__}")
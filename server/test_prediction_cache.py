@@ -0,0 +1,64 @@
+"""
+Tests for the prediction result cache
+"""
+
+from conftest import model_file
+from lru_cache import LRUCache
+from model_service import FraudModelService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_ttl():
+    clock = FakeClock()
+    cache = LRUCache(maxsize=2, ttl=10, clock=clock)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1
+
+    clock.now = 11
+    assert cache.get('a') is None and cache.get('c') is None
+    assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 3
+
+
+def test_repeated_transactions_hit_cache(tmp_path):
+    service = FraudModelService()
+    service.prediction_cache = LRUCache(100)
+    assert service.load_model(model_file(tmp_path, 'first.pkl', 0))
+
+    transaction = {'transactionAmount': 7.5, 'accountBalance': 2.0, 'deviceType': 'Mobile'}
+    first = service.predict(dict(transaction, transactionId='TXN_1'))
+    second = service.predict(dict(transaction, transactionId='TXN_2'))
+    assert first['riskScore'] == second['riskScore']
+    assert service.prediction_cache.hits == 1
+
+    results = service.predict_many([transaction, dict(transaction, transactionAmount=1.0)])
+    assert results[0]['riskScore'] == first['riskScore']
+    assert service.prediction_cache.hits == 2 and len(service.prediction_cache) == 2
+
+    # Loading a different model must not serve the old model's scores
+    assert service.load_model(model_file(tmp_path, 'second.pkl', 1))
+    assert len(service.prediction_cache) == 0
+    service.predict(transaction)
+    assert service.prediction_cache.hits == 2
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+
+    print("🧪 Testing prediction cache")
+    print("=" * 50)
+    test_lru_eviction_and_ttl()
+    print("✅ test_lru_eviction_and_ttl")
+    with tempfile.TemporaryDirectory() as directory:
+        test_repeated_transactions_hit_cache(pathlib.Path(directory))
+    print("✅ test_repeated_transactions_hit_cache")
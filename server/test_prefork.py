@@ -0,0 +1,195 @@
+"""
+Tests for pre-fork worker state: the shared active model path, per-worker
+metrics and /history paging across workers
+Runs in one process with the cluster's gather replaced; no workers forked
+except where a test forks one itself
+"""
+
+import http.server
+import json
+import os
+import tempfile
+import threading
+import time
+
+import config
+import model_service
+from conftest import make_prediction, model_file, serving
+from history_store import PredictionHistory
+from prefork import SharedText, cluster
+
+
+def test_shared_text_is_seen_across_fork():
+    shared = SharedText(size=64)
+    assert shared.get() is None
+    shared.set('/models/first.pkl')
+
+    pid = os.fork()
+    if pid == 0:
+        status = 0 if shared.get() == '/models/first.pkl' else 1
+        shared.set('/models/second.pkl')
+        os._exit(status)
+    _, status = os.waitpid(pid, 0)
+    assert status == 0
+    assert shared.get() == '/models/second.pkl'
+
+    try:
+        shared.set('x' * 61)
+        assert False, "oversized text was stored"
+    except ValueError:
+        pass
+
+
+def test_restarted_worker_loads_the_active_model(app_service, tmp_path):
+    service = app_service
+    original_slot = cluster._active_model
+    try:
+        assert service.load_model(model_file(tmp_path, 'startup.pkl', 0))
+        inherited = service.bundle
+        cluster._active_model = SharedText()
+
+        # Swaps and rollbacks in any worker are published
+        swapped_path = model_file(tmp_path, 'swapped.pkl', 1)
+        assert service.load_model(swapped_path)
+        assert cluster.active_model() == swapped_path
+        assert service.rollback_model()
+        assert cluster.active_model() == inherited.path
+        assert service.load_model(swapped_path)
+
+        # A worker forked later starts with the parent's model and catches up
+        service.bundle = inherited
+        model_service.metrics.registry.shard()[('leftover_total', ())] = 5
+        model_service._post_fork(0)
+        assert service.bundle.path == swapped_path
+        assert ('leftover_total', ()) not in model_service.metrics.registry.collect()
+    finally:
+        cluster._active_model = original_slot
+
+
+def test_history_limit_is_capped_in_both_scopes():
+    service = model_service.fraud_service
+    previous = service.prediction_history
+    try:
+        service.prediction_history = PredictionHistory(capacity=3000)
+        for i in range(1500):
+            service.prediction_history.append(make_prediction(i))
+        client = model_service.app.test_client()
+        for query in ['', '&scope=local']:
+            page = client.get(f'/history?limit=5000{query}').get_json()
+            assert page['limit'] == 1000 and page['count'] == 1000
+    finally:
+        service.prediction_history = previous
+
+
+def test_cluster_history_pages_past_the_cap():
+    service = model_service.fraud_service
+    combined = PredictionHistory(capacity=5000)
+    workers = [PredictionHistory(capacity=5000) for _ in range(3)]
+    for i in range(3000):
+        combined.append(make_prediction(i))
+        workers[(i * 7) % 3].append(make_prediction(i))
+
+    calls = []
+
+    def gather(path, params=None, payload=None, timeout=5.0):
+        calls.append(params)
+        limit = min(int(params['limit']), model_service.MAX_HISTORY_LIMIT)
+        responses = []
+        for worker in workers[1:]:
+            predictions, matching = worker.query(offset=int(params['offset']), limit=limit,
+                                                 newest_first=params['order'] != 'asc')
+            responses.append({'predictions': predictions, 'total': matching,
+                              'capacity': worker.capacity, 'totalPredictions': worker.total})
+        return responses
+
+    previous = service.prediction_history, cluster.index, cluster.ports, cluster.gather
+    try:
+        service.prediction_history = workers[0]
+        cluster.index, cluster.ports, cluster.gather = 0, [1, 2, 3], gather
+        client = model_service.app.test_client()
+        for offset, order in [(0, 'desc'), (1700, 'desc'), (2500, 'asc')]:
+            calls.clear()
+            page = client.get(f'/history?limit=400&offset={offset}&order={order}').get_json()
+            expected, _ = combined.query(offset=offset, limit=400, newest_first=order != 'asc')
+            assert page['predictions'] == expected
+            assert page['total'] == 3000 and page['workers'] == {'responded': 3, 'total': 3}
+            assert all(int(params['limit']) <= model_service.MAX_HISTORY_LIMIT for params in calls)
+    finally:
+        service.prediction_history, cluster.index, cluster.ports, cluster.gather = previous
+
+
+def _worker_stub(delay):
+    """A loopback HTTP server answering every POST with {"delay": delay} after delay seconds"""
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(delay)
+            body = json.dumps({'delay': delay}).encode()
+            try:
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except OSError:
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_slow_workers_are_reported_not_waited_for():
+    fast, slow = _worker_stub(0), _worker_stub(3)
+    previous = cluster.index, cluster.ports
+    try:
+        cluster.index, cluster.ports = 0, [1, fast.server_address[1], slow.server_address[1]]
+        started = time.monotonic()
+        answers = cluster.ask('/load-model', payload={}, timeout=0.3)
+        assert time.monotonic() - started < 2
+        assert answers == {1: {'delay': 0}, 2: None}
+    finally:
+        cluster.index, cluster.ports = previous
+        fast.shutdown()
+        slow.shutdown()
+
+
+def test_load_model_route_lists_unanswered_workers(app_service, tmp_path):
+    timeouts = []
+
+    def ask(path, params=None, payload=None, timeout=5.0):
+        timeouts.append(timeout)
+        return {1: {'message': 'Model loaded successfully'}, 2: None}
+
+    previous = cluster.index, cluster.ports, cluster.ask
+    try:
+        cluster.index, cluster.ports, cluster.ask = 0, [1, 2, 3], ask
+        response = model_service.app.test_client().post('/load-model', json={'model_path': model_file(tmp_path, 'm.pkl', 0)})
+    finally:
+        cluster.index, cluster.ports, cluster.ask = previous
+    assert timeouts == [config.CLUSTER_LOAD_TIMEOUT_SECONDS]
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['workers'] == [{'message': 'Model loaded successfully'}] and body['unansweredWorkers'] == [2]
+
+
+if __name__ == "__main__":
+    import pathlib
+
+    print("🧪 Testing pre-fork worker state")
+    print("=" * 50)
+    test_shared_text_is_seen_across_fork()
+    print("✅ test_shared_text_is_seen_across_fork")
+    with tempfile.TemporaryDirectory() as directory, serving() as service:
+        test_restarted_worker_loads_the_active_model(service, pathlib.Path(directory))
+    print("✅ test_restarted_worker_loads_the_active_model")
+    for test in [test_history_limit_is_capped_in_both_scopes, test_cluster_history_pages_past_the_cap,
+                 test_slow_workers_are_reported_not_waited_for]:
+        test()
+        print(f"✅ {test.__name__}")
+    with tempfile.TemporaryDirectory() as directory, serving() as service:
+        test_load_model_route_lists_unanswered_workers(service, pathlib.Path(directory))
+    print("✅ test_load_model_route_lists_unanswered_workers")
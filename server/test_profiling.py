@@ -0,0 +1,78 @@
+"""
+Tests for the sampling profiler and X-Profile stage tracing
+"""
+
+import threading
+
+import config
+import model_service
+from batcher import PredictionBatcher
+from conftest import serving, small_service
+from profiling import SamplingProfiler
+
+
+def _busy_loop(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_sampling_profiler_collapses_stacks():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name='busy')
+    worker.start()
+    profiler = SamplingProfiler()
+    try:
+        collapsed, samples = profiler.profile(0.2, interval=0.002)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert samples > 10
+    busy = [stack for stack in collapsed if stack.startswith('busy;')]
+    assert busy and all('_busy_loop (test_profiling.py:' in stack for stack in busy)
+
+
+def test_profile_endpoint_and_stage_headers(live_service):
+    client = model_service.app.test_client()
+    transaction = {'transactionAmount': 900.0, 'accountBalance': 10.0}
+    traced = client.post('/predict', json=transaction, headers={'X-Profile': '1'})
+    untraced = client.post('/predict', json=transaction)
+
+    stages = [part.split(';')[0] for part in traced.headers['X-Profile'].split(', ')]
+    assert stages == ['parse', 'preprocess', 'infer', 'serialize', 'total']
+    assert traced.headers['Server-Timing'] == traced.headers['X-Profile']
+    assert 'X-Profile' not in untraced.headers
+
+    token = config.ADMIN_TOKEN
+    try:
+        config.ADMIN_TOKEN = None
+        assert client.get('/admin/profile?seconds=0.01', headers={'X-Admin-Token': ''}).status_code == 403
+        config.ADMIN_TOKEN = 'secret'
+        assert client.get('/admin/profile?seconds=0.01', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+        response = client.get('/admin/profile?seconds=0.05&interval=0.01', headers={'X-Admin-Token': 'secret'})
+    finally:
+        config.ADMIN_TOKEN = token
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    assert int(response.headers['X-Profile-Samples']) > 0
+
+
+def test_batched_requests_keep_their_stages(live_service):
+    client = model_service.app.test_client()
+    model_service.batcher = PredictionBatcher(live_service.predict_many, window_ms=1.0)
+    traced = client.post('/predict', json={'transactionAmount': 900.0, 'accountBalance': 10.0},
+                         headers={'X-Profile': '1'})
+
+    # preprocess and infer ran on the batcher thread but still count for the request
+    stages = [part.split(';')[0] for part in traced.headers['X-Profile'].split(', ')]
+    assert stages == ['parse', 'queue', 'preprocess', 'infer', 'serialize', 'total']
+
+
+if __name__ == "__main__":
+    print("🧪 Testing profiling")
+    print("=" * 50)
+    test_sampling_profiler_collapses_stacks()
+    print("✅ test_sampling_profiler_collapses_stacks")
+    for test in [test_profile_endpoint_and_stage_headers, test_batched_requests_keep_their_stages]:
+        with serving(small_service()) as service:
+            test(service)
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,66 @@
+"""
+Tests for setup_model.py's rewrite of config.py
+"""
+
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+
+import config
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from setup_model import update_config
+
+
+def _load(path):
+    spec = importlib.util.spec_from_file_location('rewritten_config', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _settings(module):
+    return {name: value for name, value in vars(module).items() if name.isupper()}
+
+
+def test_rewrite_only_touches_the_model_settings(tmp_path):
+    path = str(tmp_path / 'config.py')
+    shutil.copy(config.__file__, path)
+    model_path = 'C:\\frauddetection\\models\\fraud_model.pkl'
+    update_config(path, model_path, 'team_model.pkl')
+    # Twice, as a second setup run would
+    update_config(path, model_path, 'team_model.pkl')
+
+    rewritten = _load(path)
+    assert rewritten.MODEL_PATH == model_path
+    assert rewritten.MODEL_NAME == 'team_model.pkl'
+    expected = dict(_settings(config), MODEL_PATH=model_path, MODEL_NAME='team_model.pkl')
+    assert _settings(rewritten) == expected
+
+    with open(config.__file__) as f:
+        original = f.read().splitlines()
+    with open(path) as f:
+        lines = f.read().splitlines()
+    changed = [(old, new) for old, new in zip(original, lines) if old != new]
+    assert len(lines) == len(original) and len(changed) == 2
+
+
+def test_missing_config_gets_the_model_block(tmp_path):
+    path = str(tmp_path / 'config.py')
+    update_config(path, '/models/fraud_model.pkl', 'fraud_model.pkl')
+    rewritten = _load(path)
+    assert rewritten.MODEL_PATH == '/models/fraud_model.pkl'
+    assert rewritten.SERVER_PORT == 5000
+
+
+if __name__ == "__main__":
+    import pathlib
+
+    print("🧪 Testing setup config rewrite")
+    print("=" * 50)
+    for test in [test_rewrite_only_touches_the_model_settings, test_missing_config_gets_the_model_block]:
+        with tempfile.TemporaryDirectory() as directory:
+            test(pathlib.Path(directory))
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,78 @@
+"""
+Tests for streaming NDJSON/CSV scoring
+"""
+
+import csv
+import io
+import json
+
+import model_service
+import score_stream
+from conftest import COLUMNS, make_transactions, serving, small_service
+from stream_scoring import StreamStats, read_transactions, score_stream as stream
+
+
+def test_stream_matches_predict_many():
+    service = small_service()
+    transactions = make_transactions(25)
+    lines = [json.dumps(t) + '\n' for t in transactions]
+    lines.insert(10, 'not json\n')
+    stats = StreamStats()
+
+    results = list(stream(service, read_transactions(lines), batch_size=4, stats=stats))
+    expected = service.predict_many(transactions[:10] + [None] + transactions[10:], record=False)
+
+    assert [r['index'] for r in results] == list(range(26))
+    assert results[10]['error'] == 'Invalid transaction data'
+    assert [r.get('riskScore') for r in results] == [r.get('riskScore') for r in expected]
+    assert stats.rows == 26 and stats.errors == 1
+    # Offline scoring leaves the live history untouched
+    assert service.prediction_history.total == 0
+
+
+def test_csv_file_round_trip(tmp_path):
+    service = small_service()
+    transactions = make_transactions(12)
+    source = tmp_path / 'input.csv'
+    with open(source, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=['transactionId'] + COLUMNS)
+        writer.writeheader()
+        writer.writerows(transactions)
+
+    output = tmp_path / 'scored.csv'
+    with serving(service):
+        summary = score_stream.run(str(source), str(output), batch_size=5)
+
+    with open(output, newline='') as file:
+        rows = list(csv.DictReader(file))
+    expected = service.predict_many(transactions, record=False)
+    assert summary['rows'] == 12 and summary['errors'] == 0
+    assert [row['transactionId'] for row in rows] == [t['transactionId'] for t in transactions]
+    assert [float(row['riskScore']) for row in rows] == [r['riskScore'] for r in expected]
+
+
+def test_stream_endpoint(live_service):
+    body = ''.join(json.dumps(t) + '\n' for t in make_transactions(7))
+    client = model_service.app.test_client()
+    response = client.post('/predict/stream?batchSize=3', data=body, content_type='application/x-ndjson')
+    lines = [json.loads(line) for line in io.StringIO(response.get_data(as_text=True))]
+
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    assert [line['transactionId'] for line in lines[:-1]] == [f'TXN_{i}' for i in range(7)]
+    assert lines[-1]['summary']['rows'] == 7
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+
+    print("🧪 Testing streaming scoring")
+    print("=" * 50)
+    test_stream_matches_predict_many()
+    print("✅ test_stream_matches_predict_many")
+    with tempfile.TemporaryDirectory() as directory:
+        test_csv_file_round_trip(pathlib.Path(directory))
+    print("✅ test_csv_file_round_trip")
+    with serving(small_service()) as service:
+        test_stream_endpoint(service)
+    print("✅ test_stream_endpoint")
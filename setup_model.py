@@ -3,11 +3,44 @@ Setup script for integrating your team's .pkl model file
 Run this script to copy your model and set up the service
 """
 
+import json
 import os
+import re
 import shutil
 import subprocess
 import sys
 
+MODEL_BLOCK = """# Model Configuration
+MODEL_PATH = {model_path}
+MODEL_NAME = {model_name}
+SERVER_HOST = "localhost"
+SERVER_PORT = 5000
+"""
+
+def update_config(config_path, model_path, model_name):
+    """
+    Set MODEL_PATH and MODEL_NAME in config.py, leaving every other line as it is
+    
+    A missing config file is created with the default model block.
+    """
+    # JSON strings are valid Python literals, with Windows backslashes escaped
+    values = {'MODEL_PATH': json.dumps(model_path), 'MODEL_NAME': json.dumps(model_name)}
+    if not os.path.exists(config_path):
+        with open(config_path, 'w') as f:
+            f.write(MODEL_BLOCK.format(model_path=values['MODEL_PATH'], model_name=values['MODEL_NAME']))
+        return
+    
+    with open(config_path, 'r') as f:
+        config = f.read()
+    for name, value in values.items():
+        pattern = re.compile(rf'^{name} = .*$', re.MULTILINE)
+        if pattern.search(config):
+            config = pattern.sub(lambda match: f'{name} = {value}', config, count=1)
+        else:
+            config = f'{name} = {value}\n' + config
+    with open(config_path, 'w') as f:
+        f.write(config)
+
 def setup_model_service():
     print("🚀 Setting up Fraud Detection Model Service...")
     
@@ -80,16 +113,18 @@ def setup_model_service():
         print(f"❌ Error copying file: {e}")
         return False
     
-    # Create a configuration file
-    config = f'''# Model Configuration
-MODEL_PATH = "{os.path.abspath(dest_path)}"
-MODEL_NAME = "{selected_file}"
-SERVER_HOST = "localhost"
-SERVER_PORT = 5000
-'''
+    # Export a memory-mapped artifact next to it for fast service startup;
+    # the service falls back to the .pkl if this fails
+    artifact_path = os.path.join(models_dir, "fraud_model.forest")
+    sys.path.insert(0, 'server')
+    try:
+        from inspect_model import export_model
+        export_model(dest_path, artifact_path)
+    except ImportError as e:
+        print(f"⚠️  Skipping model artifact export: {e}")
     
-    with open('server/config.py', 'w') as f:
-        f.write(config)
+    # Point the configuration at the model
+    update_config('server/config.py', os.path.abspath(dest_path), selected_file)
     
     print("✅ Configuration file created")
     
@@ -98,6 +133,7 @@ SERVER_PORT = 5000
 
 Your model has been set up successfully:
 📁 Model file: {dest_path}
+⚡ Model artifact: {artifact_path} (re-export after replacing the .pkl)
 🔧 Config: server/config.py
 
 Next steps: